@@ -0,0 +1,106 @@
+from json.encoder import encode_basestring
+from typing import Optional
+from xml.sax.saxutils import escape
+
+# Media types served by the weather routes
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+XML_MEDIA_TYPE = "application/xml"
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+# Precompiled response templates. Temperature and coordinates are numbers
+# and never need escaping; only the city name does.
+_JSON_TEMPLATE = '{"Weather":"%s C","Latitude":"%s","Longitude":"%s","City":%s}'
+_XML_TEMPLATE = (
+    "<root><Temperature>%s</Temperature><City>%s</City>"
+    "<Latitude>%s</Latitude><Longitude>%s</Longitude></root>"
+)
+_NDJSON_OK_TEMPLATE = '{"query":%s,"status":200,"data":%s}\n'
+_NDJSON_ERROR_TEMPLATE = '{"query":%s,"status":%d,"error":%s}\n'
+_XML_RESULT_TEMPLATE = (
+    '<result status="200" query="%s"><Temperature>%s</Temperature><City>%s</City>'
+    "<Latitude>%s</Latitude><Longitude>%s</Longitude></result>"
+)
+_XML_ERROR_TEMPLATE = '<result status="%d" query="%s"><Error>%s</Error></result>'
+
+# Extra entities for XML attribute values
+_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+# Accept media ranges mapped to output formats
+_ACCEPT_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "json",
+    "application/xml": "xml",
+    "text/xml": "xml",
+    "application/*": "json",
+    "*/*": "json",
+}
+
+def render_json(weather_data: dict) -> bytes:
+    """Render service weather data as the JSON response body."""
+    return (_JSON_TEMPLATE % (
+        weather_data["temp"], weather_data["lat"], weather_data["lon"],
+        encode_basestring(weather_data["city"])
+    )).encode("utf-8")
+
+def render_xml(weather_data: dict) -> bytes:
+    """Render service weather data as the XML response body."""
+    return (_XML_TEMPLATE % (
+        weather_data["temp"], escape(weather_data["city"]), weather_data["lat"], weather_data["lon"]
+    )).encode("utf-8")
+
+def render_ndjson_item(query: str, weather_data: Optional[dict], status: int = 200, error: str = "") -> bytes:
+    """Render one batch result line (success or per-item error)."""
+    if weather_data is not None:
+        line = _NDJSON_OK_TEMPLATE % (encode_basestring(query), render_json(weather_data).decode("utf-8"))
+    else:
+        line = _NDJSON_ERROR_TEMPLATE % (encode_basestring(query), status, encode_basestring(str(error)))
+    return line.encode("utf-8")
+
+def render_xml_item(query: str, weather_data: Optional[dict], status: int = 200, error: str = "") -> bytes:
+    """Render one batch <result> element (success or per-item error)."""
+    if weather_data is not None:
+        element = _XML_RESULT_TEMPLATE % (
+            escape(query, _ATTR_ENTITIES), weather_data["temp"], escape(weather_data["city"]),
+            weather_data["lat"], weather_data["lon"]
+        )
+    else:
+        element = _XML_ERROR_TEMPLATE % (status, escape(query, _ATTR_ENTITIES), escape(str(error)))
+    return element.encode("utf-8")
+
+def render_sse_event(query: str, weather_data: Optional[dict], status: int = 200, error: str = "") -> bytes:
+    """Render one subscription update as a server-sent "weather" event (data is a batch result line)."""
+    return b"event: weather\ndata: " + render_ndjson_item(query, weather_data, status, error)[:-1] + b"\n\n"
+
+def negotiate_format(output_format: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """Pick "json" or "xml" from an explicit format or the Accept header.
+
+    An explicit `output_format` always wins. Otherwise the highest-quality
+    supported media range in Accept is used, defaulting to JSON when the
+    header is absent. Returns None when nothing in Accept is supported.
+    """
+    if output_format:
+        return output_format
+    if not accept:
+        return "json"
+
+    best_format, best_rank = None, (0.0, False)
+    for media_range in accept.split(","):
+        media_type, *params = media_range.strip().split(";")
+        media_type = media_type.strip().lower()
+        chosen = _ACCEPT_FORMATS.get(media_type)
+        if chosen is None:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # Higher quality wins, then a concrete type over a wildcard, then order
+        rank = (quality, "*" not in media_type)
+        if quality > 0 and rank > best_rank:
+            best_format, best_rank = chosen, rank
+    return best_format
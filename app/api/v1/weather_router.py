@@ -1,59 +1,449 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.weather import WeatherRequest, WeatherResponse
-from app.services.v1.weather_service import get_weather_data
-from fastapi.responses import JSONResponse, Response
+from fastapi import APIRouter, Header, HTTPException, Path, Query
+from app.schemas.weather import (
+    CITY_PATTERN,
+    MAX_BATCH_CITIES,
+    CityHistory,
+    CitySeries,
+    CitySuggestion,
+    WarmCity,
+    WeatherBatchRequest,
+    WeatherRequest
+)
+from app.services.v1.weather_service import get_cached_weather_data, canonical_key
+from app.services.v1.gazetteer import get_gazetteer
+from app.services.v1.history import get_history_store
+from app.services.v1.prefetch import get_prefetch_scheduler
+from app.services.v1.response_cache import IDENTITY, get_response_cache, negotiate_encoding
+from app.services.v1.subscriptions import Subscriber, get_subscription_hub
+from app.services.v1.weather_cache import get_weather_cache
+from app.api.v1.renderers import (
+    EVENT_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    XML_MEDIA_TYPE,
+    negotiate_format,
+    render_json,
+    render_xml,
+    render_ndjson_item,
+    render_sse_event,
+    render_xml_item
+)
+from app.config.settings import get_settings
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from app.utils.logger_config import setup_logger
-import xml.etree.ElementTree as ET
+from app.utils.tracing import TracedRoute, span
+from email.utils import formatdate, parsedate_to_datetime
+from pydantic import Field
+from typing import Annotated, Callable, List, Literal, Optional
+import asyncio
+import time
+import zlib
 
-# Initialize router and logger
-router = APIRouter()
+# Initialize router and logger (route handlers are timed as the "handler" span)
+router = APIRouter(route_class=TracedRoute)
 logger = setup_logger("weather_router")
 
+# Header set when the representation was chosen from Accept
+_VARY_ACCEPT = {"Vary": "Accept"}
+
+# Upper bound on resampled intervals per city in one history query
+_MAX_HISTORY_POINTS = 10_000
+
+# Cities in query strings (repeat the parameter for several)
+_CityList = List[Annotated[str, Field(min_length=1, max_length=100, pattern=CITY_PATTERN)]]
+
+def resolve_format(output_format: Optional[str], accept: Optional[str]) -> str:
+    """Resolve the output format or fail with 406 Not Acceptable."""
+    resolved = negotiate_format(output_format, accept)
+    if resolved is None:
+        raise HTTPException(
+            status_code=406,
+            detail="Not Acceptable: supported media types are application/json and application/xml"
+        )
+    return resolved
+
+def _cached_response(key: tuple, sources: tuple, render: Callable[[], bytes], media_type: str,
+                     accept_encoding: Optional[str], negotiated: bool, headers: Optional[dict] = None) -> Response:
+    """Serve a body from the response cache, pre-compressed for the client's Accept-Encoding."""
+    settings = get_settings()
+    encoding = negotiate_encoding(accept_encoding, tuple(settings.response_cache_encodings))
+    body, applied = get_response_cache().get(key, sources, encoding, render)
+    headers = dict(headers or ())
+    if negotiated:
+        headers.update(_VARY_ACCEPT)
+    if applied != IDENTITY:
+        # Already compressed: the GZip middleware passes encoded responses through
+        # untouched, so Vary is set here (it adds it itself for identity bodies)
+        headers["Content-Encoding"] = applied
+        headers["Vary"] = "Accept, Accept-Encoding" if negotiated else "Accept-Encoding"
+    return Response(content=body, media_type=media_type, headers=headers)
+
 @router.post("/getCurrentWeather",
              response_model=None,  # Flexible response model for format toggling
              summary="Get current weather data",
-             description="Fetches current weather data for a city in JSON or XML format")
-async def get_current_weather(request: WeatherRequest):
+             description="Fetches current weather data for a city in JSON or XML format. "
+                         "When output_format is omitted the format is negotiated from the Accept header")
+async def get_current_weather(request: WeatherRequest, accept: Optional[str] = Header(None),
+                              accept_encoding: Optional[str] = Header(None)):
     """Retrieve current weather data for a city asynchronously."""
+    output_format = resolve_format(request.output_format, accept)
     # Log request details
-    logger.info(f"Processing weather request for city: {request.city}, format: {request.output_format}")
+    logger.info("Processing weather request for city: %s, format: %s", request.city, output_format)
     
     try:
-        # Fetch weather data from service
-        weather_data = await get_weather_data(request.city)
-        
-        # Handle JSON response format
-        if request.output_format == "json":
-            # Format data into WeatherResponse model
-            response_data = WeatherResponse(
-                weather=f"{weather_data['temp']} C",
-                latitude=str(weather_data['lat']),
-                longitude=str(weather_data['lon']),
-                city=weather_data['city']
-            )
-            # Log response data
-            logger.debug(f"Returning JSON response: {response_data.dict(by_alias=True)}")
-            # Return JSON response using aliases (uppercase keys)
-            return JSONResponse(content=response_data.dict(by_alias=True))
-        
-        # Handle XML response format
-        elif request.output_format == "xml":
-            # Create XML structure
-            root = ET.Element("root")
-            ET.SubElement(root, "Temperature").text = f"{weather_data['temp']}"
-            ET.SubElement(root, "City").text = weather_data['city']
-            ET.SubElement(root, "Latitude").text = str(weather_data['lat'])
-            ET.SubElement(root, "Longitude").text = str(weather_data['lon'])
-            
-            # Convert XML to string
-            xml_str = ET.tostring(root, encoding='utf-8', method='xml')
-            # Log XML response
-            logger.debug(f"Returning XML response: {xml_str.decode('utf-8')}")
-            # Return XML response with appropriate media type
-            return Response(content=xml_str, media_type="application/xml")
+        # Fetch weather data from service (served from cache when possible)
+        with span("fetch"):
+            weather_data = await get_cached_weather_data(request.city)
+        headers = None if request.output_format else _VARY_ACCEPT
+        render, media_type = (render_json, JSON_MEDIA_TYPE) if output_format == "json" else (render_xml, XML_MEDIA_TYPE)
+        logger.debug("Returning %s response: %s", output_format, weather_data)
+
+        with span("render"):
+            # Reuse the bytes rendered for this city until its weather data is refreshed
+            if get_settings().response_cache_enabled:
+                return _cached_response(
+                    (canonical_key(request.city), output_format), (weather_data,),
+                    lambda: render(weather_data), media_type, accept_encoding, request.output_format is None
+                )
+
+            # JSON and XML are rendered straight to bytes from precompiled templates
+            return Response(content=render(weather_data), media_type=media_type, headers=headers)
             
+    except HTTPException:
+        # Already carries the right status (400 not found, 503 circuit open, ...)
+        raise
     except Exception as e:
         # Log error details
-        logger.error(f"Error processing weather request: {str(e)}")
+        logger.error("Error processing weather request: %s", e)
         # Raise HTTP exception with error message
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _etag(body: bytes, observed_at: Optional[int]) -> str:
+    """Weak validator for a representation (compressed variants share it)."""
+    return f'W/"{observed_at or 0:x}-{zlib.crc32(body):08x}"'
+
+def _not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                  etag: str, observed_at: Optional[int]) -> bool:
+    """Evaluate conditional GET headers; If-None-Match takes precedence (RFC 9110)."""
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+    if if_modified_since is not None and observed_at is not None:
+        try:
+            return observed_at <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.get("/weather/{city}",
+            response_model=None,
+            summary="Get current weather data (cacheable)",
+            description="Fetches current weather data for a city in JSON or XML format. Responses carry "
+                        "Cache-Control, ETag and Last-Modified (the upstream observation time), and "
+                        "If-None-Match / If-Modified-Since requests are answered with 304 Not Modified")
+async def get_weather(city: str = Path(..., min_length=1, max_length=100, pattern=CITY_PATTERN),
+                      format: Optional[Literal["json", "xml"]] = Query(None),
+                      accept: Optional[str] = Header(None),
+                      accept_encoding: Optional[str] = Header(None),
+                      if_none_match: Optional[str] = Header(None),
+                      if_modified_since: Optional[str] = Header(None)):
+    """Retrieve current weather data for a city with HTTP caching validators."""
+    output_format = resolve_format(format, accept)
+    logger.info("Processing weather request for city: %s, format: %s", city, output_format)
+
+    try:
+        with span("fetch"):
+            weather_data = await get_cached_weather_data(city)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error processing weather request: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    settings = get_settings()
+    key = canonical_key(city)
+    render, media_type = (render_json, JSON_MEDIA_TYPE) if output_format == "json" else (render_xml, XML_MEDIA_TYPE)
+    with span("render"):
+        if settings.response_cache_enabled:
+            # The identity body is cached, so validating costs no rendering
+            body, _ = get_response_cache().get((key, output_format), (weather_data,), IDENTITY,
+                                               lambda: render(weather_data))
+        else:
+            body = render(weather_data)
+
+    with span("etag"):
+        # Shared caches may keep the response for as long as our own cache keeps it fresh
+        observed_at = weather_data.get("observed_at")
+        fresh_for = get_weather_cache().fresh_for(key) or 0.0
+        headers = {
+            "ETag": _etag(body, observed_at),
+            "Cache-Control": f"public, max-age={max(int(fresh_for), 0)}, "
+                             f"stale-while-revalidate={int(settings.cache_stale_seconds)}"
+        }
+        if observed_at is not None:
+            headers["Last-Modified"] = formatdate(observed_at, usegmt=True)
+        not_modified = _not_modified(if_none_match, if_modified_since, headers["ETag"], observed_at)
+
+    if not_modified:
+        if format is None:
+            headers.update(_VARY_ACCEPT)
+        return Response(status_code=304, headers=headers)
+    if settings.response_cache_enabled:
+        # The compressed variant for the client's Accept-Encoding
+        with span("encode"):
+            return _cached_response(
+                (key, output_format), (weather_data,), lambda: body, media_type,
+                accept_encoding, format is None, headers
+            )
+    if format is None:
+        headers.update(_VARY_ACCEPT)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def _fetch_batch(cities: list, concurrency: int):
+    """Yield (city, weather_data, error) for each city as its fetch completes."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(city: str):
+        # Cap concurrent upstream work for this batch
+        async with semaphore:
+            try:
+                return city, await get_cached_weather_data(city), None
+            except HTTPException as e:
+                return city, None, e
+            except Exception as e:
+                logger.error("Unexpected error in batch fetch for %s: %s", city, e)
+                return city, None, HTTPException(status_code=500, detail="Weather service unavailable")
+
+    tasks = [asyncio.create_task(fetch_one(city)) for city in cities]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop pending work if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
+
+async def _ndjson_batch(cities: list, concurrency: int):
+    """Stream one JSON object per line, in completion order."""
+    async for city, weather_data, error in _fetch_batch(cities, concurrency):
+        if error is None:
+            yield render_ndjson_item(city, weather_data)
+        else:
+            yield render_ndjson_item(city, None, error.status_code, error.detail)
+
+async def _xml_batch(cities: list, concurrency: int):
+    """Stream a <results> document, one <result> element per completed city."""
+    yield b"<results>"
+    async for city, weather_data, error in _fetch_batch(cities, concurrency):
+        if error is None:
+            yield render_xml_item(city, weather_data)
+        else:
+            yield render_xml_item(city, None, error.status_code, error.detail)
+    yield b"</results>"
+
+async def _cached_batch(keys: list, cities: list, output_format: str, accept_encoding: Optional[str],
+                        negotiated: bool) -> Optional[Response]:
+    """Serve a batch from the response cache when every city is fresh in the weather cache.
+
+    Returns None when any city would need an upstream call or fails, so the
+    batch is streamed as results arrive instead. Cached bodies list cities
+    by canonical key, so one entry serves the same cities in any order.
+    """
+    # The requested spellings are echoed in the body, so they stay part of the entry's key
+    ordered = tuple(sorted(zip(keys, cities)))
+    cities = [city for _, city in ordered]
+    weather_cache = get_weather_cache()
+    for key in keys:
+        fresh_for = weather_cache.fresh_for(key)
+        if fresh_for is None or fresh_for <= 0:
+            return None
+    try:
+        # Every city is fresh, so none of these waits on upstream
+        sources = tuple([await get_cached_weather_data(city) for city in cities])
+    except HTTPException:
+        return None
+
+    if output_format == "json":
+        return _cached_response(
+            ("batch", output_format, ordered), sources,
+            lambda: b"".join(map(render_ndjson_item, cities, sources)),
+            NDJSON_MEDIA_TYPE, accept_encoding, negotiated
+        )
+    return _cached_response(
+        ("batch", output_format, ordered), sources,
+        lambda: b"<results>" + b"".join(map(render_xml_item, cities, sources)) + b"</results>",
+        XML_MEDIA_TYPE, accept_encoding, negotiated
+    )
+
+@router.post("/getCurrentWeatherBatch",
+             response_model=None,
+             summary="Get current weather data for many cities",
+             description="Fetches weather for up to 500 cities concurrently and streams each result "
+                         "as NDJSON (json) or as <result> elements (xml) as soon as it completes. "
+                         "When every city is cached the whole body is served pre-compressed")
+async def get_current_weather_batch(request: WeatherBatchRequest, accept: Optional[str] = Header(None),
+                                    accept_encoding: Optional[str] = Header(None)):
+    """Retrieve current weather data for many cities, streaming per-city results."""
+    settings = get_settings()
+    output_format = resolve_format(request.output_format, accept)
+    headers = None if request.output_format else _VARY_ACCEPT
+
+    # De-duplicate on the canonical city, keeping the first spelling requested
+    unique = {}
+    for city in request.cities:
+        unique.setdefault(canonical_key(city), city)
+    cities = list(unique.values())
+
+    # Log request details
+    logger.info(
+        "Processing batch weather request: %d cities (%d unique), format: %s",
+        len(request.cities), len(cities), output_format
+    )
+
+    if settings.response_cache_enabled:
+        response = await _cached_batch(
+            list(unique), cities, output_format, accept_encoding, request.output_format is None
+        )
+        if response is not None:
+            return response
+
+    if output_format == "json":
+        return StreamingResponse(
+            _ndjson_batch(cities, settings.batch_max_concurrency),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers
+        )
+    return StreamingResponse(
+        _xml_batch(cities, settings.batch_max_concurrency),
+        media_type=XML_MEDIA_TYPE,
+        headers=headers
+    )
+
+async def _event_stream(subscriber: Subscriber, heartbeat: float, max_seconds: float):
+    """Stream a subscription as server-sent events until the client leaves or time is up."""
+    hub = get_subscription_hub()
+    ends_at = time.monotonic() + max_seconds
+    try:
+        # Sent at once, so the response starts before the first value is ready
+        yield b"retry: %d\n\n" % int(hub.poll_interval * 1000)
+        while not subscriber.closed:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                break
+            updates = await subscriber.next_updates(min(heartbeat, remaining))
+            if not updates:
+                # Keeps idle connections open through proxies
+                yield b": keep-alive\n\n"
+                continue
+            # Only the latest value per city is sent; a slow client blocks here, not the feeds
+            yield b"".join(render_sse_event(subscriber.queries[key], *update) for key, update in updates)
+            hub.record_delivered(len(updates))
+    finally:
+        hub.unsubscribe(subscriber)
+
+@router.get("/subscribe",
+            response_model=None,
+            summary="Subscribe to weather updates",
+            description="Streams server-sent \"weather\" events for the given cities: the current value "
+                        "first, then a new event whenever a city's weather changes. Each event's data is "
+                        "a batch result line. All subscribers of a city share one refresh loop")
+async def subscribe(cities: _CityList = Query(..., min_length=1,
+                                             description="City to subscribe to (repeat for several)")):
+    """Subscribe to weather updates for a set of cities."""
+    settings = get_settings()
+    if len(cities) > settings.subscription_max_cities:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.subscription_max_cities} cities per subscription"
+        )
+    logger.info("Opening subscription for %d cities", len(cities))
+    subscriber = get_subscription_hub().subscribe(cities)
+    return StreamingResponse(
+        _event_stream(subscriber, settings.subscription_heartbeat_seconds, settings.subscription_max_seconds),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        # Proxies must neither cache nor buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _history_range(hours: float):
+    """Unix-second bounds of the last `hours` hours."""
+    until = int(time.time())
+    return until - int(hours * 3600), until
+
+@router.get("/history/summary",
+            response_model=List[CityHistory],
+            summary="Summarize recorded temperatures",
+            description="Returns, for each city, the count, min, max and mean of the temperatures "
+                        "observed over the last `hours` hours, with the first and last values and the "
+                        "least-squares trend in degrees per hour. Computed from the observation history "
+                        "shared by the server's worker processes")
+async def history_summary(cities: _CityList = Query(..., min_length=1, max_length=MAX_BATCH_CITIES),
+                          hours: float = Query(24.0, gt=0, le=24 * 366)):
+    """Summarize the recorded temperature history of a set of cities."""
+    since, until = _history_range(hours)
+    keys = [canonical_key(city) for city in cities]
+    # A scan over the memory-mapped history segments, so it runs off the event loop
+    summaries = await run_in_threadpool(get_history_store().summary, keys, since, until) \
+        if get_settings().history_enabled else {}
+    return [
+        CityHistory(query=city, **summaries[key]) if key in summaries else CityHistory(query=city, count=0)
+        for city, key in zip(cities, keys)
+    ]
+
+@router.get("/history/series",
+            response_model=List[CitySeries],
+            summary="Resample recorded temperatures",
+            description="Returns, for each city, the count, min, max and mean temperature of every "
+                        "`interval_seconds` interval (aligned to the start of the range) over the last "
+                        "`hours` hours that has observations")
+async def history_series(cities: _CityList = Query(..., min_length=1, max_length=MAX_BATCH_CITIES),
+                         hours: float = Query(24.0, gt=0, le=24 * 366),
+                         interval_seconds: int = Query(3600, ge=60)):
+    """Resample the recorded temperature history of a set of cities."""
+    if hours * 3600 / interval_seconds > _MAX_HISTORY_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {_MAX_HISTORY_POINTS} intervals per city; use a longer interval"
+        )
+    since, until = _history_range(hours)
+    keys = [canonical_key(city) for city in cities]
+    series = await run_in_threadpool(get_history_store().resample, keys, since, until, interval_seconds) \
+        if get_settings().history_enabled else {}
+    return [
+        CitySeries(query=city, **series[key]) if key in series else CitySeries(query=city, points=[])
+        for city, key in zip(cities, keys)
+    ]
+
+@router.get("/cities/autocomplete",
+            response_model=List[CitySuggestion],
+            summary="Suggest city names",
+            description="Returns known cities whose name or alias starts with the given prefix, "
+                        "most populous first, then close misspellings. Served from the offline "
+                        "gazetteer without calling upstream")
+async def autocomplete_cities(q: str = Query(..., min_length=1, max_length=100),
+                              limit: int = Query(10, ge=1, le=50)):
+    """Suggest cities for a partially typed name."""
+    if not get_settings().gazetteer_enabled:
+        return []
+    return [
+        CitySuggestion(
+            name=location.name,
+            country=location.country,
+            label=f"{location.name}, {location.country}",
+            lat=location.lat,
+            lon=location.lon
+        )
+        for location in get_gazetteer().autocomplete(q, limit)
+    ]
+
+@router.get("/cities/warm",
+            response_model=List[WarmCity],
+            summary="List cities kept warm",
+            description="Returns the most requested cities that the background prefetcher keeps "
+                        "fresh in the cache, hottest first")
+async def warm_cities():
+    """List the cities currently kept warm by the prefetch scheduler."""
+    return get_prefetch_scheduler().warm_cities()
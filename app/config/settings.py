@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List
 
 class Settings(BaseSettings):
     api_key: str
@@ -7,6 +8,157 @@ class Settings(BaseSettings):
     port: int = 8001
     WEATHER_API_URL: str
 
+    # Upstream WeatherAPI (RapidAPI) location
+    upstream_base_url: str = "https://weatherapi-com.p.rapidapi.com"
+    upstream_host: str = "weatherapi-com.p.rapidapi.com"
+
+    # Weather providers in priority order ("weatherapi", "open-meteo") and how
+    # requests are routed between them ("failover", "race" or "weighted")
+    weather_providers: List[str] = ["weatherapi"]
+    provider_policy: str = "failover"
+    provider_weights: Dict[str, float] = {}  # Provider name -> relative weight
+    provider_race_fanout: int = 2
+    open_meteo_base_url: str = "https://api.open-meteo.com"
+    open_meteo_geocoding_url: str = "https://geocoding-api.open-meteo.com"
+
+    # Shared upstream HTTP client pool and timeouts
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 3.0
+    http_read_timeout: float = 5.0
+    http_write_timeout: float = 5.0
+    http_pool_timeout: float = 2.0
+    http2_enabled: bool = False
+
+    # Upstream retries (attempts include the first; jittered exponential backoff),
+    # the retry budget shared by retries and hedges, and percentile-based hedging
+    upstream_max_attempts: int = 3
+    upstream_retry_base_delay: float = 0.05
+    upstream_retry_max_delay: float = 1.0
+    upstream_retry_budget_ratio: float = 0.2  # Extra attempts per logical request
+    upstream_retry_budget_min_per_second: float = 1.0
+    upstream_hedge_enabled: bool = False
+    upstream_hedge_percentile: float = 0.95
+    upstream_hedge_min_delay: float = 0.05
+
+    # Weather cache (0 entries disables caching). The "memory" backend is per
+    # process; "shared" keeps entries in fixed-size slots of a memory-mapped file
+    # that every worker on the host uses (put it on a tmpfs such as /dev/shm)
+    cache_ttl_seconds: float = 300.0
+    cache_stale_seconds: float = 600.0
+    cache_max_entries: int = 2048
+    cache_backend: str = "memory"
+    cache_shared_path: str = "/dev/shm/weather-cache"
+    cache_shared_slot_bytes: int = 512  # Key plus marshalled value must fit (weather entries use ~150)
+
+    # Cache of rendered, pre-compressed response bodies (bounded in bytes, counting keys
+    # and the weather data entries refer to, and in entries). Bodies
+    # shorter than the minimum size are sent uncompressed, as with the GZip middleware;
+    # br and zstd are only offered when the brotli / zstandard packages are installed
+    response_cache_enabled: bool = True
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    response_cache_max_entries: int = 4096
+    response_cache_compress_min_size: int = 1000
+    response_cache_encodings: List[str] = ["zstd", "br", "gzip"]  # Preference order
+
+    # Negative cache for cities WeatherAPI does not know
+    negative_cache_ttl_seconds: float = 60.0
+    negative_cache_max_entries: int = 4096
+
+    # Upstream circuit breaker (opens after this many consecutive failures)
+    circuit_failure_threshold: int = 5
+    circuit_recovery_seconds: float = 30.0
+
+    # Offline city gazetteer (empty path uses the bundled app/data/cities.csv;
+    # a GeoNames .txt dump such as cities15000.txt is also accepted)
+    gazetteer_enabled: bool = True
+    gazetteer_path: str = ""
+    gazetteer_reject_unknown: bool = False  # Answer unknown cities with 400 without calling upstream
+    gazetteer_fuzzy_cutoff: float = 0.85
+
+    # Hot-city tracking and background prefetch. The top cities (seen at least
+    # prefetch_min_hits times) are refreshed this many seconds before they go
+    # stale, spending at most prefetch_budget_per_minute upstream calls
+    hot_city_tracker_capacity: int = 2000
+    hot_city_decay_seconds: float = 600.0  # Counts are halved this often
+    prefetch_enabled: bool = True
+    prefetch_top_k: int = 200
+    prefetch_min_hits: int = 3
+    prefetch_budget_per_minute: int = 60
+    prefetch_interval_seconds: float = 5.0
+    prefetch_refresh_ahead_seconds: float = 30.0
+
+    # Request deadlines: the default, per path prefix (longest match wins) and a
+    # header clients may send to ask for less (seconds). With propagation on the
+    # deadline bounds upstream timeouts and retries, and upstream calls are
+    # cancelled once every request waiting for them has timed out or disconnected
+    request_timeout_seconds: float = 10.0
+    request_timeout_route_limits: Dict[str, float] = {}
+    request_timeout_header: str = "X-Request-Timeout"
+    deadline_propagation_enabled: bool = True
+
+    # Global admission control: a concurrency limit that adapts to upstream latency
+    # ("gradient" or "aimd"). Requests over it wait in a bounded queue; the rest are
+    # shed with 503. Priority paths bypass it
+    admission_enabled: bool = True
+    admission_algorithm: str = "gradient"
+    admission_initial_limit: int = 50
+    admission_min_limit: int = 4
+    admission_max_limit: int = 500
+    admission_latency_tolerance: float = 2.0  # gradient: latency over baseline tolerated before shrinking
+    admission_aimd_latency_seconds: float = 1.0  # aimd: slower samples shrink the limit
+    admission_max_queue: int = 50
+    admission_queue_timeout_seconds: float = 1.0
+    admission_retry_after_seconds: int = 1
+    # Bypass the limit: health check and metrics, and subscription streams (long-lived,
+    # they share the refresh loops below instead of calling upstream themselves)
+    admission_priority_paths: List[str] = ["/", "/metrics", "/api/v1/subscribe"]
+
+    # Batch endpoint fan-out
+    batch_max_concurrency: int = 16
+
+    # Server-sent event subscriptions: one refresh loop per subscribed city, shared by
+    # every stream. Streams send a comment as heartbeat and end after max_seconds
+    # (EventSource clients reconnect by themselves)
+    subscription_poll_seconds: float = 5.0
+    subscription_heartbeat_seconds: float = 15.0
+    subscription_max_cities: int = 50
+    subscription_max_seconds: float = 600.0
+
+    # Observation history: every worker appends the observations it fetches (24 bytes
+    # each) to a memory-mapped column segment of history_chunk_rows rows under history_dir;
+    # full segments are sealed as Arrow IPC files. Queries read every worker's segments
+    # memory-mapped. Point all workers at the same directory
+    history_enabled: bool = True
+    history_dir: str = "/tmp/weather-history"
+    history_chunk_rows: int = 65536
+    history_retention_hours: float = 168.0
+
+    # Tracing: stage timings (rate limit, admission queue, route handler, weather fetch,
+    # upstream call, rendering) in a Server-Timing response header. A request whose
+    # profiling_header carries profiling_token runs under cProfile, and the profile is
+    # saved under profiling_dir (an empty token disables profiling)
+    tracing_enabled: bool = True
+    profiling_token: str = ""
+    profiling_header: str = "X-Profile"
+    profiling_dir: str = "/tmp/weather-profiles"
+
+    # Rate limiting ("memory" per process, or "redis" shared by all workers)
+    rate_limit_max_requests: int = 100
+    rate_limit_window_seconds: float = 60.0
+    rate_limit_backend: str = "memory"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100_000
+    rate_limit_key_header: str = ""  # e.g. "X-API-Key"; empty means client IP
+    rate_limit_route_limits: Dict[str, int] = {}  # Path prefix -> max requests per window
+    rate_limit_key_limits: Dict[str, int] = {}  # Client key -> max requests per window
+
+    # Logging ("json" or "text" lines; per-request access lines sampled at this rate)
+    log_dir: str = "logs"
+    log_format: str = "json"
+    log_sample_rate: float = 1.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,13 +1,27 @@
 from fastapi import FastAPI
+from fastapi.responses import Response
 from app.api.v1 import weather_router
 from app.middleware.cors import add_cors_middleware
 from app.middleware.logger import add_logging_middleware
 from app.middleware.error_handler import add_error_handler_middleware 
 from app.middleware.gzip import add_gzip_middleware
-from app.middleware.rate_limit import add_rate_limit_middleware
+from app.middleware.rate_limit import add_rate_limit_middleware, get_rate_limit_backend
 from app.middleware.timeout import add_timeout_middleware
+from app.middleware.admission import add_admission_middleware
+from app.middleware.metrics import add_metrics_middleware
+from app.middleware.tracing import add_tracing_middleware
 from app.config.settings import get_settings
-from app.utils.logger_config import setup_logger
+from app.services.v1.http_client import init_http_client, close_http_client
+from app.services.v1.provider_router import get_provider_router, close_provider_router
+from app.services.v1.prefetch import get_prefetch_scheduler
+from app.services.v1.circuit_breaker import CLOSED, OPEN, HALF_OPEN, get_circuit_breaker
+from app.services.v1.weather_cache import get_negative_cache, get_weather_cache
+from app.services.v1.response_cache import get_response_cache
+from app.services.v1.admission import get_admission_controller
+from app.services.v1.subscriptions import get_subscription_hub
+from app.services.v1.history import get_history_store
+from app.utils.logger_config import setup_logger, start_logging, stop_logging
+from app.utils.metrics import REGISTRY, CONTENT_TYPE, CallbackGauge
 
 # Load application settings
 settings = get_settings()
@@ -23,11 +37,14 @@ logger = setup_logger("main")
 
 # Apply middleware in specific order
 add_error_handler_middleware(app)  # Handle errors first
+add_admission_middleware(app)      # Global concurrency limit and load shedding
 add_timeout_middleware(app)        # Enforce request timeouts
 add_rate_limit_middleware(app)     # Apply rate limiting
 add_gzip_middleware(app)          # Enable response compression
 add_logging_middleware(app)       # Log requests and responses
 add_cors_middleware(app)          # Add CORS support
+add_metrics_middleware(app)       # Measure every request, including rejections
+add_tracing_middleware(app)       # Server-Timing stage timings and on-demand profiling
 
 # Register weather routes with prefix
 app.include_router(weather_router.router, prefix="/api/v1")
@@ -37,22 +54,96 @@ async def health_check():
     """Check API health status asynchronously."""
     # Log health check request
     logger.info("Health check requested")
-    # Return health status
+    breaker = get_circuit_breaker().stats()
+    # Return health status (degraded while upstream calls are being short-circuited)
     return {
-        "status": "healthy",
+        "status": "healthy" if breaker["state"] == CLOSED else "degraded",
         "environment": settings.environment,
-        "message": "Weather API is running"
+        "message": "Weather API is running",
+        "cache": get_weather_cache().stats(),
+        "negative_cache": get_negative_cache().stats(),
+        "response_cache": get_response_cache().stats(),
+        "admission": get_admission_controller().stats(),
+        "subscriptions": get_subscription_hub().stats(),
+        "history": get_history_store().stats() if settings.history_enabled else {},
+        "circuit_breaker": breaker,
+        "providers": get_provider_router().stats(),
+        "prefetch": get_prefetch_scheduler().stats()
     }
 
+# Export cache counters at scrape time
+REGISTRY.register(CallbackGauge(
+    "weather_cache",
+    "Weather cache size and hit/miss/eviction counters.",
+    lambda: {(key,): value for key, value in get_weather_cache().stats().items()},
+    labels=("stat",)
+))
+REGISTRY.register(CallbackGauge(
+    "response_cache",
+    "Response body cache size, bytes and hit/miss/invalidation/eviction counters.",
+    lambda: {(key,): value for key, value in get_response_cache().stats().items()},
+    labels=("stat",)
+))
+REGISTRY.register(CallbackGauge(
+    "admission",
+    "Adaptive concurrency limit, in-flight and queued requests, and admission/shed counters.",
+    lambda: {(key,): value for key, value in get_admission_controller().stats().items()},
+    labels=("stat",)
+))
+REGISTRY.register(CallbackGauge(
+    "subscriptions",
+    "Subscribed cities, open streams, and refresh/publish/delivery/conflation counters.",
+    lambda: {(key,): value for key, value in get_subscription_hub().stats().items()},
+    labels=("stat",)
+))
+REGISTRY.register(CallbackGauge(
+    "history",
+    "Observation history rows, cities, segments and bytes (all workers), plus this worker's counters.",
+    lambda: {(key,): value for key, value in get_history_store().stats().items()} if settings.history_enabled else {},
+    labels=("stat",)
+))
+REGISTRY.register(CallbackGauge(
+    "upstream_circuit_state",
+    "Upstream circuit breaker state (1 for the current state).",
+    lambda: {(state,): int(get_circuit_breaker().state == state) for state in (CLOSED, OPEN, HALF_OPEN)},
+    labels=("state",)
+))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
+    # Make sure the background log writer is running
+    start_logging()
     # Log application startup
     logger.info("Weather API starting up")
+    # Open the pooled upstream HTTP client
+    await init_http_client()
+    # Build the weather providers (fails fast on a misconfigured provider list)
+    get_provider_router()
+    # Keep the most requested cities warm in the background
+    if settings.prefetch_enabled:
+        get_prefetch_scheduler().start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     # Log application shutdown
     logger.info("Weather API shutting down")
+    # End subscription streams and their refresh loops
+    get_subscription_hub().close()
+    # Stop background prefetching before closing connections
+    await get_prefetch_scheduler().stop()
+    # Drain and close pooled upstream connections
+    await close_provider_router()
+    await close_http_client()
+    # Close the rate limit backend's connections (Redis)
+    await get_rate_limit_backend().close()
+    # Seal this worker's history segment (the files are kept for the other workers)
+    if settings.history_enabled:
+        get_history_store().close()
+    # Flush queued log records and stop the writer thread
+    stop_logging()
 
-
-app = FastAPI()
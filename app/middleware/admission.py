@@ -0,0 +1,58 @@
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Iterable, Optional
+from app.config.settings import get_settings
+from app.services.v1.admission import AdmissionController, get_admission_controller
+from app.utils.logger_config import setup_logger
+from app.utils.tracing import span
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests under the global concurrency limit.
+
+    Requests the controller cannot admit or queue are shed at once with
+    503 and `Retry-After`, before they tie up any upstream capacity.
+    Requests to `priority_paths` (the health check and metrics) bypass the
+    limit, so the service can still be observed while it sheds load.
+    """
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None,
+                 priority_paths: Iterable[str] = ("/",), retry_after: int = 1):
+        self.app = app
+        self.controller = controller or get_admission_controller()
+        self.priority_paths = frozenset(priority_paths)
+        self.retry_after = str(retry_after)
+        # Initialize logger for load shedding
+        self.logger = setup_logger("admission")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.priority_paths:
+            await self.app(scope, receive, send)
+            return
+
+        with span("queue"):
+            admitted = await self.controller.acquire()
+        if not admitted:
+            # Counted in the controller stats; one log line per shed request would flood under overload
+            self.logger.debug("Request shed: %s", scope["path"])
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service overloaded, retry later"},
+                headers={"Retry-After": self.retry_after}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+def add_admission_middleware(app):
+    """Register admission control middleware with the application (if enabled)."""
+    settings = get_settings()
+    if not settings.admission_enabled:
+        return
+    app.add_middleware(
+        AdmissionMiddleware,
+        priority_paths=settings.admission_priority_paths,
+        retry_after=settings.admission_retry_after_seconds
+    )
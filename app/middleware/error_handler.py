@@ -1,36 +1,55 @@
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.utils.logger_config import setup_logger
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    """Middleware for exception handling and logging."""
-    def __init__(self, app):
-        super().__init__(app)
+class ErrorHandlerMiddleware:
+    """ASGI middleware for exception handling and logging."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # Initialize logger for error handling
         self.logger = setup_logger("error_handler")
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
             # Process request and pass to next middleware
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_wrapper)
         except HTTPException as e:
             # Log HTTP-specific exceptions
-            self.logger.error(f"HTTP Exception: {e.status_code} - {e.detail}")
+            self.logger.error("HTTP Exception: %s - %s", e.status_code, e.detail)
+            # Too late to replace a response that is already being sent
+            if response_started:
+                raise
             # Return JSON response with error details
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=e.status_code,
-                content={"detail": e.detail}
+                content={"detail": e.detail},
+                headers=e.headers  # e.g. Retry-After
             )
+            await response(scope, receive, send)
         except Exception as e:
             # Log unexpected exceptions with stack trace
-            self.logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+            self.logger.error("Unhandled exception: %s", e, exc_info=True)
+            if response_started:
+                raise
             # Return generic server error response
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=500,
                 content={"detail": "Internal Server Error"}
             )
+            await response(scope, receive, send)
 
 def add_error_handler_middleware(app):
     """Register error handler middleware with the application."""
@@ -1,4 +1,6 @@
+import logging
 from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Message, Receive, Scope, Send
 from app.utils.logger_config import setup_logger
 
 class CustomGZipMiddleware(GZipMiddleware):
@@ -8,13 +10,21 @@ class CustomGZipMiddleware(GZipMiddleware):
         # Set up logger for GZIP operations
         self.logger = setup_logger("gzip")
 
-    async def dispatch(self, request, call_next):
-        # Process request and get response
-        response = await call_next(request)
-        # Log if response is compressed
-        if response.headers.get("Content-Encoding") == "gzip":
-            self.logger.debug(f"Compressed response for {request.url}")
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Skip the send wrapper entirely unless debug logging is on
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.DEBUG):
+            await super().__call__(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            # Log if response is compressed
+            if message["type"] == "http.response.start":
+                for name, value in message.get("headers", ()):
+                    if name == b"content-encoding" and value == b"gzip":
+                        self.logger.debug("Compressed response for %s", scope["path"])
+            await send(message)
+
+        await super().__call__(scope, receive, send_wrapper)
 
 def add_gzip_middleware(app):
     """Register GZIP middleware with the application."""
@@ -1,39 +1,65 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config.settings import get_settings
 from app.utils.logger_config import setup_logger
+import random
 import time
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging request and response information."""
-    def __init__(self, app):
-        super().__init__(app)
+class LoggingMiddleware:
+    """ASGI middleware for logging request and response information.
+
+    Only a `sample_rate` fraction of requests is logged; server errors are
+    always logged on completion.
+    """
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate  # Fraction of requests to log (0.0 - 1.0)
         # Initialize logger for HTTP events
         self.logger = setup_logger("http_logger")
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Record start time
-        start_time = time.time()
+        start_time = time.perf_counter()
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        method = scope["method"]
+        path = scope["path"]
         
         # Log incoming request details
-        self.logger.info(
-            f"Incoming request: {request.method} {request.url} "
-            f"from {request.client.host}"
-        )
-        
-        # Execute request processing
-        response = await call_next(request)
-        
-        # Compute request duration
-        duration = time.time() - start_time
-        
-        # Log response details
-        self.logger.info(
-            f"Completed request: {request.method} {request.url} "
-            f"status={response.status_code} duration={duration:.3f}s"
-        )
+        if sampled:
+            client = scope.get("client")
+            self.logger.info(
+                "Incoming request: %s %s from %s",
+                method, path, client[0] if client else "unknown",
+                extra={"method": method, "path": path, "query": scope["query_string"].decode("latin-1")}
+            )
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                # Capture the response status
+                status_code = message["status"]
+            await send(message)
         
-        return response
+        try:
+            # Execute request processing
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sampled or status_code >= 500:
+                # Compute request duration
+                duration = time.perf_counter() - start_time
+                # Log response details
+                self.logger.info(
+                    "Completed request: %s %s status=%s duration=%.3fs",
+                    method, path, status_code, duration,
+                    extra={"method": method, "path": path, "status": status_code,
+                           "duration_ms": round(duration * 1000, 3)}
+                )
 
 def add_logging_middleware(app):
     """Register logging middleware with the application."""
-    app.add_middleware(LoggingMiddleware)
\ No newline at end of file
+    app.add_middleware(LoggingMiddleware, sample_rate=get_settings().log_sample_rate)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+# Route label for requests that never reached a route (404s, rejections)
+UNMATCHED_ROUTE = "<unmatched>"
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and in-flight requests."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                # Capture the response status
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; use its template
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                (route.path if route is not None else UNMATCHED_ROUTE, scope["method"], status_code)
+            )
+
+def add_metrics_middleware(app):
+    """Register metrics middleware with the application."""
+    app.add_middleware(MetricsMiddleware)
\ No newline at end of file
@@ -1,47 +1,113 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-import time
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from functools import lru_cache
+from typing import Dict, Optional
+from app.config.settings import get_settings
+from app.middleware.rate_limit_backends import (
+    RateLimitBackend,
+    InMemoryRateLimitBackend,
+    RedisRateLimitBackend
+)
 from app.utils.logger_config import setup_logger
+from app.utils.metrics import RATE_LIMIT_BACKEND_ERRORS, RATE_LIMIT_REJECTIONS
+from app.utils.tracing import span
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to implement rate limiting based on client IP."""
-    def __init__(self, app, max_requests=100, window=60):
-        super().__init__(app)
+class RateLimitMiddleware:
+    """ASGI middleware to implement sliding-window rate limiting per client.
+
+    Clients are identified by `key_header` when set and present, otherwise
+    by IP. Requests under a prefix in `route_limits` are counted in a
+    separate bucket with that limit; all other requests share the default
+    bucket, whose limit can be overridden per client via `key_limits`.
+    """
+    def __init__(self, app: ASGIApp, max_requests=100, window=60,
+                 backend: Optional[RateLimitBackend] = None,
+                 route_limits: Optional[Dict[str, int]] = None,
+                 key_limits: Optional[Dict[str, int]] = None,
+                 key_header: Optional[str] = None):
+        self.app = app
         self.max_requests = max_requests  # Maximum allowed requests
         self.window = window  # Time window in seconds
-        self.request_counts = defaultdict(list)  # Track requests per IP
+        # Counter storage (per-process unless a shared backend is given)
+        self.backend = backend or InMemoryRateLimitBackend(idle_seconds=window * 2)
+        # Longest prefix first so the most specific route limit wins
+        self.route_limits = sorted((route_limits or {}).items(), key=lambda item: -len(item[0]))
+        self.key_limits = key_limits or {}  # Per-client overrides of the default limit
+        # Optional header identifying the client (ASGI header names are lower-case bytes)
+        self.key_header = key_header.lower().encode("latin-1") if key_header else None
         # Initialize logger for rate limiting
         self.logger = setup_logger("rate_limit")
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Remove requests outside the time window
-        self.request_counts[client_ip] = [
-            t for t in self.request_counts[client_ip]
-            if current_time - t < self.window
-        ]
-        
+    def _client_key(self, scope: Scope) -> str:
+        """Identify the client by header (if configured) or IP."""
+        if self.key_header:
+            for name, value in scope["headers"]:
+                if name == self.key_header and value:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _bucket(self, path: str, client_key: str):
+        """Return (bucket name, limit) for a request path and client."""
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return "*", self.key_limits.get(client_key, self.max_requests)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_key = self._client_key(scope)
+        bucket, limit = self._bucket(scope["path"], client_key)
+
+        # Count the request (O(1) per call)
+        with span("ratelimit"):
+            try:
+                result = await self.backend.hit(f"{bucket}|{client_key}", limit, self.window)
+            except Exception as e:
+                # Fail open: an unreachable shared backend must not turn every request into a 500
+                RATE_LIMIT_BACKEND_ERRORS.inc()
+                self.logger.warning("Rate limit backend failed, request not limited: %s", e)
+                result = None
+
         # Enforce rate limit
-        if len(self.request_counts[client_ip]) >= self.max_requests:
+        if result is not None and not result.allowed:
+            RATE_LIMIT_REJECTIONS.inc((bucket,))
             # Log rate limit violation
-            self.logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            raise HTTPException(
+            self.logger.warning("Rate limit exceeded for client: %s (%s)", client_key, bucket)
+            response = JSONResponse(
                 status_code=429,
-                detail="Too Many Requests"
+                content={"detail": "Too Many Requests"},
+                headers={"Retry-After": str(result.retry_after)}
             )
-        
-        # Record current request timestamp
-        self.request_counts[client_ip].append(current_time)
-        # Log current request count
-        self.logger.debug(f"Request count for {client_ip}: {len(self.request_counts[client_ip])}")
+            await response(scope, receive, send)
+            return
         
         # Process request
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
+
+@lru_cache()
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Return the process-wide rate limit counter storage chosen in settings."""
+    settings = get_settings()
+    if settings.rate_limit_backend == "redis":
+        return RedisRateLimitBackend.from_url(settings.rate_limit_redis_url)
+    return InMemoryRateLimitBackend(
+        max_keys=settings.rate_limit_max_keys,
+        idle_seconds=settings.rate_limit_window_seconds * 2
+    )
 
 def add_rate_limit_middleware(app):
     """Register rate limit middleware with the application."""
-    app.add_middleware(RateLimitMiddleware)
\ No newline at end of file
+    settings = get_settings()
+    app.add_middleware(
+        RateLimitMiddleware,
+        max_requests=settings.rate_limit_max_requests,
+        window=settings.rate_limit_window_seconds,
+        backend=get_rate_limit_backend(),
+        route_limits=settings.rate_limit_route_limits,
+        key_limits=settings.rate_limit_key_limits,
+        key_header=settings.rate_limit_key_header or None
+    )
\ No newline at end of file
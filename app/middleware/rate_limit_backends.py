@@ -0,0 +1,130 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple
+
+class RateLimitResult(NamedTuple):
+    """Outcome of counting one request against a limit."""
+    allowed: bool
+    remaining: int  # Requests left in the current window
+    retry_after: int  # Seconds to wait before retrying (0 when allowed)
+
+def _sliding_window(previous: int, current: int, elapsed: float, limit: int, window: float) -> RateLimitResult:
+    """Apply the sliding-window counter rule.
+
+    The request rate over the last `window` seconds is estimated as the
+    current window's count plus the previous window's count weighted by
+    how much of it still overlaps the sliding window.
+    """
+    estimate = previous * (1 - elapsed / window) + current
+    if estimate + 1 > limit:
+        return RateLimitResult(False, 0, max(1, math.ceil(window - elapsed)))
+    return RateLimitResult(True, int(limit - estimate - 1), 0)
+
+class RateLimitBackend(ABC):
+    """Storage for sliding-window request counters."""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Count one request for `key` and report whether it is allowed."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+class _Counter:
+    """Per-key counters for the current and previous fixed window."""
+    __slots__ = ("window_index", "current", "previous", "last_seen")
+
+    def __init__(self, window_index: int):
+        self.window_index = window_index
+        self.current = 0
+        self.previous = 0
+        self.last_seen = 0.0
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process backend with O(1) updates and idle-key eviction."""
+    def __init__(self, max_keys: int = 100_000, idle_seconds: float = 120.0):
+        self.max_keys = max_keys  # Hard cap on tracked keys
+        self.idle_seconds = idle_seconds  # Keys unseen this long are dropped
+        self._counters: "OrderedDict[str, _Counter]" = OrderedDict()  # Least recently seen first
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.time()
+        window_index = int(now // window)
+
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _Counter(window_index)
+        else:
+            self._counters.move_to_end(key)
+            # Roll the fixed windows forward
+            if window_index != counter.window_index:
+                counter.previous = counter.current if window_index == counter.window_index + 1 else 0
+                counter.current = 0
+                counter.window_index = window_index
+        counter.last_seen = now
+        self._evict(now)
+
+        result = _sliding_window(counter.previous, counter.current, now - window_index * window, limit, window)
+        if result.allowed:
+            counter.current += 1
+        return result
+
+    def _evict(self, now: float) -> None:
+        """Drop idle keys from the cold end (amortized O(1))."""
+        counters = self._counters
+        while counters:
+            oldest = next(iter(counters.values()))
+            if len(counters) <= self.max_keys and now - oldest.last_seen < self.idle_seconds:
+                break
+            counters.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Backend shared by all workers through Redis.
+
+    Each fixed window is one integer key (`<prefix><key>:<window index>`)
+    that expires two windows after its last hit, so idle clients cost
+    nothing. A request is counted, the expiry set and the previous window
+    read in one MULTI/EXEC round trip, so a counter never exists without
+    its expiry. A rejected request is uncounted with a second call, so, as
+    in memory, only allowed requests count. The client only needs
+    `pipeline()` (with `incr`, `expire` and `get`) and an async `decr`, so
+    any compatible stand-in can replace `redis.asyncio.Redis`.
+    """
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client  # redis.asyncio.Redis or compatible object
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "ratelimit:") -> "RedisRateLimitBackend":
+        """Connect using the optional 'redis' package."""
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' package is required for the redis rate limit backend") from e
+        return cls(redis.from_url(url), prefix=prefix)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.time()
+        window_index = int(now // window)
+        current_key = f"{self.prefix}{key}:{window_index}"
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            current, _, previous = await (
+                pipe.incr(current_key)
+                .expire(current_key, math.ceil(window * 2))  # Outlive the next window
+                .get(f"{self.prefix}{key}:{window_index - 1}")
+                .execute()
+            )
+
+        result = _sliding_window(int(previous or 0), current - 1, now - window_index * window, limit, window)
+        if not result.allowed:
+            await self.client.decr(current_key)
+        return result
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -1,33 +1,183 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, Optional
 import asyncio
+from app.config.settings import get_settings
+from app.utils.deadline import Deadline, reset_deadline, set_deadline
 from app.utils.logger_config import setup_logger
+from app.utils.metrics import REQUEST_DISCONNECTS, REQUEST_TIMEOUTS
 
-class TimeoutMiddleware(BaseHTTPMiddleware):
-    """Middleware to apply request time limits."""
-    def __init__(self, app, timeout_seconds=10):
-        super().__init__(app)
+# Requests still running after this many seconds start watching for a
+# client disconnect; quicker ones never pay for the watcher task
+_WATCH_DELAY = 0.02
+
+# Status recorded for requests whose client went away (nginx's "Client Closed Request")
+CLIENT_CLOSED_REQUEST = 499
+
+def _has_body(scope: Scope) -> bool:
+    """Whether the request announces a body (Content-Length > 0 or chunked)."""
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            return value.strip() != b"0"
+        if name == b"transfer-encoding":
+            return True
+    return False
+
+class TimeoutMiddleware:
+    """ASGI middleware to apply request deadlines.
+
+    Each request gets `timeout_seconds`, or the limit of the longest prefix
+    in `route_limits` that matches its path; a client may ask for less with
+    the `header` (seconds). The limit covers the time until the response
+    starts; streamed bodies (such as batch results) may keep flowing after
+    that.
+
+    With `propagate` the deadline is made current for the request, so
+    upstream calls are bounded by the time left, and a client that
+    disconnects before the response starts ends the request straight away,
+    cancelling the work being done for it.
+    """
+    def __init__(self, app: ASGIApp, timeout_seconds=10, route_limits: Optional[Dict[str, float]] = None,
+                 header: Optional[str] = None, propagate: bool = True):
+        self.app = app
         self.timeout_seconds = timeout_seconds  # Timeout duration in seconds
+        # Longest prefix first so the most specific route limit wins
+        self.route_limits = sorted((route_limits or {}).items(), key=lambda item: -len(item[0]))
+        # ASGI header names are lower-case bytes
+        self.header = header.lower().encode("latin-1") if header else None
+        self.propagate = propagate
         # Initialize logger for timeout events
         self.logger = setup_logger("timeout")
 
-    async def dispatch(self, request: Request, call_next):
+    def _timeout(self, scope: Scope) -> float:
+        """Seconds allowed for a request: the route limit, shortened by the client's header."""
+        path = scope["path"]
+        timeout = self.timeout_seconds
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                timeout = limit
+                break
+        if self.header:
+            for name, value in scope["headers"]:
+                if name == self.header:
+                    try:
+                        requested = float(value)
+                    except ValueError:
+                        break
+                    if requested > 0:
+                        timeout = min(timeout, requested)
+                    break
+        return timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout_seconds = self._timeout(scope)
+        deadline = Deadline(timeout_seconds)
+        token = set_deadline(deadline) if self.propagate else None
+        response_started = False
+        body_read = not _has_body(scope)
+        receiving = False  # The app is waiting in receive() itself
+        disconnected = asyncio.Event()
+        watcher: Optional[asyncio.Task] = None
+        watch_timer: Optional[asyncio.TimerHandle] = None
+        pending = []  # Messages the watcher read before the app asked for them
+        arrived = asyncio.Event()  # Set while pending has messages, or on disconnect
+
         try:
             # Execute request with timeout constraint
-            response = await asyncio.wait_for(
-                call_next(request),
-                timeout=self.timeout_seconds
-            )
-            return response
-        except asyncio.TimeoutError:
-            # Log timeout occurrence
-            self.logger.error(f"Request timeout after {self.timeout_seconds}s: {request.url}")
-            # Raise timeout exception
-            raise HTTPException(
-                status_code=504,
-                detail="Request Timeout"
-            )
+            async with asyncio.timeout(timeout_seconds) as scope_deadline:
+                async def watch_disconnect():
+                    # Sole reader of `receive` from now on
+                    while True:
+                        message = await receive()
+                        if message["type"] == "http.disconnect":
+                            disconnected.set()
+                            arrived.set()
+                            if not response_started:
+                                # End the request now (handled below as a disconnect)
+                                scope_deadline.reschedule(asyncio.get_running_loop().time())
+                            return
+                        pending.append(message)
+                        arrived.set()
+
+                def start_watcher():
+                    nonlocal watcher, watch_timer
+                    watch_timer = None
+                    if watcher is None and body_read and not receiving and not response_started:
+                        watcher = asyncio.ensure_future(watch_disconnect())
+
+                async def receive_wrapper() -> Message:
+                    nonlocal body_read, receiving
+                    if watcher is not None:
+                        while not pending:
+                            if disconnected.is_set():
+                                return {"type": "http.disconnect"}
+                            await arrived.wait()
+                        message = pending.pop(0)
+                        if not pending:
+                            arrived.clear()
+                        return message
+                    receiving = True
+                    try:
+                        message = await receive()
+                    finally:
+                        receiving = False
+                    if message["type"] == "http.request" and not message.get("more_body"):
+                        body_read = True
+                        if self.propagate and watch_timer is None:
+                            start_watcher()  # Already running long enough
+                    return message
+
+                async def send_wrapper(message: Message):
+                    nonlocal response_started
+                    if message["type"] == "http.response.start":
+                        # Response is on its way: lift the deadline
+                        response_started = True
+                        scope_deadline.reschedule(None)
+                        deadline.lift()
+                    await send(message)
+
+                if self.propagate:
+                    # Fast requests (cache hits) finish before they would start watching
+                    watch_timer = asyncio.get_running_loop().call_later(_WATCH_DELAY, start_watcher)
+                await self.app(scope, receive_wrapper, send_wrapper)
+        except TimeoutError:
+            # Only handle timeouts raised by our own deadline
+            if not scope_deadline.expired() or response_started:
+                raise
+            if disconnected.is_set():
+                REQUEST_DISCONNECTS.inc()
+                self.logger.info("Client disconnected, request cancelled: %s", scope["path"])
+                # Nobody will read this; it gives the outer middleware a status to record
+                response = JSONResponse(status_code=CLIENT_CLOSED_REQUEST, content={"detail": "Client Closed Request"})
+            else:
+                REQUEST_TIMEOUTS.inc()
+                # Log timeout occurrence
+                self.logger.error("Request timeout after %ss: %s", timeout_seconds, scope["path"])
+                # Return timeout response
+                response = JSONResponse(
+                    status_code=504,
+                    content={"detail": "Request Timeout"}
+                )
+            await response(scope, receive, send)
+        finally:
+            if watch_timer is not None:
+                watch_timer.cancel()
+            if watcher is not None:
+                watcher.cancel()
+            if token is not None:
+                reset_deadline(token)
 
 def add_timeout_middleware(app):
     """Add timeout middleware with the application."""
-    app.add_middleware(TimeoutMiddleware)
\ No newline at end of file
+    settings = get_settings()
+    app.add_middleware(
+        TimeoutMiddleware,
+        timeout_seconds=settings.request_timeout_seconds,
+        route_limits=settings.request_timeout_route_limits,
+        header=settings.request_timeout_header or None,
+        propagate=settings.deadline_propagation_enabled
+    )
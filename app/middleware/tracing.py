@@ -0,0 +1,118 @@
+import asyncio
+import cProfile
+import hmac
+import os
+import re
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+from app.config.settings import get_settings
+from app.utils.logger_config import setup_logger
+from app.utils.tracing import Trace, reset_trace, set_trace
+
+# Response header naming the saved profile of a profiled request
+PROFILE_FILE_HEADER = "X-Profile-File"
+
+class TracingMiddleware:
+    """ASGI middleware reporting stage timings and profiling requests on demand.
+
+    With `server_timing` every request carries a trace that the span
+    helpers (rate limit, admission queue, route handler, weather fetch,
+    upstream call, rendering) add to, and the timings so far are sent in a
+    `Server-Timing` header when the response starts.
+
+    A request whose `profiling_header` carries `profiling_token` runs under
+    cProfile until its response is complete. The profile is written to
+    `profiling_dir` and its file name returned in `X-Profile-File`. cProfile
+    sees everything the event loop runs meanwhile, including other
+    requests, and only one request is profiled at a time (others asking
+    meanwhile are served without a profile).
+    """
+    def __init__(self, app: ASGIApp, server_timing: bool = True, profiling_token: str = "",
+                 profiling_header: str = "X-Profile", profiling_dir: str = "/tmp/weather-profiles"):
+        self.app = app
+        self.server_timing = server_timing
+        self.profiling_token = profiling_token.encode("latin-1")
+        # ASGI header names are lower-case bytes
+        self.profiling_header = profiling_header.lower().encode("latin-1")
+        self.profiling_dir = profiling_dir
+        self._profiling = False  # cProfile profilers cannot overlap
+        # Initialize logger for profiling
+        self.logger = setup_logger("tracing")
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        """Whether the request carries the profiling token."""
+        if not self.profiling_token:
+            return False
+        for name, value in scope["headers"]:
+            if name == self.profiling_header:
+                return hmac.compare_digest(value, self.profiling_token)
+        return False
+
+    def _profile_path(self, scope: Scope) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-")[:60] or "root"
+        return os.path.join(
+            self.profiling_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{scope['method']}-{slug}.prof"
+        )
+
+    def _save_profile(self, profiler: cProfile.Profile, path: str) -> None:
+        os.makedirs(self.profiling_dir, exist_ok=True)
+        profiler.dump_stats(path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler: Optional[cProfile.Profile] = None
+        if self._wants_profile(scope):
+            if self._profiling:
+                self.logger.info("Profile skipped, another request is being profiled: %s", scope["path"])
+            else:
+                profiler = cProfile.Profile()
+        if not self.server_timing and profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace() if self.server_timing else None
+        token = set_trace(trace)
+        profile_path = self._profile_path(scope) if profiler is not None else None
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if trace is not None:
+                    headers.append("Server-Timing", trace.server_timing())
+                if profile_path is not None:
+                    headers.append(PROFILE_FILE_HEADER, os.path.basename(profile_path))
+            await send(message)
+
+        if profiler is not None:
+            self._profiling = True
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_trace(token)
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                try:
+                    await asyncio.to_thread(self._save_profile, profiler, profile_path)
+                    self.logger.info("Profile of %s saved to %s", scope["path"], profile_path)
+                except OSError as e:
+                    self.logger.error("Could not save profile %s: %s", profile_path, e)
+
+def add_tracing_middleware(app):
+    """Register tracing and profiling middleware with the application (if either is enabled)."""
+    settings = get_settings()
+    if not settings.tracing_enabled and not settings.profiling_token:
+        return
+    app.add_middleware(
+        TracingMiddleware,
+        server_timing=settings.tracing_enabled,
+        profiling_token=settings.profiling_token,
+        profiling_header=settings.profiling_header,
+        profiling_dir=settings.profiling_dir
+    )
@@ -1,5 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Annotated, List, Literal, Optional
+
+# City names: letters, spaces, commas, and hyphens
+CITY_PATTERN = r"^[a-zA-Z\s,-]+$"
+# Upper bound on cities accepted by a single batch request
+MAX_BATCH_CITIES = 500
 
 class WeatherRequest(BaseModel):
     """Schema defining the weather request payload."""
@@ -7,11 +12,24 @@ class WeatherRequest(BaseModel):
         ...,
         description="Name of the city for weather data retrieval",
         min_length=1,
-        pattern=r"^[a-zA-Z\s,-]+$"  # Restricts to letters, spaces, commas, and hyphens
+        pattern=CITY_PATTERN  # Restricts to letters, spaces, commas, and hyphens
+    )
+    output_format: Optional[Literal["json", "xml"]] = Field(
+        None,
+        description="Response format, either 'json' or 'xml'; negotiated from Accept when omitted"
     )
-    output_format: Literal["json", "xml"] = Field(
+
+class WeatherBatchRequest(BaseModel):
+    """Schema defining the batch weather request payload."""
+    cities: List[Annotated[str, Field(min_length=1, pattern=CITY_PATTERN)]] = Field(
         ...,
-        description="Response format, either 'json' or 'xml'"  # Fixed: removed extra quote
+        description="City names for weather data retrieval (duplicates are fetched once)",
+        min_length=1,
+        max_length=MAX_BATCH_CITIES
+    )
+    output_format: Optional[Literal["json", "xml"]] = Field(
+        None,
+        description="Response format, either 'json' (NDJSON stream) or 'xml'; negotiated from Accept when omitted"
     )
 
 class WeatherResponse(BaseModel):
@@ -40,4 +58,48 @@ class WeatherResponse(BaseModel):
     class Config:
         """Pydantic configuration for the response model."""
         populate_by_name = True  # Allows population by field name
-        populate_by_alias = True  # Enables serialization by alias
\ No newline at end of file
+        populate_by_alias = True  # Enables serialization by alias
+
+
+class CitySuggestion(BaseModel):
+    """Schema defining one autocomplete suggestion."""
+    name: str = Field(..., description="Canonical city name")
+    country: str = Field(..., description="ISO 3166-1 alpha-2 country code")
+    label: str = Field(..., description="Display text, usable as the city in weather requests")
+    lat: float = Field(..., description="City latitude coordinate")
+    lon: float = Field(..., description="City longitude coordinate")
+
+class CityHistory(BaseModel):
+    """Schema defining one city's temperature summary over a time range."""
+    query: str = Field(..., description="City as requested")
+    city: Optional[str] = Field(None, description="City name as last reported upstream")
+    count: int = Field(..., description="Observations in the range")
+    min: Optional[float] = Field(None, description="Lowest temperature (Celsius)")
+    max: Optional[float] = Field(None, description="Highest temperature (Celsius)")
+    mean: Optional[float] = Field(None, description="Mean temperature (Celsius)")
+    first: Optional[float] = Field(None, description="Earliest temperature in the range (Celsius)")
+    last: Optional[float] = Field(None, description="Latest temperature in the range (Celsius)")
+    first_at: Optional[int] = Field(None, description="Observation time of the earliest value (Unix seconds)")
+    last_at: Optional[int] = Field(None, description="Observation time of the latest value (Unix seconds)")
+    trend_per_hour: Optional[float] = Field(None, description="Least-squares temperature slope (Celsius per hour)")
+
+class HistoryPoint(BaseModel):
+    """Schema defining one resampled interval of a city's history."""
+    time: int = Field(..., description="Interval start (Unix seconds)")
+    count: int = Field(..., description="Observations in the interval")
+    min: float = Field(..., description="Lowest temperature (Celsius)")
+    max: float = Field(..., description="Highest temperature (Celsius)")
+    mean: float = Field(..., description="Mean temperature (Celsius)")
+
+class CitySeries(BaseModel):
+    """Schema defining one city's resampled temperature series."""
+    query: str = Field(..., description="City as requested")
+    city: Optional[str] = Field(None, description="City name as last reported upstream")
+    points: List[HistoryPoint] = Field(..., description="Intervals that have observations, oldest first")
+
+class WarmCity(BaseModel):
+    """Schema defining one city kept warm by the prefetch scheduler."""
+    city: str = Field(..., description="City as most recently requested")
+    key: str = Field(..., description="Cache key the city resolves to")
+    hits: int = Field(..., description="Estimated recent request count (decays over time)")
+    fresh_for_seconds: Optional[float] = Field(None, description="Seconds until the cached entry goes stale")
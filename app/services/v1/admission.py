@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import math
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Optional
+from app.config.settings import get_settings
+from app.utils.deadline import time_remaining
+
+# Limit algorithms
+GRADIENT = "gradient"  # Shrink as recent latency rises above its long-term baseline
+AIMD = "aimd"  # Grow by one per fast sample, cut by a ratio on a slow one or a timeout
+ALGORITHMS = (GRADIENT, AIMD)
+
+class AimdLimit:
+    """Additive-increase, multiplicative-decrease concurrency limit.
+
+    Each upstream sample faster than `latency_threshold` raises the limit
+    by one (only while at least half of it is in use, so an idle service
+    does not inflate it); a slower sample or a timeout multiplies it by
+    `backoff_ratio`.
+    """
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_threshold: float,
+                 backoff_ratio: float = 0.9):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+
+    def update(self, latency: float, in_flight: int, dropped: bool) -> None:
+        if dropped or latency > self.latency_threshold:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def stats(self) -> dict:
+        return {}
+
+class GradientLimit:
+    """Latency-gradient concurrency limit (after Netflix's Gradient2).
+
+    A short-term latency average is compared with the baseline, the lowest
+    latency seen over the last one to two `window`s of samples (what a call
+    costs without queueing). While recent latency stays within `tolerance`
+    times the baseline the limit grows by its square root (the queue it may
+    build); beyond that it shrinks in proportion, by at most half per
+    update, and a timeout shrinks it by the most. `smoothing` damps each
+    change.
+    """
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float = 2.0,
+                 smoothing: float = 0.2, short_alpha: float = 0.1, window: int = 500):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.short_alpha = short_alpha  # EWMA weight: ~10 samples
+        self.window = window
+        self.short_latency = 0.0
+        self._window_min = math.inf  # Lowest latency in the current window
+        self._previous_min = math.inf  # ... and in the one before
+        self._samples = 0
+
+    @property
+    def baseline(self) -> float:
+        return min(self._window_min, self._previous_min)
+
+    def update(self, latency: float, in_flight: int, dropped: bool) -> None:
+        if dropped:
+            # How long a dropped call would have taken is unknown: back off all the way
+            gradient = 0.5
+        else:
+            if not self.short_latency:
+                self.short_latency = latency
+            self.short_latency += self.short_alpha * (latency - self.short_latency)
+            self._window_min = min(self._window_min, latency)
+            self._samples += 1
+            if self._samples >= self.window:
+                # Forget old minima, so the baseline follows an upstream that got slower
+                self._previous_min, self._window_min, self._samples = self._window_min, math.inf, 0
+            if in_flight * 2 < self.limit:
+                return  # Mostly idle: these samples say nothing about a larger limit
+            gradient = max(0.5, min(1.0, self.tolerance * self.baseline / self.short_latency))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit += self.smoothing * (target - self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+
+    def stats(self) -> dict:
+        baseline = self.baseline
+        return {
+            "short_latency_ms": round(self.short_latency * 1000, 2),
+            "baseline_latency_ms": round(baseline * 1000, 2) if baseline != math.inf else 0
+        }
+
+class AdmissionController:
+    """Global admission control: an adaptive concurrency limit with a bounded queue.
+
+    Requests beyond the limit wait in a queue of at most `max_queue` for up
+    to `queue_timeout` seconds (less if their deadline is nearer). A request that finds the queue full, or whose wait
+    runs out, is shed. The limit adapts to upstream latency samples passed
+    to observe().
+    """
+    def __init__(self, limit, max_queue: int, queue_timeout: float):
+        self.limit = limit  # AimdLimit or GradientLimit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._queue: Deque[asyncio.Future] = deque()  # Waiters, oldest first
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.queue_timeouts = 0
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit.limit))
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False means the request is shed."""
+        if self.in_flight < self._capacity() and not self._queue:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._queue) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        timeout = self.queue_timeout
+        remaining = time_remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        self.queued += 1
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                # release() or observe() may already have dropped it as done
+                with contextlib.suppress(ValueError):
+                    self._queue.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.queue_timeouts += 1
+            self.shed += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pop the waiter to admit next: the oldest, or the newest once the queue backs up.
+
+        Past a limit's worth of waiters, first come first served would only
+        admit requests that have already waited out most of their time
+        (adaptive LIFO): the newest are served while the stale ones time out.
+        """
+        while self._queue:
+            waiter = self._queue.pop() if len(self._queue) > self._capacity() else self._queue.popleft()
+            if not waiter.done():
+                return waiter
+        return None
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to a waiter if the limit allows."""
+        if self.in_flight <= self._capacity():
+            waiter = self._next_waiter()
+            if waiter is not None:
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def observe(self, latency: float, dropped: bool = False) -> None:
+        """Feed an upstream latency sample (dropped: it timed out) to the limit."""
+        self.limit.update(latency, self.in_flight, dropped)
+        # A raised limit admits waiters without waiting for a release
+        while self.in_flight < self._capacity():
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            waiter.set_result(None)
+            self.in_flight += 1
+
+    def stats(self) -> dict:
+        """Return the limit, occupancy and admission counters for the health check."""
+        return {
+            "limit": round(self.limit.limit, 2),
+            "in_flight": self.in_flight,
+            "queue": len(self._queue),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "queue_timeouts": self.queue_timeouts,
+            **self.limit.stats()
+        }
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller built from settings."""
+    settings = get_settings()
+    if settings.admission_algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown admission algorithm: {settings.admission_algorithm}")
+    if settings.admission_algorithm == AIMD:
+        limit = AimdLimit(
+            settings.admission_initial_limit, settings.admission_min_limit, settings.admission_max_limit,
+            latency_threshold=settings.admission_aimd_latency_seconds
+        )
+    else:
+        limit = GradientLimit(
+            settings.admission_initial_limit, settings.admission_min_limit, settings.admission_max_limit,
+            tolerance=settings.admission_latency_tolerance
+        )
+    return AdmissionController(
+        limit,
+        max_queue=settings.admission_max_queue,
+        queue_timeout=settings.admission_queue_timeout_seconds
+    )
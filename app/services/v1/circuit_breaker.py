@@ -0,0 +1,93 @@
+import math
+import time
+from functools import lru_cache
+from app.config.settings import get_settings
+
+# Breaker states reported by CircuitBreaker.state
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for the upstream API.
+
+    CLOSED lets every call through and counts consecutive failures. After
+    `failure_threshold` of them the breaker OPENs and rejects calls for
+    `recovery_seconds`. It then turns HALF_OPEN and lets one probe call
+    through: success closes it, failure opens it again. A probe that never
+    reports back (e.g. it was cancelled) is replaced after another
+    `recovery_seconds`.
+    """
+    def __init__(self, failure_threshold: int, recovery_seconds: float):
+        self.failure_threshold = failure_threshold  # Consecutive failures that open the breaker
+        self.recovery_seconds = recovery_seconds  # Seconds to stay open before probing
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_until = 0.0  # A probe is in flight until this time
+        # Counters reported through stats()
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._probe_until = 0.0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go upstream now."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        now = time.monotonic()
+        if state == HALF_OPEN and now >= self._probe_until:
+            # Let a single probe through
+            self._probe_until = now + self.recovery_seconds
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self.trips += 1
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker will try upstream again (0 when closed)."""
+        state = self.state
+        if state == CLOSED:
+            return 0
+        if state == OPEN:
+            remaining = self._opened_at + self.recovery_seconds - time.monotonic()
+        else:
+            remaining = self._probe_until - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def stats(self) -> dict:
+        """Return the breaker state and its counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_seconds": self.recovery_seconds,
+            "retry_after": self.retry_after(),
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
+@lru_cache()
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide upstream circuit breaker built from settings."""
+    settings = get_settings()
+    return CircuitBreaker(
+        failure_threshold=settings.circuit_failure_threshold,
+        recovery_seconds=settings.circuit_recovery_seconds
+    )
@@ -0,0 +1,200 @@
+import csv
+import os
+from array import array
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.config.settings import get_settings
+from app.services.v1.weather_cache import normalize_city
+
+# Bundled data: a few hundred major cities and the countries they belong to
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+CITIES_PATH = os.path.join(DATA_DIR, "cities.csv")
+COUNTRIES_PATH = os.path.join(DATA_DIR, "countries.csv")
+
+# Upper bound on index keys scanned for one autocomplete prefix
+_MAX_PREFIX_SCAN = 2000
+
+class Location(NamedTuple):
+    """A resolved gazetteer entry."""
+    name: str
+    country: str  # ISO 3166-1 alpha-2 code
+    lat: float
+    lon: float
+    population: int
+
+    @property
+    def key(self) -> str:
+        """Canonical cache key, e.g. "bengaluru, in"."""
+        return f"{self.name}, {self.country}".casefold()
+
+    @property
+    def query(self) -> str:
+        """Unambiguous upstream query ("lat,lon")."""
+        return f"{self.lat},{self.lon}"
+
+class Gazetteer:
+    """Array-backed city index with exact lookup and prefix/fuzzy suggestions.
+
+    Coordinates and populations live in flat arrays indexed by city id.
+    Every normalized name and alias maps to the ids it names, ordered by
+    population, and the same keys are kept sorted so prefix queries are a
+    bisect plus a short scan.
+    """
+    def __init__(self, rows: Iterable[Tuple[str, str, float, float, int, Iterable[str]]],
+                 countries: Dict[str, str], fuzzy_cutoff: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff  # Minimum similarity for a typo to be suggested
+        self._countries = countries  # Normalized code/name/alias -> country code
+        self._names: List[str] = []
+        self._country_codes: List[str] = []
+        self._lat = array("d")
+        self._lon = array("d")
+        self._population = array("q")
+        ids_by_key: Dict[str, List[int]] = {}
+
+        for name, country, lat, lon, population, aliases in rows:
+            city_id = len(self._names)
+            self._names.append(name)
+            self._country_codes.append(country.upper())
+            self._lat.append(lat)
+            self._lon.append(lon)
+            self._population.append(population)
+            for alias in {normalize_city(name), *(normalize_city(a) for a in aliases)}:
+                if alias:
+                    ids_by_key.setdefault(alias, []).append(city_id)
+
+        # Most populous first, so the first id is the default for a bare name
+        population_of = self._population.__getitem__
+        self._index: Dict[str, Tuple[int, ...]] = {
+            key: tuple(sorted(ids, key=population_of, reverse=True)) for key, ids in ids_by_key.items()
+        }
+        self._keys: List[str] = sorted(self._index)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def location(self, city_id: int) -> Location:
+        return Location(
+            self._names[city_id], self._country_codes[city_id],
+            self._lat[city_id], self._lon[city_id], self._population[city_id]
+        )
+
+    def country_code(self, qualifier: str) -> Optional[str]:
+        """Map a country code, name or alias to its code."""
+        return self._countries.get(normalize_city(qualifier))
+
+    def resolve(self, city: str) -> Optional[Location]:
+        """Resolve free text like "bangalore, india" to a single location.
+
+        The first comma-separated part is the city, the last one (if any)
+        a country. Only exact names and aliases resolve; unknown countries
+        and unknown names (typos included) resolve to None, so the city is
+        left to the upstream provider's own lookup rather than replaced by
+        a different city that happens to be spelt alike. Typos are only
+        offered as suggestions (see `autocomplete`).
+        """
+        parts = normalize_city(city).split(", ")
+        name = parts[0]
+        country = None
+        if len(parts) > 1:
+            country = self.country_code(parts[-1])
+            if country is None:
+                return None
+
+        for city_id in self._index.get(name, ()):
+            if country is None or self._country_codes[city_id] == country:
+                return self.location(city_id)
+        return None
+
+    def _fuzzy_keys(self, name: str) -> List[str]:
+        """Return index keys similar to a possibly misspelt name, closest first."""
+        if not name:
+            return []
+        # Only keys with the same first letter are compared
+        start = bisect_left(self._keys, name[0])
+        matcher = SequenceMatcher(b=name, autojunk=False)
+        scored = []
+        for key in self._keys[start:]:
+            if key[0] != name[0]:
+                break
+            matcher.set_seq1(key)
+            if matcher.real_quick_ratio() < self.fuzzy_cutoff or matcher.quick_ratio() < self.fuzzy_cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= self.fuzzy_cutoff:
+                scored.append((-score, key))
+        return [key for _, key in sorted(scored)]
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Location]:
+        """Return up to `limit` suggestions for partly typed or misspelt text.
+
+        Locations whose name or alias starts with `prefix` come first, most
+        populous first, followed by close misspellings when there is room.
+        """
+        prefix = normalize_city(prefix)
+        if not prefix or limit <= 0:
+            return []
+        seen = set()
+        start = bisect_left(self._keys, prefix)
+        for key in self._keys[start:start + _MAX_PREFIX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            seen.update(self._index[key])
+        ids = sorted(seen, key=self._population.__getitem__, reverse=True)[:limit]
+        if len(ids) < limit:
+            for key in self._fuzzy_keys(prefix):
+                for city_id in self._index[key]:
+                    if city_id not in seen:
+                        seen.add(city_id)
+                        ids.append(city_id)
+                if len(ids) >= limit:
+                    break
+        return [self.location(city_id) for city_id in ids[:limit]]
+
+def _split_aliases(value: str) -> List[str]:
+    return [alias for alias in value.split("|") if alias.strip()]
+
+def load_countries(path: str = COUNTRIES_PATH) -> Dict[str, str]:
+    """Load the country table (code, name, |-separated aliases)."""
+    countries: Dict[str, str] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            code = row["code"].upper()
+            for alias in (row["code"], row["name"], *_split_aliases(row["aliases"])):
+                countries.setdefault(normalize_city(alias), code)
+    return countries
+
+def _read_csv(path: str):
+    """Rows from the bundled CSV format (name,country,lat,lon,population,aliases)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield (
+                row["name"], row["country"], float(row["lat"]), float(row["lon"]),
+                int(row["population"] or 0), _split_aliases(row["aliases"])
+            )
+
+def _read_geonames(path: str):
+    """Rows from a GeoNames dump such as cities15000.txt (tab-separated)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 15:
+                continue
+            # Keep ASCII alternate names only; requests cannot spell the others
+            aliases = [fields[1]] + [a for a in fields[3].split(",") if a.isascii()]
+            yield (
+                fields[2], fields[8], float(fields[4]), float(fields[5]),
+                int(fields[14] or 0), aliases
+            )
+
+def load_gazetteer(path: str = CITIES_PATH, fuzzy_cutoff: float = 0.85) -> Gazetteer:
+    """Build a gazetteer from the bundled CSV or a GeoNames .txt dump."""
+    rows = _read_geonames(path) if path.endswith(".txt") else _read_csv(path)
+    return Gazetteer(rows, load_countries(), fuzzy_cutoff=fuzzy_cutoff)
+
+@lru_cache()
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer built from settings."""
+    settings = get_settings()
+    return load_gazetteer(settings.gazetteer_path or CITIES_PATH, settings.gazetteer_fuzzy_cutoff)
@@ -0,0 +1,97 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple
+from app.config.settings import get_settings
+
+class HeavyHitter(NamedTuple):
+    """A tracked key with its estimated count."""
+    key: str
+    count: int  # Upper bound on the true count
+    error: int  # count - error is a lower bound on the true count
+    value: Any  # Payload stored with the latest observation
+
+class SpaceSaving:
+    """Space-Saving top-k counter over a stream of keys.
+
+    At most `capacity` keys are tracked. An untracked key replaces the key
+    with the smallest count and inherits that count as its error, so any
+    key whose true frequency exceeds N / capacity is guaranteed to be
+    tracked. Keys are grouped in buckets by count ("stream summary"), which
+    makes every observation O(1).
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._values: Dict[str, Any] = {}
+        self._buckets: Dict[int, Dict[str, None]] = {}  # Count -> keys (insertion-ordered set)
+        self._min_count = 0
+        self.observed = 0  # Stream length since the last reset
+
+    def _move(self, key: str, old: int, new: int) -> None:
+        if old:
+            bucket = self._buckets[old]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old]
+        self._buckets.setdefault(new, {})[key] = None
+        self._counts[key] = new
+
+    def observe(self, key: str, value: Any = None) -> None:
+        """Count one occurrence of `key` and remember `value` for it."""
+        self.observed += 1
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) < self.capacity:
+                self._errors[key] = 0
+                self._move(key, 0, 1)
+                self._min_count = 1
+            else:
+                # Replace the oldest key among those with the smallest count
+                floor = self._min_count
+                bucket = self._buckets[floor]
+                victim = next(iter(bucket))
+                del bucket[victim]
+                if not bucket:
+                    del self._buckets[floor]
+                del self._counts[victim], self._errors[victim]
+                self._values.pop(victim, None)
+                self._errors[key] = floor
+                self._move(key, 0, floor + 1)
+                if floor not in self._buckets:
+                    self._min_count = floor + 1
+        else:
+            self._move(key, count, count + 1)
+            if count == self._min_count and count not in self._buckets:
+                self._min_count = count + 1
+        self._values[key] = value
+
+    def top(self, k: int) -> List[HeavyHitter]:
+        """Return up to `k` keys with the highest counts, highest first."""
+        result: List[HeavyHitter] = []
+        for count in sorted(self._buckets, reverse=True):
+            for key in self._buckets[count]:
+                result.append(HeavyHitter(key, count, self._errors[key], self._values.get(key)))
+                if len(result) == k:
+                    return result
+        return result
+
+    def decay(self) -> None:
+        """Halve every count so old popularity fades; keys reaching zero are dropped."""
+        counts, errors, values = self._counts, self._errors, self._values
+        self._counts, self._errors, self._buckets = {}, {}, {}
+        self._values = {}
+        for key, count in counts.items():
+            if count // 2:
+                self._errors[key] = errors[key] // 2
+                self._values[key] = values.get(key)
+                self._move(key, 0, count // 2)
+        self._min_count = min(self._buckets) if self._buckets else 0
+        self.observed //= 2
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+@lru_cache()
+def get_city_tracker() -> SpaceSaving:
+    """Return the process-wide tracker of requested cities."""
+    return SpaceSaving(get_settings().hot_city_tracker_capacity)
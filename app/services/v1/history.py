@@ -0,0 +1,485 @@
+import contextlib
+import fcntl
+import json
+import mmap
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from app.config.settings import get_settings
+from app.utils.logger_config import setup_logger
+
+# Initialize logger for the history store
+logger = setup_logger("history")
+
+# Reported values are rounded to this many decimals (temperatures are stored as float32)
+_DECIMALS = 3
+
+# Column layout of a segment: 24 bytes per observation. The city is an id local
+# to the segment, indexing its city table
+_COLUMNS = (("time", np.int64), ("city", np.int32), ("temp", np.float32), ("lat", np.float32), ("lon", np.float32))
+_SCHEMA = pa.schema([(name, pa.from_numpy_dtype(dtype)) for name, dtype in _COLUMNS])
+_ROW_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in _COLUMNS)
+
+# Active segment file: magic, capacity and published row count, then one
+# preallocated region per column
+_MAGIC = b"WXHIST01"
+_HEADER_BYTES = 64
+
+_ACTIVE_SUFFIX = ".active"
+_CITIES_SUFFIX = ".cities"  # City table of an active segment, one "key<TAB>name" line per id
+_SEALED_SUFFIX = ".arrow"
+_PENDING_SUFFIX = ".tmp"  # Written, then renamed into place
+
+# stats() older than this schedule a background rescan
+_STATS_MAX_AGE = 10.0
+
+def _active_columns(buffer, capacity: int) -> Dict[str, np.ndarray]:
+    """Column views of a mapped active segment file."""
+    columns, offset = {}, _HEADER_BYTES
+    for name, dtype in _COLUMNS:
+        columns[name] = np.frombuffer(buffer, dtype, capacity, offset)
+        offset += capacity * np.dtype(dtype).itemsize
+    return columns
+
+def _read_cities(path: str) -> Tuple[List[str], List[str]]:
+    keys, names = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # Still being written
+            key, _, name = line[:-1].partition("\t")
+            keys.append(key)
+            names.append(name)
+    return keys, names
+
+def _write_sealed(base: str, columns: Dict[str, np.ndarray], keys: List[str], names: List[str]) -> None:
+    """Write a segment as an Arrow IPC file, complete before it appears under its name."""
+    schema = _SCHEMA.with_metadata({"keys": json.dumps(keys), "names": json.dumps(names)})
+    table = pa.table([columns[name] for name, _ in _COLUMNS], schema=schema)
+    with pa.OSFile(base + _PENDING_SUFFIX, "wb") as sink, ipc.new_file(sink, schema) as writer:
+        writer.write_table(table)
+    os.replace(base + _PENDING_SUFFIX, base + _SEALED_SUFFIX)
+
+class _Segment:
+    """A segment as seen by queries: columns mapped from its file, city table and time range."""
+    __slots__ = ("columns", "keys", "names", "min_time", "max_time")
+
+    def __init__(self, columns: Dict[str, np.ndarray], keys: List[str], names: List[str],
+                 min_time: Optional[int] = None, max_time: Optional[int] = None):
+        self.columns = columns
+        self.keys = keys
+        self.names = names
+        times = columns["time"]
+        self.min_time = int(times.min()) if min_time is None else min_time
+        self.max_time = int(times.max()) if max_time is None else max_time
+
+    def __len__(self) -> int:
+        return len(self.columns["time"])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+def _load_sealed(path: str) -> _Segment:
+    """Map a sealed segment; uncompressed IPC columns are views of the file, not copies."""
+    reader = ipc.open_file(pa.memory_map(path))
+    table = reader.read_all()
+    metadata = reader.schema.metadata
+    # The arrays keep the memory map they point into alive
+    columns = {name: table.column(name).chunk(0).to_numpy() for name, _ in _COLUMNS}
+    return _Segment(columns, json.loads(metadata[b"keys"]), json.loads(metadata[b"names"]))
+
+class _ActiveView:
+    """A reader's mapping of an active segment, following the rows its worker publishes."""
+    __slots__ = ("path", "header", "columns", "segment")
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"Not a history segment: {path}")
+        self.header = np.frombuffer(buffer, np.int64, 2, len(_MAGIC))  # Capacity, published rows
+        self.columns = _active_columns(buffer, int(self.header[0]))
+        self.segment: Optional[_Segment] = None
+
+    def current(self) -> Optional[_Segment]:
+        """The published rows (None while there are none); only rows added since the last call are read."""
+        count = int(self.header[1])
+        previous = self.segment
+        seen = len(previous) if previous is not None else 0
+        if count == seen:
+            return previous
+        times = self.columns["time"][seen:count]
+        keys, names = (previous.keys, previous.names) if previous is not None else ([], [])
+        # A city line is always written before the first row that uses it
+        if int(self.columns["city"][seen:count].max()) >= len(keys):
+            keys, names = _read_cities(self.path[:-len(_ACTIVE_SUFFIX)] + _CITIES_SUFFIX)
+        self.segment = _Segment(
+            {name: column[:count] for name, column in self.columns.items()}, keys, names,
+            min(int(times.min()), previous.min_time) if previous is not None else None,
+            max(int(times.max()), previous.max_time) if previous is not None else None
+        )
+        return self.segment
+
+class _ActiveSegment:
+    """This worker's segment being appended to: preallocated columns in a shared, locked file."""
+    def __init__(self, base: str, capacity: int):
+        self.base = base
+        self.capacity = capacity
+        self._cities_fd = os.open(base + _CITIES_SUFFIX, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._fd = os.open(base + _PENDING_SUFFIX, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        # Held until the segment is sealed: a lock anyone can take marks a segment whose worker died
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        os.ftruncate(self._fd, _HEADER_BYTES + capacity * _ROW_BYTES)
+        buffer = mmap.mmap(self._fd, 0)
+        buffer[:len(_MAGIC)] = _MAGIC
+        self.header = np.frombuffer(buffer, np.int64, 2, len(_MAGIC))
+        self.header[0] = capacity
+        self.columns = _active_columns(buffer, capacity)
+        # Readers only ever see the file with its header in place
+        os.rename(base + _PENDING_SUFFIX, base + _ACTIVE_SUFFIX)
+        self.ids: Dict[str, int] = {}  # Cache key -> city id
+        self.keys: List[str] = []
+        self.names: List[str] = []
+        self.rows = 0
+
+    def append(self, key: str, name: str, observed_at: int, temp: float, lat: float, lon: float) -> None:
+        city_id = self.ids.get(key)
+        if city_id is None:
+            city_id = self.ids[key] = len(self.keys)
+            name = " ".join(str(name).split())  # No tabs or newlines
+            self.keys.append(key)
+            self.names.append(name)
+            os.write(self._cities_fd, f"{key}\t{name}\n".encode("utf-8"))
+        row, columns = self.rows, self.columns
+        columns["time"][row] = observed_at
+        columns["city"][row] = city_id
+        columns["temp"][row] = temp
+        columns["lat"][row] = lat
+        columns["lon"][row] = lon
+        self.rows += 1
+        # Publish the row once all its columns are written
+        self.header[1] = self.rows
+
+    def seal(self) -> None:
+        """Write the rows as a sealed segment and remove the active files (background thread)."""
+        try:
+            if self.rows:
+                _write_sealed(self.base, {name: column[:self.rows] for name, column in self.columns.items()},
+                              self.keys, self.names)
+            for suffix in (_ACTIVE_SUFFIX, _CITIES_SUFFIX):
+                with contextlib.suppress(OSError):
+                    os.remove(self.base + suffix)
+        finally:
+            # Also releases the lock: if sealing failed, any worker can adopt the segment
+            os.close(self._fd)
+            os.close(self._cities_fd)
+
+class HistoryStore:
+    """Append-only columnar history of weather observations, shared by workers.
+
+    Every worker process appends the observations it fetches to its own
+    active segment in `directory`: preallocated columns (observation time,
+    city id, temperature, latitude, longitude) in a memory-mapped file,
+    plus a city table. A full segment of `chunk_rows` rows is written to an
+    Arrow IPC file on a background thread, which also deletes segments
+    (of any worker) whose rows are all older than `retention` seconds. An
+    active segment left by a worker that died is sealed (or deleted, once
+    expired) by whichever worker finds it. The same upstream observation
+    fetched twice (same city and observation time) is stored once.
+
+    Queries read the active and sealed segments of all workers through
+    memory maps, so each worker answers from the history of the whole host.
+    They skip segments outside the time range (and retention), select rows
+    with vectorized masks and aggregate per city with sort + reduceat. They
+    do blocking file I/O and run for as long as the scan takes, so call
+    them from a thread pool.
+    """
+    def __init__(self, directory: str, chunk_rows: int = 65536, retention: float = 7 * 86400):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.retention = retention
+        # Writer state (event loop thread). The prefix keeps this store's files apart
+        self._prefix = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self._seq = 0
+        self._active: Optional[_ActiveSegment] = None
+        self._last_observed: Dict[str, int] = {}
+        # Sealing, expiry and stats rescans stay off the event loop
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._stats_refresh: Optional[Future] = None
+        # Reader state (query and background threads)
+        self._sealed: Dict[str, _Segment] = {}  # By path; sealed files never change
+        self._views: Dict[str, _ActiveView] = {}
+        self._lock = threading.Lock()
+        self._stats = {"cities": 0, "rows": 0, "segments": 0, "bytes": 0}
+        self._stats_at = time.monotonic()
+        # Counters reported through stats()
+        self.recorded = 0
+        self.duplicates = 0
+        self.expired = 0
+        self.adopted = 0
+        self._background.submit(self._maintain, None)
+
+    def record(self, key: str, weather_data: dict) -> bool:
+        """Append one observation; False if this observation was already stored."""
+        observed_at = int(weather_data.get("observed_at") or time.time())
+        if self._last_observed.get(key) == observed_at:
+            self.duplicates += 1
+            return False
+        self._last_observed[key] = observed_at
+
+        if self._active is None or self._active.rows == self.chunk_rows:
+            self._rotate()
+        self._active.append(
+            key, weather_data["city"], observed_at, weather_data["temp"], weather_data["lat"], weather_data["lon"]
+        )
+        self.recorded += 1
+        return True
+
+    def _rotate(self) -> None:
+        """Start a new active segment; the full one is sealed in the background."""
+        full = self._active
+        self._seq += 1
+        self._active = _ActiveSegment(os.path.join(self.directory, f"{self._prefix}-{self._seq:06d}"), self.chunk_rows)
+        if full is not None:
+            self._background.submit(self._maintain, full)
+
+    def _maintain(self, full: Optional[_ActiveSegment]) -> None:
+        """Seal a full segment, then expire and adopt segments (background thread)."""
+        try:
+            if full is not None:
+                full.seal()
+            self._expire()
+        except Exception:
+            logger.exception("History maintenance failed")
+
+    def _expire(self) -> None:
+        """Delete sealed segments whose rows are all past retention; adopt those of dead workers."""
+        cutoff = time.time() - self.retention
+        expired = adopted = 0
+        for path, segment in self._scan().items():
+            if path.endswith(_SEALED_SUFFIX) and segment.max_time < cutoff:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+                expired += 1
+        with os.scandir(self.directory) as entries:
+            orphans = [entry.path for entry in entries if entry.name.endswith(_ACTIVE_SUFFIX)]
+        for path in orphans:
+            adopted += self._adopt(path, cutoff)
+        if expired or adopted:
+            self.expired += expired
+            self.adopted += adopted
+            logger.info("Deleted %d expired history segments, adopted %d of stopped workers", expired, adopted)
+            self._scan()
+
+    @staticmethod
+    def _adopt(path: str, cutoff: float) -> bool:
+        """Seal (or delete, if expired) an active segment whose worker is gone; False if it is alive."""
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except OSError:
+            return False
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False  # Its worker is still appending
+            if os.fstat(fd).st_nlink == 0:
+                return False  # Sealed meanwhile
+            base = path[:-len(_ACTIVE_SUFFIX)]
+            try:
+                segment = _ActiveView(path).current()
+            except ValueError:
+                segment = None  # Died before writing the header
+            if segment is not None and segment.max_time >= cutoff:
+                _write_sealed(base, segment.columns, segment.keys, segment.names)
+            for suffix in (_ACTIVE_SUFFIX, _CITIES_SUFFIX):
+                with contextlib.suppress(OSError):
+                    os.remove(base + suffix)
+            return True
+        finally:
+            os.close(fd)
+
+    def _scan(self) -> Dict[str, _Segment]:
+        """Current segments of every worker: sealed files (loaded once) and the published rows of active ones."""
+        with self._lock:
+            sealed, views, segments = {}, {}, {}
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    path = entry.path
+                    try:
+                        if entry.name.endswith(_SEALED_SUFFIX):
+                            segment = self._sealed.get(path)
+                            if segment is None:
+                                segment = _load_sealed(path)
+                            sealed[path] = segment
+                        elif entry.name.endswith(_ACTIVE_SUFFIX):
+                            view = self._views.get(path)
+                            if view is None:
+                                view = _ActiveView(path)
+                            views[path] = view
+                            segment = view.current()
+                        else:
+                            continue
+                    except (OSError, ValueError, pa.ArrowInvalid):
+                        continue  # Deleted, or not written yet
+                    if segment is not None:
+                        segments[path] = segment
+            self._sealed, self._views = sealed, views
+            self._stats = {
+                "cities": len({key for segment in segments.values() for key in segment.keys}),
+                "rows": sum(len(segment) for segment in segments.values()),
+                "segments": len(segments),
+                "bytes": sum(segment.nbytes for segment in segments.values())
+            }
+            self._stats_at = time.monotonic()
+            return segments
+
+    def _select(self, keys: Sequence[str], since: int, until: int):
+        """Return query index, time and temperature of matching rows, plus city names.
+
+        The query index is the position of the row's city in `keys` (without
+        repeats). Rows found in two segments (an observation recorded by two
+        workers, or a segment seen both active and sealed) are returned once.
+        """
+        since = max(since, int(time.time() - self.retention))
+        index: Dict[str, int] = {}
+        for key in keys:
+            index.setdefault(key, len(index))
+        names: Dict[int, Tuple[int, str]] = {}  # Query index -> (segment end, name)
+        cities, times, temps = [], [], []
+        for segment in self._scan().values():
+            if segment.max_time < since or segment.min_time > until:
+                continue
+            remap = np.fromiter((index.get(key, -1) for key in segment.keys), np.int32, len(segment.keys))
+            if not (remap >= 0).any():
+                continue
+            for query, name in zip(remap.tolist(), segment.names):
+                if query >= 0 and segment.max_time >= names.get(query, (-1, ""))[0]:
+                    names[query] = (segment.max_time, name)
+            columns = segment.columns
+            # One gather into the lookup table instead of comparing against every key
+            query = remap[columns["city"]]
+            row_times = columns["time"]
+            mask = (query >= 0) & (row_times >= since) & (row_times <= until)
+            cities.append(query[mask])
+            times.append(row_times[mask])
+            temps.append(columns["temp"][mask])
+        if not cities:
+            return np.empty(0, np.int32), np.empty(0, np.int64), np.empty(0, np.float64), {}
+        city, times, temps = np.concatenate(cities), np.concatenate(times), np.concatenate(temps).astype(np.float64)
+        order = np.lexsort((times, city))  # By city, then time
+        city, times, temps = city[order], times[order], temps[order]
+        unique = np.r_[True, (city[1:] != city[:-1]) | (times[1:] != times[:-1])]
+        return city[unique], times[unique], temps[unique], {query: name for query, (_, name) in names.items()}
+
+    @staticmethod
+    def _groups(labels: np.ndarray) -> np.ndarray:
+        """Start index of each run of equal labels in a sorted array."""
+        return np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(labels) else np.empty(0, np.intp)
+
+    def summary(self, keys: Sequence[str], since: int, until: int) -> Dict[str, dict]:
+        """Per-city count, min, max, mean, first/last temperature and trend (degrees per hour)."""
+        city, times, temps, names = self._select(keys, since, until)
+        unique_keys = list(dict.fromkeys(keys))
+        starts = self._groups(city)
+        if not len(starts):
+            return {}
+        counts = np.diff(np.r_[starts, len(city)])
+        sums = np.add.reduceat(temps, starts)
+        # Least-squares slope of temperature over time, per city
+        hours = (times - since) / 3600.0
+        sum_x = np.add.reduceat(hours, starts)
+        sum_xx = np.add.reduceat(hours * hours, starts)
+        sum_xy = np.add.reduceat(hours * temps, starts)
+        denominator = counts * sum_xx - sum_x * sum_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trend = np.where(denominator > 0, (counts * sum_xy - sum_x * sums) / denominator, np.nan)
+        columns = zip(
+            city[starts].tolist(), counts.tolist(),
+            np.minimum.reduceat(temps, starts).round(_DECIMALS).tolist(),
+            np.maximum.reduceat(temps, starts).round(_DECIMALS).tolist(),
+            (sums / counts).round(_DECIMALS).tolist(),
+            temps[starts].round(_DECIMALS).tolist(), temps[starts + counts - 1].round(_DECIMALS).tolist(),
+            times[starts].tolist(), times[starts + counts - 1].tolist(), trend.round(_DECIMALS).tolist()
+        )
+        return {
+            unique_keys[query]: {
+                "city": names.get(query), "count": count, "min": low, "max": high, "mean": mean,
+                "first": first, "last": last, "first_at": first_at, "last_at": last_at,
+                "trend_per_hour": None if slope != slope else slope  # NaN: a single point in time
+            }
+            for query, count, low, high, mean, first, last, first_at, last_at, slope in columns
+        }
+
+    def resample(self, keys: Sequence[str], since: int, until: int, interval: int) -> Dict[str, dict]:
+        """Per-city series of (bucket start, count, min, max, mean) over `interval`-second buckets."""
+        city, times, temps, names = self._select(keys, since, until)
+        unique_keys = list(dict.fromkeys(keys))
+        buckets = (until - since) // interval + 1
+        # Rows are already ordered by city, then time, so buckets come out in order
+        group = city.astype(np.int64) * buckets + (times - since) // interval
+        starts = self._groups(group)
+        if not len(starts):
+            return {}
+        counts = np.diff(np.r_[starts, len(group)])
+        query_ids, bucket = np.divmod(group[starts], buckets)
+        rows = zip(
+            query_ids.tolist(), (since + bucket * interval).tolist(), counts.tolist(),
+            np.minimum.reduceat(temps, starts).round(_DECIMALS).tolist(),
+            np.maximum.reduceat(temps, starts).round(_DECIMALS).tolist(),
+            (np.add.reduceat(temps, starts) / counts).round(_DECIMALS).tolist()
+        )
+        series: Dict[str, dict] = {}
+        for query, at, count, low, high, mean in rows:
+            key = unique_keys[query]
+            if key not in series:
+                series[key] = {"city": names.get(query), "points": []}
+            series[key]["points"].append({"time": at, "count": count, "min": low, "max": high, "mean": mean})
+        return series
+
+    def close(self) -> None:
+        """Seal this worker's active segment (the files stay for the other workers and restarts)."""
+        self._background.shutdown(wait=True)
+        if self._active is not None:
+            active, self._active = self._active, None
+            active.seal()
+        with self._lock:
+            self._sealed, self._views = {}, {}
+
+    def stats(self) -> dict:
+        """Return row, segment and byte counts for the health check (all workers).
+
+        Counts are those of the last directory scan (by a query or in the
+        background); an older snapshot than `_STATS_MAX_AGE` schedules a
+        rescan in the background rather than scanning on the caller's thread.
+        """
+        if time.monotonic() - self._stats_at > _STATS_MAX_AGE and (
+                self._stats_refresh is None or self._stats_refresh.done()):
+            self._stats_refresh = self._background.submit(self._scan)
+        return {
+            **self._stats,
+            "recorded": self.recorded,
+            "duplicates": self.duplicates,
+            "expired_segments": self.expired,
+            "adopted_segments": self.adopted
+        }
+
+@lru_cache()
+def get_history_store() -> HistoryStore:
+    """Return the process-wide observation history built from settings."""
+    settings = get_settings()
+    return HistoryStore(
+        settings.history_dir,
+        chunk_rows=settings.history_chunk_rows,
+        retention=settings.history_retention_hours * 3600
+    )
@@ -0,0 +1,96 @@
+import importlib.util
+from typing import Optional
+import httpx
+from app.config.settings import get_settings
+from app.utils.deadline import DeadlineExceeded, time_remaining
+from app.utils.logger_config import setup_logger
+
+# Initialize logger for the upstream HTTP client
+logger = setup_logger("http_client")
+
+# Application-scoped client shared by every upstream call
+_client: Optional[httpx.AsyncClient] = None
+
+def build_client(base_url: str, headers: Optional[dict] = None) -> httpx.AsyncClient:
+    """Create a pooled keep-alive client using the configured limits and timeouts."""
+    settings = get_settings()
+
+    # HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 without it
+    http2 = settings.http2_enabled
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+        http2 = False
+
+    # Connection pool limits
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry
+    )
+    # Per-phase timeouts
+    timeout = httpx.Timeout(
+        connect=settings.http_connect_timeout,
+        read=settings.http_read_timeout,
+        write=settings.http_write_timeout,
+        pool=settings.http_pool_timeout
+    )
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        limits=limits,
+        timeout=timeout,
+        http2=http2
+    )
+
+def request_timeout(timeout: httpx.Timeout) -> httpx.Timeout:
+    """Per-phase timeouts capped by the time left on the current request's deadline.
+
+    Raises DeadlineExceeded when no time is left, so no call is started.
+    """
+    remaining = time_remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+    def cap(phase: Optional[float]) -> float:
+        return remaining if phase is None else min(phase, remaining)
+
+    return httpx.Timeout(connect=cap(timeout.connect), read=cap(timeout.read),
+                         write=cap(timeout.write), pool=cap(timeout.pool))
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the WeatherAPI (RapidAPI) client from application settings."""
+    settings = get_settings()
+    return build_client(
+        settings.upstream_base_url,
+        headers={
+            "X-RapidAPI-Key": settings.api_key,
+            "X-RapidAPI-Host": settings.upstream_host
+        }
+    )
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Open the shared upstream client (called from the startup hook)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("Upstream HTTP client opened")
+    return _client
+
+async def close_http_client() -> None:
+    """Close the shared upstream client (called from the shutdown hook)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Upstream HTTP client closed")
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it lazily if needed."""
+    global _client
+    # Lazy creation keeps scripts and workers without lifespan events working
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
@@ -0,0 +1,146 @@
+import asyncio
+import contextlib
+import time
+from functools import lru_cache
+from typing import List, Optional
+from app.config.settings import get_settings
+from app.services.v1.heavy_hitters import HeavyHitter, SpaceSaving, get_city_tracker
+from app.services.v1.weather_cache import WeatherCache, get_weather_cache
+from app.services.v1.weather_service import refresh_in_background
+from app.utils.logger_config import setup_logger
+from app.utils.metrics import PREFETCH_REFRESHES
+
+# Initialize logger for the prefetch scheduler
+logger = setup_logger("prefetch")
+
+# Precomputed metric labels
+_STARTED, _BUDGET_EXHAUSTED = ("started",), ("budget_exhausted",)
+
+class PrefetchScheduler:
+    """Keep the most requested cities warm within an upstream budget.
+
+    Every `interval` seconds the top cities from the tracker (those seen at
+    least `min_hits` times) are checked, hottest first. Any whose cache
+    entry is missing or goes stale within `refresh_ahead` seconds is
+    refreshed in the background, spending one token from a bucket that
+    refills at `budget_per_minute`. Tracker counts are halved every
+    `decay_seconds` so cities that stop being requested cool down.
+    """
+    def __init__(self, tracker: SpaceSaving, cache: WeatherCache, top_k: int, min_hits: int,
+                 budget_per_minute: int, interval: float, refresh_ahead: float, decay_seconds: float):
+        self.tracker = tracker
+        self.cache = cache
+        self.top_k = top_k
+        self.min_hits = min_hits
+        self.budget_per_minute = budget_per_minute
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.decay_seconds = decay_seconds
+        self._tokens = float(budget_per_minute)
+        self._refilled_at = time.monotonic()
+        self._decayed_at = time.monotonic()
+        self._warm: List[HeavyHitter] = []
+        self._task: Optional[asyncio.Task] = None
+        # Counters reported through stats()
+        self.refreshes = 0
+        self.budget_exhausted = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            float(self.budget_per_minute),
+            self._tokens + (now - self._refilled_at) * self.budget_per_minute / 60
+        )
+        self._refilled_at = now
+
+    def tick(self) -> int:
+        """Run one scheduling pass; return the number of refreshes started."""
+        now = time.monotonic()
+        if now - self._decayed_at >= self.decay_seconds:
+            self.tracker.decay()
+            self._decayed_at = now
+        self._refill(now)
+
+        warm, started = [], 0
+        for hitter in self.tracker.top(self.top_k):
+            if hitter.count < self.min_hits:
+                break
+            warm.append(hitter)
+            fresh_for = self.cache.fresh_for(hitter.key)
+            if fresh_for is not None and fresh_for > self.refresh_ahead:
+                continue
+            if self._tokens < 1:
+                # Hotter cities were served first; the rest wait for the next pass
+                self.budget_exhausted += 1
+                PREFETCH_REFRESHES.inc(_BUDGET_EXHAUSTED)
+                continue
+            if refresh_in_background(hitter.key, hitter.value) is not None:
+                self._tokens -= 1
+                started += 1
+                PREFETCH_REFRESHES.inc(_STARTED)
+        self._warm = warm
+        self.refreshes += started
+        return started
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                started = self.tick()
+                if started:
+                    logger.debug("Prefetch started %d refreshes", started)
+            except Exception as e:
+                logger.error("Prefetch pass failed: %s", e, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start the scheduling loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduling loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def warm_cities(self) -> List[dict]:
+        """Cities currently kept warm, hottest first."""
+        cities = []
+        for hitter in self._warm:
+            fresh_for = self.cache.fresh_for(hitter.key)
+            cities.append({
+                "city": hitter.value,
+                "key": hitter.key,
+                "hits": hitter.count,
+                "fresh_for_seconds": round(fresh_for, 1) if fresh_for is not None else None
+            })
+        return cities
+
+    def stats(self) -> dict:
+        """Return scheduler state and counters."""
+        self._refill(time.monotonic())
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "tracked_cities": len(self.tracker),
+            "warm_cities": len(self._warm),
+            "budget_per_minute": self.budget_per_minute,
+            "budget_remaining": int(self._tokens),
+            "refreshes": self.refreshes,
+            "budget_exhausted": self.budget_exhausted
+        }
+
+@lru_cache()
+def get_prefetch_scheduler() -> PrefetchScheduler:
+    """Return the process-wide prefetch scheduler built from settings."""
+    settings = get_settings()
+    return PrefetchScheduler(
+        tracker=get_city_tracker(),
+        cache=get_weather_cache(),
+        top_k=settings.prefetch_top_k,
+        min_hits=settings.prefetch_min_hits,
+        budget_per_minute=settings.prefetch_budget_per_minute,
+        interval=settings.prefetch_interval_seconds,
+        refresh_ahead=settings.prefetch_refresh_ahead_seconds,
+        decay_seconds=settings.hot_city_decay_seconds
+    )
@@ -0,0 +1,263 @@
+import asyncio
+import random
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.config.settings import get_settings
+from app.services.v1.circuit_breaker import CircuitBreaker
+from app.services.v1.providers import LocationNotFoundError, WeatherProvider, build_provider
+from app.services.v1.resilience import ResiliencePolicy, consume_exception, get_resilience_policy
+from app.utils.deadline import DeadlineExceeded
+from app.utils.metrics import PROVIDER_REQUEST_DURATION
+
+# Routing policies
+FAILOVER = "failover"  # Configured order; the next provider is tried on failure
+RACE = "race"  # The best providers are called at once; the first answer wins
+WEIGHTED = "weighted"  # Random pick by weight and health, then failover
+POLICIES = (FAILOVER, RACE, WEIGHTED)
+
+# Smoothing factor for the latency and error moving averages
+_EWMA_ALPHA = 0.2
+
+# Latency floor used when scoring, so a very fast provider is not infinitely attractive
+_MIN_SCORE_LATENCY = 0.001
+
+# Latency assumed for every provider while none has been measured (any value
+# does: only ratios between scores matter)
+_DEFAULT_PRIOR_LATENCY = 1.0
+
+class NoProviderAvailableError(Exception):
+    """Every provider is short-circuited by its breaker."""
+
+class ProviderStats:
+    """Exponentially weighted latency and error rate of one provider."""
+    __slots__ = ("latency", "error_rate", "requests", "errors", "censored")
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # Seconds; None until the first sample
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.censored = 0  # Calls cancelled before they finished (race losers)
+
+    def _update_latency(self, seconds: float) -> None:
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += _EWMA_ALPHA * (seconds - self.latency)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self._update_latency(seconds)
+        self.error_rate += _EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+
+    def record_censored(self, seconds: float) -> None:
+        """Account for a call cancelled after `seconds`: its latency was at least that.
+
+        A lower bound above the current average raises it (a provider that
+        always loses races keeps getting slower scores); one below it says
+        nothing new. The error rate is left alone.
+        """
+        self.censored += 1
+        if self.latency is None or seconds > self.latency:
+            self._update_latency(seconds)
+
+class _Route:
+    """A provider with its weight, statistics and circuit breaker."""
+    __slots__ = ("provider", "weight", "stats", "breaker", "labels")
+
+    def __init__(self, provider: WeatherProvider, weight: float, breaker: CircuitBreaker):
+        self.provider = provider
+        self.weight = weight
+        self.stats = ProviderStats()
+        self.breaker = breaker
+        # Precomputed metric labels per outcome
+        self.labels = {outcome: (provider.name, outcome) for outcome in ("ok", "not_found", "error")}
+
+    def score(self, prior_latency: float) -> float:
+        """Higher is better: weight scaled by success rate and inverse latency.
+
+        `prior_latency` stands in for the latency of a provider not measured yet.
+        """
+        latency = self.stats.latency if self.stats.latency is not None else prior_latency
+        return self.weight * (1.0 - self.stats.error_rate) / max(latency, _MIN_SCORE_LATENCY)
+
+class ProviderRouter:
+    """Route weather lookups across providers by policy and live statistics.
+
+    Every provider call runs under the shared resilience policy (retries,
+    hedging) and feeds the provider's latency/error averages and its own
+    circuit breaker. A LocationNotFoundError is an authoritative answer
+    and is not failed over, and neither is a DeadlineExceeded.
+    """
+    def __init__(self, providers: Sequence[WeatherProvider], policy: str = FAILOVER,
+                 weights: Optional[Dict[str, float]] = None, race_fanout: int = 2,
+                 resilience: Optional[ResiliencePolicy] = None,
+                 failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown provider policy: {policy}")
+        if not providers:
+            raise ValueError("At least one weather provider is required")
+        weights = weights or {}
+        self.policy = policy
+        self.race_fanout = race_fanout  # Providers called at once by the race policy
+        self.resilience = resilience
+        self._routes: List[_Route] = [
+            _Route(provider, weights.get(provider.name, 1.0), CircuitBreaker(failure_threshold, recovery_seconds))
+            for provider in providers
+        ]
+
+    async def fetch(self, query: str) -> dict:
+        """Fetch normalized weather for `query` from the chosen provider(s)."""
+        if self.policy == RACE:
+            return await self._race(query)
+        if self.policy == WEIGHTED:
+            return await self._in_order(query, self._weighted_order())
+        return await self._in_order(query, self._routes)
+
+    async def _call(self, route: _Route, query: str) -> dict:
+        start = time.perf_counter()
+        try:
+            if self.resilience is not None:
+                result = await self.resilience.call(lambda: route.provider.fetch(query))
+            else:
+                result = await route.provider.fetch(query)
+        except LocationNotFoundError:
+            self._record(route, start, True, "not_found")
+            raise
+        except DeadlineExceeded:
+            # Our client ran out of time; says nothing about the provider
+            raise
+        except asyncio.CancelledError:
+            # Lost a race (or the request went away): a censored latency sample
+            route.stats.record_censored(time.perf_counter() - start)
+            raise
+        except Exception:
+            self._record(route, start, False, "error")
+            raise
+        self._record(route, start, True, "ok")
+        return result
+
+    def _record(self, route: _Route, start: float, ok: bool, outcome: str) -> None:
+        elapsed = time.perf_counter() - start
+        route.stats.record(elapsed, ok)
+        PROVIDER_REQUEST_DURATION.observe(elapsed, route.labels[outcome])
+        if ok:
+            route.breaker.record_success()
+        else:
+            route.breaker.record_failure()
+
+    async def _in_order(self, query: str, routes: Sequence[_Route]) -> dict:
+        """Try providers one at a time until one answers."""
+        error: Optional[Exception] = None
+        for route in routes:
+            if not route.breaker.allow_request():
+                continue
+            try:
+                return await self._call(route, query)
+            except (LocationNotFoundError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                error = e
+        raise error or NoProviderAvailableError("All weather providers are unavailable")
+
+    def _ranked(self) -> List[Tuple[_Route, float]]:
+        """Routes with their scores, best first.
+
+        Providers not measured yet are scored at the mean latency of the
+        measured ones (a neutral prior), so they are neither preferred nor
+        avoided until their own samples come in.
+        """
+        measured = [route.stats.latency for route in self._routes if route.stats.latency is not None]
+        prior = sum(measured) / len(measured) if measured else _DEFAULT_PRIOR_LATENCY
+        scored = [(route, route.score(prior)) for route in self._routes]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def _weighted_order(self) -> List[_Route]:
+        """A score-weighted random first choice, then the rest best-first."""
+        scored = self._ranked()
+        ranked = [route for route, _ in scored]
+        scores = [score for _, score in scored]
+        if len(ranked) < 2 or sum(scores) <= 0:
+            return ranked
+        first = random.choices(ranked, weights=scores)[0]
+        return [first] + [route for route in ranked if route is not first]
+
+    async def _race(self, query: str) -> dict:
+        """Call the best few providers concurrently and return the first answer."""
+        ranked = [route for route, _ in self._ranked()]
+        racers = []
+        for route in ranked:
+            if len(racers) == self.race_fanout:
+                break
+            if route.breaker.allow_request():
+                racers.append(route)
+        if not racers:
+            raise NoProviderAvailableError("All weather providers are unavailable")
+
+        pending = {asyncio.ensure_future(self._call(route, query)) for route in racers}
+        for task in pending:
+            task.add_done_callback(consume_exception)
+        not_found: Optional[LocationNotFoundError] = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exception = task.exception()
+                    if exception is None:
+                        return task.result()
+                    if isinstance(exception, LocationNotFoundError):
+                        not_found = not_found or exception
+                    else:
+                        error = error or exception
+            # Nobody had data: "not found" beats a failure
+            raise not_found or error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Return per-provider health for the health check."""
+        return {
+            "policy": self.policy,
+            "providers": {
+                route.provider.name: {
+                    "latency_ms": round(route.stats.latency * 1000, 2) if route.stats.latency is not None else None,
+                    "error_rate": round(route.stats.error_rate, 4),
+                    "requests": route.stats.requests,
+                    "errors": route.stats.errors,
+                    "censored": route.stats.censored,
+                    "weight": route.weight,
+                    "circuit": route.breaker.state
+                }
+                for route in self._routes
+            }
+        }
+
+    async def close(self) -> None:
+        for route in self._routes:
+            await route.provider.close()
+
+@lru_cache()
+def get_provider_router() -> ProviderRouter:
+    """Return the process-wide provider router built from settings."""
+    settings = get_settings()
+    return ProviderRouter(
+        [build_provider(name) for name in settings.weather_providers],
+        policy=settings.provider_policy,
+        weights=settings.provider_weights,
+        race_fanout=settings.provider_race_fanout,
+        resilience=get_resilience_policy(),
+        failure_threshold=settings.circuit_failure_threshold,
+        recovery_seconds=settings.circuit_recovery_seconds
+    )
+
+async def close_provider_router() -> None:
+    """Close provider resources (called from the shutdown hook)."""
+    if get_provider_router.cache_info().currsize:
+        await get_provider_router().close()
+        get_provider_router.cache_clear()
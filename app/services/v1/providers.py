@@ -0,0 +1,143 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+import httpx
+from app.config.settings import get_settings
+from app.services.v1.http_client import build_client, get_http_client, request_timeout
+from app.utils.deadline import check_deadline
+
+# WeatherAPI current conditions path (relative to the client's base URL)
+CURRENT_WEATHER_PATH = "/current.json"
+
+# Upstream statuses meaning "no such location" rather than an upstream fault
+_NOT_FOUND_STATUSES = frozenset({400, 404})
+
+class LocationNotFoundError(Exception):
+    """The provider answered, but does not know the requested location."""
+
+class WeatherProvider(ABC):
+    """A weather data source.
+
+    Implementations fetch current conditions for a query (a city name or
+    "lat,lon") and normalize them to the internal
+    {"temp", "lat", "lon", "city", "observed_at"} dict, where observed_at is
+    the upstream observation time in epoch seconds. They raise
+    LocationNotFoundError for unknown locations and DeadlineExceeded when the
+    request ran out of time; any other exception counts as a provider
+    failure.
+    """
+    name: str
+
+    @abstractmethod
+    async def fetch(self, query: str) -> dict:
+        """Return normalized current weather for `query`."""
+
+    async def close(self) -> None:
+        """Release provider resources."""
+
+async def _get(client: httpx.AsyncClient, url: str, params: dict) -> httpx.Response:
+    """GET bounded by the current request's deadline."""
+    try:
+        return await client.get(url, params=params, timeout=request_timeout(client.timeout))
+    except httpx.TimeoutException:
+        # Cut short by our own deadline rather than a slow provider
+        check_deadline()
+        raise
+
+def parse_coordinates(query: str) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) if the query is a "lat,lon" pair."""
+    lat, sep, lon = query.partition(",")
+    if not sep:
+        return None
+    try:
+        return float(lat), float(lon)
+    except ValueError:
+        return None
+
+class WeatherApiProvider(WeatherProvider):
+    """WeatherAPI.com through RapidAPI, using the shared application client."""
+    def __init__(self, name: str = "weatherapi", client: Optional[httpx.AsyncClient] = None):
+        self.name = name
+        self._client = client  # None means the shared client from http_client
+
+    async def fetch(self, query: str) -> dict:
+        client = self._client or get_http_client()
+        response = await _get(client, CURRENT_WEATHER_PATH, {"q": query})
+        if response.status_code in _NOT_FOUND_STATUSES:
+            raise LocationNotFoundError(query)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            "temp": data["current"]["temp_c"],
+            "lat": data["location"]["lat"],
+            "lon": data["location"]["lon"],
+            "city": data["location"]["name"],
+            "observed_at": int(data["current"].get("last_updated_epoch") or time.time())
+        }
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+def _parse_open_meteo_time(value: Optional[str]) -> int:
+    """Epoch seconds of an Open-Meteo "current.time" (ISO 8601, GMT by default)."""
+    try:
+        return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo (no API key). City names are geocoded first."""
+    def __init__(self, name: str = "open-meteo", forecast_url: str = "https://api.open-meteo.com",
+                 geocoding_url: str = "https://geocoding-api.open-meteo.com"):
+        self.name = name
+        # Own clients: the shared one carries RapidAPI credentials
+        self._forecast = build_client(forecast_url)
+        self._geocoding = build_client(geocoding_url)
+
+    async def _geocode(self, query: str) -> Tuple[float, float, str]:
+        name = query.split(",")[0].strip()
+        response = await _get(self._geocoding, "/v1/search", {"name": name, "count": 1})
+        response.raise_for_status()
+        results = response.json().get("results")
+        if not results:
+            raise LocationNotFoundError(query)
+        return results[0]["latitude"], results[0]["longitude"], results[0]["name"]
+
+    async def fetch(self, query: str) -> dict:
+        coordinates = parse_coordinates(query)
+        if coordinates is not None:
+            (lat, lon), city = coordinates, query
+        else:
+            lat, lon, city = await self._geocode(query)
+        response = await _get(
+            self._forecast, "/v1/forecast", {"latitude": lat, "longitude": lon, "current": "temperature_2m"}
+        )
+        if response.status_code == 400:
+            raise LocationNotFoundError(query)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            "temp": data["current"]["temperature_2m"],
+            "lat": data["latitude"],
+            "lon": data["longitude"],
+            "city": city,
+            "observed_at": _parse_open_meteo_time(data["current"].get("time"))
+        }
+
+    async def close(self) -> None:
+        await self._forecast.aclose()
+        await self._geocoding.aclose()
+
+def build_provider(name: str) -> WeatherProvider:
+    """Create a provider by its configured name."""
+    settings = get_settings()
+    if name == "weatherapi":
+        return WeatherApiProvider()
+    if name == "open-meteo":
+        return OpenMeteoProvider(
+            forecast_url=settings.open_meteo_base_url,
+            geocoding_url=settings.open_meteo_geocoding_url
+        )
+    raise ValueError(f"Unknown weather provider: {name}")
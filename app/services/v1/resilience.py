@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional, TypeVar
+import httpx
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt, wait_random_exponential
+from tenacity.stop import stop_base
+from app.config.settings import get_settings
+from app.utils.deadline import time_remaining
+from app.utils.metrics import UPSTREAM_RETRIES
+
+T = TypeVar("T")
+
+# Upstream statuses worth another attempt (throttling and transient server faults)
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Precomputed metric labels
+_RETRY, _HEDGE, _DENIED = ("retry",), ("hedge",), ("denied",)
+
+def consume_exception(task: asyncio.Future) -> None:
+    """Done callback marking a raced task's exception as retrieved.
+
+    When several racers finish together only the winner is looked at; this
+    keeps the others from logging "exception was never retrieved".
+    """
+    if not task.cancelled():
+        task.exception()
+
+def is_retryable(error: BaseException) -> bool:
+    """Transport failures and transient upstream statuses are retryable."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, httpx.TransportError)
+
+class RetryBudget:
+    """Token bucket that caps extra upstream attempts.
+
+    Every logical request deposits `ratio` tokens and every retry or hedge
+    withdraws one, so extra attempts stay below `ratio` of the traffic no
+    matter how many requests fail. `min_per_second` tokens trickle in so
+    low-traffic periods can still retry. The balance is capped at
+    `capacity`, bounding the burst spent at the start of an outage.
+    """
+    def __init__(self, ratio: float, min_per_second: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._balance = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._balance = min(self.capacity, self._balance + amount)
+
+    def deposit(self) -> None:
+        """Credit one logical request."""
+        self._refill(self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """Spend a token for an extra attempt; False when the budget is exhausted."""
+        self._refill(0.0)
+        if self._balance >= 1.0:
+            self._balance -= 1.0
+            return True
+        UPSTREAM_RETRIES.inc(_DENIED)
+        return False
+
+    @property
+    def balance(self) -> float:
+        self._refill(0.0)
+        return self._balance
+
+class LatencyTracker:
+    """Recent successful attempt latencies and a cached percentile of them."""
+    def __init__(self, percentile: float, window: int = 512, min_samples: int = 50, refresh_every: int = 32):
+        self.percentile = percentile
+        self.min_samples = min_samples  # No estimate until this many samples
+        self.refresh_every = refresh_every  # Recompute after this many new samples
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._pending = 0
+        self._estimate: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._pending += 1
+        if self._pending >= self.refresh_every and len(self._samples) >= self.min_samples:
+            ordered = sorted(self._samples)
+            self._estimate = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+            self._pending = 0
+
+    def estimate(self) -> Optional[float]:
+        return self._estimate
+
+class _StopWhenBudgetExhausted(stop_base):
+    """Tenacity stop condition that spends a budget token per retry."""
+    def __init__(self, budget: RetryBudget):
+        self.budget = budget
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        return not self.budget.try_withdraw()
+
+class _StopAtDeadline(stop_base):
+    """Tenacity stop condition: no retry whose backoff would outlast the request deadline."""
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        remaining = time_remaining()
+        return remaining is not None and remaining <= retry_state.upcoming_sleep
+
+class ResiliencePolicy:
+    """Retries with capped, jittered exponential backoff plus optional hedging.
+
+    Each attempt may be hedged: if it has not answered after the recent
+    `hedge_percentile` latency (never less than `hedge_min_delay`), a second
+    identical request is sent and whichever succeeds first wins. Retries
+    and hedges both draw from the same RetryBudget, and neither is started
+    once the current request deadline leaves no time for it.
+    """
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, budget: RetryBudget,
+                 hedge_enabled: bool = False, hedge_percentile: float = 0.95, hedge_min_delay: float = 0.05):
+        self.max_attempts = max_attempts
+        self.budget = budget
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker(hedge_percentile)
+        # Template only: tenacity keeps per-call state on the instance, so each call uses a copy
+        self._retrying = AsyncRetrying(
+            # "Full jitter": sleep a random time up to the capped exponential delay
+            wait=wait_random_exponential(multiplier=base_delay, max=max_delay),
+            # The attempt cap and deadline are checked first, so a retry we would not make spends no token
+            stop=stop_after_attempt(max_attempts) | _StopAtDeadline() | _StopWhenBudgetExhausted(budget),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=lambda retry_state: UPSTREAM_RETRIES.inc(_RETRY),
+            reraise=True
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or untrained."""
+        if not self.hedge_enabled:
+            return None
+        estimate = self.latency.estimate()
+        return None if estimate is None else max(estimate, self.hedge_min_delay)
+
+    async def _timed(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await attempt()
+        self.latency.observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Run one attempt, racing a hedge against it if it is slow."""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(attempt)
+
+        first = asyncio.ensure_future(self._timed(attempt))
+        first.add_done_callback(consume_exception)
+        tasks = {first}
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            remaining = time_remaining()
+            if not done and (remaining is None or remaining > 0) and self.budget.try_withdraw():
+                UPSTREAM_RETRIES.inc(_HEDGE)
+                hedge = asyncio.ensure_future(self._timed(attempt))
+                hedge.add_done_callback(consume_exception)
+                tasks.add(hedge)
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    # Report the first failure if every attempt fails
+                    error = error or task.exception()
+            raise error
+        finally:
+            # The loser (or everything, if we were cancelled) is abandoned
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Run `attempt` (an idempotent upstream request) under the policy."""
+        self.budget.deposit()
+        return await self._retrying.copy()(self._hedged, attempt)
+
+@lru_cache()
+def get_resilience_policy() -> ResiliencePolicy:
+    """Return the process-wide upstream resilience policy built from settings."""
+    settings = get_settings()
+    return ResiliencePolicy(
+        max_attempts=settings.upstream_max_attempts,
+        base_delay=settings.upstream_retry_base_delay,
+        max_delay=settings.upstream_retry_max_delay,
+        budget=RetryBudget(
+            ratio=settings.upstream_retry_budget_ratio,
+            min_per_second=settings.upstream_retry_budget_min_per_second
+        ),
+        hedge_enabled=settings.upstream_hedge_enabled,
+        hedge_percentile=settings.upstream_hedge_percentile,
+        hedge_min_delay=settings.upstream_hedge_min_delay
+    )
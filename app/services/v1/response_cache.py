@@ -0,0 +1,198 @@
+import gzip
+import sys
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+from app.config.settings import get_settings
+
+# Content codings, in the order they are preferred when a client accepts several
+IDENTITY, GZIP, BROTLI, ZSTD = "identity", "gzip", "br", "zstd"
+
+# Bodies are compressed once and served many times, so use the strongest levels.
+# mtime=0 keeps gzip output byte-identical across processes and restarts.
+_ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    GZIP: lambda body: gzip.compress(body, compresslevel=9, mtime=0)
+}
+try:
+    import brotli
+    _ENCODERS[BROTLI] = lambda body: brotli.compress(body, quality=11)
+except ImportError:
+    pass
+try:
+    import zstandard
+    _ENCODERS[ZSTD] = zstandard.ZstdCompressor(level=19).compress
+except ImportError:
+    pass
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content codings this process can produce (br and zstd need optional packages)."""
+    return tuple(_ENCODERS)
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: Optional[str], preference: Tuple[str, ...]) -> str:
+    """Pick the first preferred, supported coding the Accept-Encoding header allows."""
+    if not accept_encoding:
+        return IDENTITY
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    for coding in preference:
+        if coding in _ENCODERS and weights.get(coding, wildcard) > 0:
+            return coding
+    return IDENTITY
+
+# Bookkeeping per entry beyond its key and sources: the OrderedDict slot, the
+# _Body and the (key, coding) tuple
+_ENTRY_OVERHEAD = 256
+
+def _footprint(value: object) -> int:
+    """Approximate bytes held by a key or source, following tuples, lists and dicts."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(map(_footprint, value))
+    elif isinstance(value, dict):
+        size += sum(_footprint(k) + _footprint(v) for k, v in value.items())
+    return size
+
+def _same_sources(a: Sequence[object], b: Sequence[object]) -> bool:
+    # Cached weather data is replaced, never mutated, so identity means unchanged
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+class _Body:
+    """Stored response bytes with the data they were rendered from."""
+    __slots__ = ("sources", "body", "encoding", "size")
+
+    def __init__(self, sources: Tuple[object, ...], body: bytes, encoding: str):
+        self.sources = sources
+        self.body = body
+        self.encoding = encoding
+        self.size = 0  # Bytes charged to the cache, set when stored
+
+class ResponseCache:
+    """Byte- and entry-bounded LRU cache of final response bodies.
+
+    Entries are keyed by (key, coding), where the caller's key names the
+    resource and representation, e.g. (city, format). Each entry remembers
+    the weather data objects it was rendered from and is only served while
+    the weather cache still returns those very objects, so a refresh
+    invalidates it without any bookkeeping. Bodies shorter than `min_size`
+    are stored uncompressed for every coding, as compressing them would
+    not pay off.
+
+    Each entry is charged its body plus its key and the weather data it
+    holds on to (a refreshed city's old data stays alive until the entries
+    rendered from it go), so many small bodies cannot exceed `max_bytes`
+    either.
+    """
+    def __init__(self, max_bytes: int, min_size: int, max_entries: int = 4096):
+        self.max_bytes = max_bytes  # Upper bound on the summed entry sizes
+        self.min_size = min_size  # Smallest body worth compressing
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Body]" = OrderedDict()
+        self._bytes = 0
+        # Counters reported through stats()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.compressions = 0
+
+    def _lookup(self, key: Tuple[Hashable, str], sources: Tuple[object, ...]) -> Optional[_Body]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not _same_sources(entry.sources, sources):
+            # Rendered from data that has since been refreshed
+            self._remove(key)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Tuple[Hashable, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _store(self, key: Tuple[Hashable, str], entry: _Body) -> None:
+        # The same body may be stored under several codings; its charge does not depend on the coding
+        entry.size = len(entry.body) + _ENTRY_OVERHEAD + _footprint(key[0]) + _footprint(entry.sources)
+        if entry.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def get(self, key: Hashable, sources: Tuple[object, ...], encoding: str,
+            render: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """Return (body, coding applied) for `key` rendered from `sources`.
+
+        On a miss the identity body is reused if cached, otherwise `render`
+        is called; the body is then compressed with `encoding` and stored.
+        """
+        entry = self._lookup((key, encoding), sources)
+        if entry is not None:
+            self.hits += 1
+            return entry.body, entry.encoding
+        self.misses += 1
+
+        plain = self._lookup((key, IDENTITY), sources)
+        if plain is None:
+            plain = _Body(sources, render(), IDENTITY)
+            self._store((key, IDENTITY), plain)
+        if encoding == IDENTITY or len(plain.body) < self.min_size:
+            if encoding != IDENTITY:
+                self._store((key, encoding), plain)
+            return plain.body, IDENTITY
+
+        self.compressions += 1
+        entry = _Body(sources, _ENCODERS[encoding](plain.body), encoding)
+        self._store((key, encoding), entry)
+        return entry.body, encoding
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss/invalidation/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "compressions": self.compressions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response body cache built from settings."""
+    settings = get_settings()
+    return ResponseCache(
+        max_bytes=settings.response_cache_max_bytes,
+        min_size=settings.response_cache_compress_min_size,
+        max_entries=settings.response_cache_max_entries
+    )
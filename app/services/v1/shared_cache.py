@@ -0,0 +1,348 @@
+import fcntl
+import marshal
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from app.services.v1.weather_cache import FRESH, MISS, STALE
+
+# File layout: a header, then one array per slot field (sequence, key hash,
+# deadlines, last access, lengths) and finally the fixed-size payload slots.
+# Slots are grouped into sets of `ways`; a key may live in any slot of the set
+# its hash picks. Values are marshalled, so the marshal format is part of the
+# header and the file name, and a file written by another Python version is
+# never reused.
+_MAGIC = b"WXSHM002"
+_FILE_HEADER = struct.Struct("<8sIIII")  # magic, marshal version, slot count, slot size, ways
+_FILE_HEADER_SIZE = 64
+
+# Appended to the configured path, so processes with different layouts (say,
+# old and new workers during a rolling restart) never share a file
+_LAYOUT_SUFFIX = "-{slots}x{slot_bytes}-{ways}w-m{marshal}"
+_LAYOUT_SUFFIX_PATTERN = re.compile(r"-\d+x\d+-\d+w-m\d+")
+
+# Readers retry this often while a writer holds a slot, then report a miss
+_MAX_READ_RETRIES = 64
+
+# Readers refresh a slot's last-access hint at most this often (seconds)
+_ACCESS_RESOLUTION = 0.01
+
+def _key_hash(key_bytes: bytes) -> int:
+    # Stable across processes (unlike hash()); keys are compared on a match,
+    # so this only needs to spread well. 0 marks an empty slot.
+    return (zlib.crc32(key_bytes) << 32 | zlib.adler32(key_bytes)) or 1
+
+class SharedWeatherCache:
+    """Weather cache shared by every worker process on a host.
+
+    Entries live in fixed-size slots of a memory-mapped file (put it on a
+    tmpfs such as /dev/shm), so one fetch warms the cache for all workers
+    and the entries are stored once however many workers there are. The
+    interface matches WeatherCache.
+
+    Reads take no lock: each slot has a sequence number that writers make
+    odd while they write, and a reader retries if the number was odd or
+    changed under it. Writers lock only the slot's set (a byte-range lock),
+    so contention is limited to keys that hash to the same set. A full set
+    evicts an expired entry if it has one, otherwise the least recently
+    read one (readers keep a coarse last-access time per slot).
+
+    Each process keeps up to `memo_entries` decoded values keyed by slot
+    sequence number, so hot hits skip decoding and return the same object
+    until any worker rewrites the entry.
+
+    The file is `path` plus a suffix naming its layout. A mapped file is
+    never truncated or resized: a new one is written aside and renamed into
+    place, so workers still mapping the old one keep reading it safely.
+    """
+    def __init__(self, path: str, ttl: float, stale_ttl: float, max_entries: int,
+                 slot_bytes: int = 512, ways: int = 8, memo_entries: int = 1024):
+        self.ttl = ttl  # Seconds an entry is served as fresh
+        self.stale_ttl = stale_ttl  # Extra seconds an expired entry may be served stale
+        self.ways = ways
+        self.slot_bytes = slot_bytes
+        self.sets = max(1, -(-max_entries // ways))
+        self.slot_count = count = self.sets * ways
+        self.max_entries = count
+        self.memo_entries = memo_entries
+
+        # Array offsets (8-byte fields first, so every array stays aligned)
+        self._size = _FILE_HEADER_SIZE + count * (8 * 5 + 4 + 4) + count * slot_bytes
+        self.path = path + _LAYOUT_SUFFIX.format(slots=count, slot_bytes=slot_bytes, ways=ways,
+                                                 marshal=marshal.version)
+        self._fd = self._open(path)
+        self._map = mmap.mmap(self._fd, self._size)
+        view = memoryview(self._map)
+        offset = _FILE_HEADER_SIZE
+
+        def array(fmt: str, width: int) -> memoryview:
+            nonlocal offset
+            region = view[offset:offset + count * width].cast(fmt)
+            offset += count * width
+            return region
+
+        self._seq = array("Q", 8)  # Odd while being written
+        self._hash = array("Q", 8)  # 0 = empty
+        self._fresh_until = array("d", 8)  # Wall clock, shared by all processes
+        self._stale_until = array("d", 8)
+        self._accessed = array("d", 8)
+        self._value_len = array("I", 4)
+        self._key_len = array("I", 4)
+        self._payload = offset
+        self._view = view
+
+        # Per-process memo: key -> (slot, sequence, key hash, value)
+        self._decoded: "OrderedDict[str, Tuple[int, int, int, Any]]" = OrderedDict()
+        # Per-process counters reported through stats()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def _open(self, base: str) -> int:
+        """Open the file for this layout, writing a new one if it is missing or foreign.
+
+        Creating, replacing and removing files all happen under an exclusive
+        lock on `base`.lock. The returned descriptor holds a shared lock on
+        the file for as long as it is open, marking it in use.
+        """
+        expected = _FILE_HEADER.pack(_MAGIC, marshal.version, self.slot_count, self.slot_bytes, self.ways)
+        lock_fd = os.open(base + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            try:
+                fd = os.open(self.path, os.O_RDWR)
+            except FileNotFoundError:
+                fd = None
+            if fd is not None and (os.fstat(fd).st_size != self._size
+                                   or os.pread(fd, _FILE_HEADER.size, 0) != expected):
+                os.close(fd)  # Left to whoever still maps it; replaced below
+                fd = None
+            if fd is None:
+                staging = self.path + ".tmp"
+                fd = os.open(staging, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+                os.ftruncate(fd, self._size)
+                os.pwrite(fd, expected, 0)
+                os.rename(staging, self.path)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            self._remove_unused_layouts(base)
+            return fd
+        finally:
+            os.close(lock_fd)
+
+    def _remove_unused_layouts(self, base: str) -> None:
+        """Delete files of other layouts that no process has open (caller holds the lock)."""
+        directory, prefix = os.path.split(base)
+        for name in os.listdir(directory or "."):
+            other = os.path.join(directory, name)
+            if (other == self.path or not name.startswith(prefix)
+                    or not _LAYOUT_SUFFIX_PATTERN.fullmatch(name[len(prefix):])):
+                continue
+            try:
+                fd = os.open(other, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                pass  # Still in use by workers with that layout
+            else:
+                os.unlink(other)
+            finally:
+                os.close(fd)
+
+    def _read(self, slot: int, key_bytes: bytes) -> Optional[Tuple[int, Any]]:
+        """Consistent (sequence, value) of a slot holding the key, or None."""
+        start = self._payload + slot * self.slot_bytes
+        for _ in range(_MAX_READ_RETRIES):
+            seq = self._seq[slot]
+            if seq & 1:
+                continue  # Being written
+            key_len, value_len = self._key_len[slot], self._value_len[slot]
+            payload = self._map[start:start + key_len + value_len]
+            if self._seq[slot] != seq:
+                continue  # Rewritten while we copied it
+            if payload[:key_len] != key_bytes:
+                return None  # Hash collision or a different key by now
+            return seq, marshal.loads(payload[key_len:])
+        return None
+
+    def _find(self, key: str) -> Optional[Tuple[int, int, int, Any]]:
+        """Locate a key: (slot, sequence, key hash, value) or None."""
+        memo = self._decoded.get(key)
+        if memo is not None:
+            # Unchanged since we decoded it: no copy, no unmarshalling
+            slot = memo[0]
+            if self._seq[slot] == memo[1] and self._hash[slot] == memo[2]:
+                self._decoded.move_to_end(key)
+                return memo
+            del self._decoded[key]
+
+        key_bytes = key.encode("utf-8")
+        key_hash = _key_hash(key_bytes)
+        hashes = self._hash
+        first = self._set_index(key_hash) * self.ways
+        for slot in range(first, first + self.ways):
+            if hashes[slot] != key_hash:
+                continue
+            found = self._read(slot, key_bytes)
+            if found is not None:
+                memo = (slot, found[0], key_hash, found[1])
+                self._remember(key, memo)
+                return memo
+        return None
+
+    def _set_index(self, key_hash: int) -> int:
+        # The CRC half spreads short, similar keys far better than Adler-32
+        return (key_hash >> 32) % self.sets
+
+    def _remember(self, key: str, memo: Tuple[int, int, int, Any]) -> None:
+        self._decoded[key] = memo
+        self._decoded.move_to_end(key)
+        while len(self._decoded) > self.memo_entries:
+            self._decoded.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[Optional[Any], str]:
+        """Return (value, state) where state is FRESH, STALE or MISS."""
+        found = self._find(key)
+        if found is not None:
+            slot = found[0]
+            now = time.time()
+            # The deadlines belong to the sequence we matched; a concurrent
+            # rewrite only makes this answer as old as the read itself
+            if now < self._stale_until[slot]:
+                if now - self._accessed[slot] > _ACCESS_RESOLUTION:
+                    self._accessed[slot] = now  # Eviction hint only; races are harmless
+                if now < self._fresh_until[slot]:
+                    self.hits += 1
+                    return found[3], FRESH
+                self.stale_hits += 1
+                return found[3], STALE
+        self.misses += 1
+        return None, MISS
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """Seconds until an entry stops being fresh (None if absent).
+
+        Unlike get(), this leaves counters and recency untouched.
+        """
+        found = self._find(key)
+        now = time.time()
+        if found is None or now >= self._stale_until[found[0]]:
+            return None
+        return self._fresh_until[found[0]] - now
+
+    def _victim(self, first: int, key_hash: int, key_bytes: bytes, now: float) -> int:
+        """Slot to write in a set: the key's own, an empty or expired one, else the least recently read."""
+        victim, oldest = first, None
+        for slot in range(first, first + self.ways):
+            stored = self._hash[slot]
+            if stored == key_hash:
+                start = self._payload + slot * self.slot_bytes
+                if self._map[start:start + self._key_len[slot]] == key_bytes:
+                    return slot
+            if stored == 0 or self._stale_until[slot] <= now:
+                rank = -1.0  # Free or expired: take it before any live entry
+            else:
+                rank = self._accessed[slot]
+            if oldest is None or rank < oldest:
+                victim, oldest = slot, rank
+        if oldest is not None and oldest >= 0:
+            self.evictions += 1
+        return victim
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting within the key's set if it is full."""
+        key_bytes = key.encode("utf-8")
+        encoded = marshal.dumps(value)
+        if len(key_bytes) + len(encoded) > self.slot_bytes:
+            self.oversized += 1
+            return
+        key_hash = _key_hash(key_bytes)
+        index = self._set_index(key_hash)
+        now = time.time()
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, index)
+        try:
+            slot = self._victim(index * self.ways, key_hash, key_bytes, now)
+            seq = self._seq[slot] + 1
+            self._seq[slot] = seq  # Odd: readers back off
+            start = self._payload + slot * self.slot_bytes
+            self._map[start:start + len(key_bytes) + len(encoded)] = key_bytes + encoded
+            self._hash[slot] = key_hash
+            self._key_len[slot] = len(key_bytes)
+            self._value_len[slot] = len(encoded)
+            self._fresh_until[slot] = now + self.ttl
+            self._stale_until[slot] = now + self.ttl + self.stale_ttl
+            self._accessed[slot] = now
+            self._seq[slot] = seq + 1
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+        # Later hits in this process return this very object
+        self._remember(key, (slot, seq + 1, key_hash, value))
+
+    def _clear_slot(self, slot: int) -> None:
+        seq = self._seq[slot] + 1
+        self._seq[slot] = seq
+        self._hash[slot] = 0
+        self._stale_until[slot] = self._fresh_until[slot] = 0.0
+        self._seq[slot] = seq + 1
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry."""
+        found = self._find(key)
+        self._decoded.pop(key, None)
+        if found is None:
+            return
+        index = found[0] // self.ways
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, index)
+        try:
+            if self._seq[found[0]] == found[1]:
+                self._clear_slot(found[0])
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+
+    def clear(self) -> None:
+        """Remove all entries (for every process)."""
+        for index in range(self.sets):
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, index)
+            try:
+                for slot in range(index * self.ways, (index + 1) * self.ways):
+                    self._clear_slot(slot)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+        self._decoded.clear()
+
+    def __len__(self) -> int:
+        """Entries (from every process) that are not yet past their stale window."""
+        now = time.time()
+        return sum(1 for slot in range(self.slot_count) if self._hash[slot] and self._stale_until[slot] > now)
+
+    def stats(self) -> dict:
+        """Return shared size and this process's hit/miss/eviction counters."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "bytes": self._size,
+            "decoded": len(self._decoded),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "oversized": self.oversized,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Unmap the file (it stays in place for the other workers) and release its lock."""
+        for region in (self._seq, self._hash, self._fresh_until, self._stale_until,
+                       self._accessed, self._value_len, self._key_len, self._view):
+            region.release()
+        self._map.close()
+        os.close(self._fd)
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.utils.deadline import Deadline, current_deadline, set_deadline
+
+class _Flight:
+    """A shared call: its task, how many callers await it and its deadline."""
+    __slots__ = ("task", "waiters", "deadline", "detached")
+
+    def __init__(self, deadline: Deadline, detached: bool):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.deadline = deadline  # The latest deadline among its callers
+        self.detached = detached  # Runs to completion even with nobody waiting
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one shared task.
+
+    The shared task runs under its own deadline, the latest of its callers'
+    (so a caller with a short deadline does not cut the call short for
+    the others), and is cancelled once every caller has gone away.
+    """
+    def __init__(self):
+        self._inflight: Dict[str, _Flight] = {}  # Running call per key
+
+    def in_flight(self, key: str) -> bool:
+        """Return True if a call for the key is currently running."""
+        return key in self._inflight
+
+    def _launch(self, key: str, fn: Callable[[], Awaitable[Any]], deadline: Deadline,
+                detached: bool) -> _Flight:
+        flight = _Flight(deadline, detached)
+        flight.task = asyncio.ensure_future(self._run(deadline, fn))
+        self._inflight[key] = flight
+        flight.task.add_done_callback(lambda t: self._finish(key, flight))
+        return flight
+
+    @staticmethod
+    async def _run(deadline: Deadline, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # The task has its own copy of the context, so this stays inside it
+        set_deadline(deadline)
+        return await fn()
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Return the running task for a key, starting fn() if there is none.
+
+        The call is detached: it runs to completion without a deadline,
+        whoever waits on it (used for background refreshes).
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            return self._launch(key, fn, Deadline(), detached=True).task
+        flight.detached = True
+        flight.deadline.lift()
+        return flight.task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], cancel_abandoned: bool = True) -> Any:
+        """Await the shared result for a key.
+
+        The shared task is shielded, so a cancelled caller (for example a
+        disconnected client) stops waiting without cancelling the fetch for
+        the other callers. When the last caller leaves, the task is cancelled
+        unless `cancel_abandoned` is False or it was started detached.
+        Exceptions are re-raised to every caller.
+        """
+        deadline = current_deadline()
+        flight = self._inflight.get(key)
+        if flight is None:
+            # A copy: the caller's own deadline is lifted when its response starts
+            own = Deadline()
+            if deadline is not None:
+                own.expires_at = deadline.expires_at
+            flight = self._launch(key, fn, own, detached=False)
+        elif not flight.detached:
+            flight.deadline.extend(deadline)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if cancel_abandoned and not flight.waiters and not flight.detached and not flight.task.done():
+                # Nobody wants the result any more: stop the upstream work
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        """Forget a completed call so the next one starts a fresh task."""
+        self._forget(key, flight)
+        # Mark the exception as retrieved in case every caller went away
+        if not flight.task.cancelled():
+            flight.task.exception()
@@ -0,0 +1,162 @@
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from app.config.settings import get_settings
+from app.services.v1.weather_service import canonical_key, get_cached_weather_data
+from app.utils.logger_config import setup_logger
+
+# Initialize logger for subscription feeds
+logger = setup_logger("subscriptions")
+
+# One city's latest result: (weather_data, status, error), as in batch results
+Update = Tuple[Optional[dict], int, str]
+
+# Weather fields clients see; a new observation with the same values is not pushed
+_VISIBLE_FIELDS = ("temp", "lat", "lon", "city")
+
+class Subscriber:
+    """One subscription stream: the latest unsent update for each of its cities.
+
+    Updates are conflated rather than queued: a newer value for a city
+    replaces one the stream has not sent yet, so a slow consumer skips
+    intermediate values and never holds more than one update per city.
+    """
+    def __init__(self, queries: Dict[str, str]):
+        self.queries = queries  # Cache key -> city as the client asked for it
+        self.closed = False
+        self._pending: Dict[str, Update] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, key: str, update: Update) -> bool:
+        """Queue an update; return True if it replaced one that was never sent."""
+        replaced = key in self._pending
+        self._pending[key] = update
+        self._ready.set()
+        return replaced
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next_updates(self, timeout: float) -> List[Tuple[str, Update]]:
+        """Wait up to `timeout` seconds for updates; [] means none arrived (or closed)."""
+        if not self._pending and not self.closed:
+            self._ready.clear()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._ready.wait()
+            except TimeoutError:
+                return []
+        updates = list(self._pending.items())
+        self._pending.clear()
+        return updates
+
+class _Feed:
+    """A subscribed city: its refresh loop, subscribers and last published update."""
+    __slots__ = ("city", "subscribers", "update", "signature", "task")
+
+    def __init__(self, city: str):
+        self.city = city
+        self.subscribers: Set[Subscriber] = set()
+        self.update: Optional[Update] = None
+        self.signature = None  # What clients see of the update, to detect changes
+        self.task: Optional[asyncio.Task] = None
+
+class SubscriptionHub:
+    """Fan weather updates for subscribed cities out to many streams.
+
+    Each subscribed city has one refresh loop, however many streams
+    subscribe to it. Every `poll_interval` seconds it reads the city
+    through the weather cache (so upstream is still called at most once
+    per cache TTL) and pushes the result only when what clients see has
+    changed. A new subscriber gets the current value straight away. The
+    loop stops when the city's last subscriber leaves.
+    """
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._feeds: Dict[str, _Feed] = {}
+        self._subscribers: Set[Subscriber] = set()
+        # Counters reported through stats()
+        self.polls = 0
+        self.published = 0
+        self.delivered = 0
+        self.conflated = 0
+
+    def subscribe(self, cities: List[str]) -> Subscriber:
+        """Open a subscription to a set of cities (spellings of one city share a feed)."""
+        queries = {}
+        for city in cities:
+            queries.setdefault(canonical_key(city), city)
+        subscriber = Subscriber(queries)
+        for key, city in queries.items():
+            feed = self._feeds.get(key)
+            if feed is None:
+                feed = self._feeds[key] = _Feed(city)
+                feed.task = asyncio.create_task(self._refresh(key, feed))
+            feed.subscribers.add(subscriber)
+            if feed.update is not None:
+                subscriber.push(key, feed.update)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Close a subscription, stopping refresh loops nobody else needs."""
+        self._subscribers.discard(subscriber)
+        for key in subscriber.queries:
+            feed = self._feeds.get(key)
+            if feed is None:
+                continue
+            feed.subscribers.discard(subscriber)
+            if not feed.subscribers:
+                del self._feeds[key]
+                feed.task.cancel()
+
+    def record_delivered(self, count: int) -> None:
+        self.delivered += count
+
+    async def _refresh(self, key: str, feed: _Feed) -> None:
+        while True:
+            try:
+                # Not counted as demand: one poll per interval would otherwise push
+                # subscribed cities to the top of the hot-city tracker and its prefetching
+                weather_data = await get_cached_weather_data(feed.city, track=False)
+                update = (weather_data, 200, "")
+                signature = tuple(weather_data.get(field) for field in _VISIBLE_FIELDS)
+            except HTTPException as e:
+                update = (None, e.status_code, e.detail)
+                signature = update
+            except Exception as e:
+                logger.error("Subscription refresh failed for %s: %s", feed.city, e)
+                update = (None, 500, "Weather service unavailable")
+                signature = update
+            self.polls += 1
+            if signature != feed.signature:
+                feed.update, feed.signature = update, signature
+                self.published += 1
+                for subscriber in feed.subscribers:
+                    if subscriber.push(key, update):
+                        self.conflated += 1
+            await asyncio.sleep(self.poll_interval)
+
+    def close(self) -> None:
+        """End every stream and stop all refresh loops (on shutdown)."""
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        """Return feed and stream counts and update counters."""
+        return {
+            "cities": len(self._feeds),
+            "streams": len(self._subscribers),
+            "polls": self.polls,
+            "published": self.published,
+            "delivered": self.delivered,
+            "conflated": self.conflated
+        }
+
+@lru_cache()
+def get_subscription_hub() -> SubscriptionHub:
+    """Return the process-wide subscription hub built from settings."""
+    return SubscriptionHub(poll_interval=get_settings().subscription_poll_seconds)
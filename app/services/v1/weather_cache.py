@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+from app.config.settings import get_settings
+
+# Lookup outcomes returned by WeatherCache.get
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+@lru_cache(maxsize=8192)
+def normalize_city(city: str) -> str:
+    """Build a cache key from a city name (trimmed, single-spaced, case-folded)."""
+    parts = (" ".join(part.split()) for part in city.split(","))
+    return ", ".join(part for part in parts if part).casefold()
+
+class _Entry:
+    """Cached value with its freshness deadlines."""
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class WeatherCache:
+    """Bounded in-process TTL cache with LRU eviction and a stale window."""
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int):
+        self.ttl = ttl  # Seconds an entry is served as fresh
+        self.stale_ttl = stale_ttl  # Extra seconds an expired entry may be served stale
+        self.max_entries = max_entries  # Upper bound on stored entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Counters reported through stats()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[Optional[Any], str]:
+        """Return (value, state) where state is FRESH, STALE or MISS."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        now = time.monotonic()
+        if now < entry.fresh_until:
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value, FRESH
+        if now < entry.stale_until:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            return entry.value, STALE
+
+        # Past the stale window: drop it and treat as a miss
+        del self._entries[key]
+        self.misses += 1
+        return None, MISS
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """Seconds until an entry stops being fresh (None if absent).
+
+        Unlike get(), this leaves counters and recency untouched.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.fresh_until - time.monotonic()
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        now = time.monotonic()
+        fresh_until = now + self.ttl
+        self._entries[key] = _Entry(value, fresh_until, fresh_until + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss/eviction counters."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+def _build_cache(path: str, ttl: float, stale_ttl: float, max_entries: int):
+    """Create an in-process cache, or a host-wide one when the shared backend is configured."""
+    settings = get_settings()
+    if settings.cache_backend == "shared" and max_entries > 0:
+        from app.services.v1.shared_cache import SharedWeatherCache
+        return SharedWeatherCache(
+            path, ttl=ttl, stale_ttl=stale_ttl, max_entries=max_entries,
+            slot_bytes=settings.cache_shared_slot_bytes
+        )
+    return WeatherCache(ttl=ttl, stale_ttl=stale_ttl, max_entries=max_entries)
+
+@lru_cache()
+def get_weather_cache() -> WeatherCache:
+    """Return the process-wide weather cache built from settings."""
+    settings = get_settings()
+    return _build_cache(
+        settings.cache_shared_path,
+        ttl=settings.cache_ttl_seconds,
+        stale_ttl=settings.cache_stale_seconds,
+        max_entries=settings.cache_max_entries
+    )
+
+@lru_cache()
+def get_negative_cache() -> WeatherCache:
+    """Return the process-wide cache of cities upstream reported as not found."""
+    settings = get_settings()
+    return _build_cache(
+        f"{settings.cache_shared_path}-negative",
+        ttl=settings.negative_cache_ttl_seconds,
+        stale_ttl=0.0,
+        max_entries=settings.negative_cache_max_entries
+    )
@@ -1,58 +1,200 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Optional
 import httpx
 from fastapi import HTTPException
 from app.config.settings import get_settings
+from app.services.v1.admission import get_admission_controller
+from app.services.v1.circuit_breaker import OPEN, get_circuit_breaker
+from app.services.v1.gazetteer import Location, get_gazetteer
+from app.services.v1.heavy_hitters import get_city_tracker
+from app.services.v1.history import get_history_store
+from app.services.v1.provider_router import get_provider_router
+from app.services.v1.providers import LocationNotFoundError
+from app.services.v1.single_flight import SingleFlight
+from app.services.v1.weather_cache import FRESH, STALE, get_negative_cache, get_weather_cache, normalize_city
+from app.utils.deadline import DeadlineExceeded
 from app.utils.logger_config import setup_logger
+from app.utils.metrics import CITY_LOOKUPS, UPSTREAM_ERRORS, UPSTREAM_REQUEST_DURATION
+from app.utils.tracing import span
 
 # Initialize logger for weather service
 logger = setup_logger("weather_service")
 
+# Precomputed metric labels for upstream HTTP error classes
+_STATUS_CLASS_LABELS = {4: ("http_4xx",), 5: ("http_5xx",)}
+
+# Precomputed metric labels for gazetteer lookups
+_RESOLVED, _UNRESOLVED, _REJECTED = ("resolved",), ("unresolved",), ("rejected",)
+
+# In-flight upstream fetches shared by concurrent callers, keyed by cache key
+_flights = SingleFlight()
+
 async def get_weather_data(city: str) -> dict:
-    """Fetch weather data asynchronously from WeatherAPI."""
-    # Retrieve configuration settings, including API keys
-    settings = get_settings()
-    # Define WeatherAPI endpoint
-    url = "https://weatherapi-com.p.rapidapi.com/current.json"
-    
-    # Set request headers for authentication
-    headers = {
-        "X-RapidAPI-Key": settings.api_key,
-        "X-RapidAPI-Host": "weatherapi-com.p.rapidapi.com"
-    }
-    
-    # Define query parameters with city
-    params = {"q": city}
-    
+    """Fetch weather data asynchronously from the configured providers."""
     # Log request initiation
-    logger.debug(f"Fetching weather data for city: {city}")
+    logger.debug("Fetching weather data for city: %s", city)
     
-    # Use async HTTP client for efficient request handling
-    async with httpx.AsyncClient() as client:
-        try:
-            # Send GET request and await response
-            response = await client.get(url, headers=headers, params=params)
-            # Raise exception for HTTP errors
-            response.raise_for_status()
-            # Parse JSON response
-            data = response.json()
-            
-            # Extract relevant weather data
-            weather_data = {
-                "temp": data["current"]["temp_c"],
-                "lat": data["location"]["lat"],
-                "lon": data["location"]["lon"],
-                "city": data["location"]["name"]
-            }
-            # Log successful data retrieval
-            logger.debug(f"Successfully fetched weather data: {weather_data}")
-            return weather_data
-            
-        except httpx.HTTPStatusError as e:
-            # Log HTTP-specific errors
-            logger.error(f"HTTP error fetching weather data for {city}: {str(e)}")
-            # Raise exception for invalid city
-            raise HTTPException(status_code=400, detail=f"City not found: {city}")
-        except Exception as e:
-            # Log unexpected errors
-            logger.error(f"Unexpected error fetching weather data: {str(e)}")
-            # Raise exception for service failure
-            raise HTTPException(status_code=500, detail="Weather service unavailable")
\ No newline at end of file
+    # Fail fast while every provider is known to be down
+    breaker = get_circuit_breaker()
+    if not breaker.allow_request():
+        UPSTREAM_ERRORS.inc(("circuit_open",))
+        raise HTTPException(
+            status_code=503,
+            detail="Weather service unavailable",
+            headers={"Retry-After": str(breaker.retry_after())}
+        )
+
+    start_time = time.perf_counter()
+    try:
+        # Route to a provider (failover/race/weighted); each call is retried/hedged
+        with span("upstream"):
+            weather_data = await get_provider_router().fetch(city)
+        # Record upstream latency (it also drives the admission limit)
+        elapsed = time.perf_counter() - start_time
+        UPSTREAM_REQUEST_DURATION.observe(elapsed, ("ok",))
+        get_admission_controller().observe(elapsed)
+        breaker.record_success()
+        # Log successful data retrieval
+        logger.debug("Successfully fetched weather data: %s", weather_data)
+        return weather_data
+
+    except DeadlineExceeded:
+        elapsed = time.perf_counter() - start_time
+        UPSTREAM_REQUEST_DURATION.observe(elapsed, ("deadline",))
+        get_admission_controller().observe(elapsed, dropped=True)
+        # The request ran out of time; the providers are not to blame
+        logger.info("Request deadline exceeded while fetching weather for %s", city)
+        raise HTTPException(status_code=504, detail="Request Timeout")
+    except asyncio.CancelledError:
+        # Nobody waits for the answer any more (the client hung up): a timeout as far as the limit goes
+        get_admission_controller().observe(time.perf_counter() - start_time, dropped=True)
+        raise
+    except LocationNotFoundError:
+        elapsed = time.perf_counter() - start_time
+        UPSTREAM_REQUEST_DURATION.observe(elapsed, ("not_found",))
+        get_admission_controller().observe(elapsed)
+        # A provider answered correctly; the city is simply unknown
+        breaker.record_success()
+        logger.info("City not found upstream: %s", city)
+        # Raise exception for invalid city
+        raise HTTPException(status_code=400, detail=f"City not found: {city}")
+    except httpx.HTTPStatusError as e:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - start_time, ("http_error",))
+        UPSTREAM_ERRORS.inc(_STATUS_CLASS_LABELS.get(e.response.status_code // 100, ("http_other",)))
+        breaker.record_failure()
+        # Log HTTP-specific errors
+        logger.error("HTTP error fetching weather data for %s: %s", city, e)
+        raise HTTPException(status_code=500, detail="Weather service unavailable")
+    except Exception as e:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - start_time, ("error",))
+        UPSTREAM_ERRORS.inc((type(e).__name__,))
+        breaker.record_failure()
+        # Log unexpected errors
+        logger.error("Unexpected error fetching weather data: %s", e)
+        # Raise exception for service failure
+        raise HTTPException(status_code=500, detail="Weather service unavailable")
+
+@lru_cache(maxsize=4096)
+def _resolve_normalized(normalized: str) -> Optional[Location]:
+    return get_gazetteer().resolve(normalized)
+
+def resolve_location(city: str) -> Optional[Location]:
+    """Look a city up in the offline gazetteer (None when disabled or unknown)."""
+    if not get_settings().gazetteer_enabled:
+        return None
+    # Spelling variants of the same text share one memoized lookup
+    return _resolve_normalized(normalize_city(city))
+
+def canonical_key(city: str) -> str:
+    """Cache key for a city: the gazetteer's canonical key when it resolves."""
+    location = resolve_location(city)
+    return location.key if location is not None else normalize_city(city)
+
+async def _fetch_and_store(key: str, city: str, query: str, location: Optional[Location]) -> dict:
+    """Fetch a city from upstream and store the result (or its absence) in the cache."""
+    try:
+        weather_data = await get_weather_data(query)
+    except HTTPException as e:
+        if e.status_code == 400:
+            # Remember unknown cities briefly so repeats cost no quota
+            get_negative_cache().set(key, e.detail)
+            raise HTTPException(status_code=400, detail=f"City not found: {city}") from None
+        raise
+    if location is not None:
+        # Coordinate queries come back named after the nearest station area
+        weather_data["city"] = location.name
+    get_weather_cache().set(key, weather_data)
+    if get_settings().history_enabled:
+        get_history_store().record(key, weather_data)
+    return weather_data
+
+def refresh_in_background(key: str, city: str) -> Optional[asyncio.Task]:
+    """Start a background refresh of a cache key unless one is in flight.
+
+    Returns the task, or None if the refresh was not started because one
+    is already running, the city is negatively cached or the breaker is
+    open.
+    """
+    if _flights.in_flight(key) or get_circuit_breaker().state == OPEN:
+        return None
+    negative_for = get_negative_cache().fresh_for(key)
+    if negative_for is not None and negative_for > 0:
+        return None
+    location = resolve_location(city)
+    query = location.query if location is not None else city
+    task = _flights.start(key, lambda: _fetch_and_store(key, city, query, location))
+    task.add_done_callback(_log_refresh_failure)
+    return task
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    """Log a failed background refresh; the stale value stays in place."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background refresh failed: %s", task.exception())
+
+async def get_cached_weather_data(city: str, track: bool = True) -> dict:
+    """Return weather data for a city from the cache, fetching on a miss.
+
+    Names the gazetteer knows ("bangalore", "Bengaluru, India") share one
+    canonical key and are fetched by coordinates. Concurrent misses and
+    refreshes for the same key share a single upstream call. Cities
+    upstream recently reported as unknown are rejected from the negative
+    cache, and while the circuit breaker is open stale entries are served
+    without attempting a refresh. With `track=False` the read is not
+    counted as demand for the city (for internal pollers).
+    """
+    settings = get_settings()
+    location = resolve_location(city)
+    if location is not None:
+        CITY_LOOKUPS.inc(_RESOLVED)
+        key, query = location.key, location.query
+    elif settings.gazetteer_enabled and settings.gazetteer_reject_unknown:
+        # Unknown to the gazetteer: answer without a paid upstream round trip
+        CITY_LOOKUPS.inc(_REJECTED)
+        raise HTTPException(status_code=400, detail=f"City not found: {city}")
+    else:
+        CITY_LOOKUPS.inc(_UNRESOLVED)
+        key, query = normalize_city(city), city
+
+    # Feed the hot-city tracker that drives background prefetching
+    if track:
+        get_city_tracker().observe(key, city)
+
+    cache = get_weather_cache()
+    value, state = cache.get(key)
+    if state == FRESH:
+        return value
+    if state == STALE:
+        # Serve stale data now and refresh once in the background
+        refresh_in_background(key, city)
+        return value
+
+    # Known to be unknown: no upstream call until the negative entry expires
+    if get_negative_cache().get(key)[1] == FRESH:
+        raise HTTPException(status_code=400, detail=f"City not found: {city}")
+
+    # Cache miss: join (or start) the shared upstream fetch for this city; it is
+    # cancelled if every request waiting for it goes away first
+    return await _flights.do(key, lambda: _fetch_and_store(key, city, query, location),
+                             cancel_abandoned=settings.deadline_propagation_enabled)
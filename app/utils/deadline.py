@@ -0,0 +1,56 @@
+import math
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the work could finish."""
+
+class Deadline:
+    """The moment (monotonic clock) by which a request must be answered."""
+    __slots__ = ("expires_at",)
+
+    def __init__(self, timeout: float = math.inf):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left (negative once passed, inf when unbounded)."""
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def lift(self) -> None:
+        """Remove the limit (the response has started, or nobody needs one)."""
+        self.expires_at = math.inf
+
+    def extend(self, other: Optional["Deadline"]) -> None:
+        """Push this deadline out to `other`'s if later (None means unbounded)."""
+        self.expires_at = max(self.expires_at, math.inf if other is None else other.expires_at)
+
+# Deadline of the request being handled; tasks inherit it with their context
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the current request's deadline (None outside a request)."""
+    return _current.get()
+
+def set_deadline(deadline: Optional[Deadline]) -> Token:
+    """Make a deadline current; pass the token to reset_deadline() when done."""
+    return _current.set(deadline)
+
+def reset_deadline(token: Token) -> None:
+    _current.reset(token)
+
+def time_remaining() -> Optional[float]:
+    """Seconds left on the current deadline (None when there is no limit)."""
+    deadline = _current.get()
+    if deadline is None or deadline.expires_at == math.inf:
+        return None
+    return deadline.remaining()
+
+def check_deadline() -> None:
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
@@ -1,42 +1,124 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+from datetime import datetime, timezone
 from app.config.settings import get_settings
 
-def setup_logger(name: str) -> logging.Logger:
-    """Configure and return a logger instance."""
+# Attributes present on every LogRecord; anything else came in via `extra=`
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Records travel from the request path to the writer thread through this queue
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler = None
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as one JSON object per line."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            # Already merged with its arguments when the record was queued
+            "message": record.getMessage()
+        }
+        # Structured fields passed with `extra=`
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _MergingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that merges the message only, leaving the line to the listener thread.
+
+    The message is interpolated with its arguments here, on the logging
+    thread, so arguments changed after the call (such as a dict updated in
+    place) are logged as they were. Everything else (JSON encoding,
+    timestamps, tracebacks) is left to the listener; the stock QueueHandler
+    formats the whole line here, since its records may need to be pickled.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def _build_formatter(settings) -> logging.Formatter:
+    """Pick the JSON or plain-text formatter from settings."""
+    if settings.log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+def start_logging() -> None:
+    """Start the background listener that writes queued records."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
     settings = get_settings()
-    
+
     # Create logs directory if it doesn't exist
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    
+    os.makedirs(settings.log_dir, exist_ok=True)
+
+    # File handler
+    file_handler = logging.FileHandler(
+        filename=os.path.join(settings.log_dir, "weather_api.log"),
+        mode="a"
+    )
+    file_handler.setLevel(logging.DEBUG)
+
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+
+    formatter = _build_formatter(settings)
+    file_handler.setFormatter(formatter)
+    console_handler.setFormatter(formatter)
+
+    # Only the listener thread touches the file and the console
+    _listener = logging.handlers.QueueListener(
+        _log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    if _queue_handler is None:
+        _queue_handler = _MergingQueueHandler(_log_queue)
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener (safe to call twice)."""
+    global _listener
+    if _listener is None:
+        return
+    # stop() enqueues a sentinel and waits until everything before it is written
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.flush()
+        handler.close()
+    _listener = None
+
+# Flush anything still queued if the process exits without a shutdown event
+atexit.register(stop_logging)
+
+def setup_logger(name: str) -> logging.Logger:
+    """Configure and return a logger instance.
+
+    The logger only enqueues records; a background listener formats and
+    writes them, so logging never blocks the event loop on I/O.
+    """
+    settings = get_settings()
+    start_logging()
+
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG if settings.environment == "development" else logging.INFO)
-    
+
     # Avoid duplicate handlers if logger is already configured
     if not logger.handlers:
-        # File handler
-        file_handler = logging.FileHandler(
-            filename=os.path.join(log_dir, "weather_api.log"),
-            mode="a"
-        )
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # Add handlers to logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+        logger.addHandler(_queue_handler)
+
+    return logger
@@ -0,0 +1,225 @@
+# Low-overhead in-process metrics rendered in the Prometheus text format.
+# Updates happen on the event loop thread only, so they are plain dict and
+# list operations: no locks and no string formatting. Label values are
+# passed as tuples in the order the metric declares them; everything is
+# turned into text only when /metrics is scraped.
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Default latency buckets in seconds (1 ms to 10 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    """Render a sample value the way Prometheus expects."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence) -> str:
+    """Render a {name="value",...} label set."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class _Metric:
+    """Common metadata for all metric types."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge(_Metric):
+    """Value that can go up and down per label set."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, labels: Tuple = ()) -> None:
+        self._values[labels] = value
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Dict[Tuple, float]],
+                 labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.callback = callback  # Returns {label tuple: value}
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self.callback().items():
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram per label set.
+
+    Each series is a flat list: one slot per bucket, one for +Inf, then the
+    running sum. Observing is a bisect plus two list updates; cumulative
+    counts are built only when rendering.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, labels: Tuple = ()) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (math.inf,)
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, series):
+                cumulative += bucket_count
+                bucket_labels = _label_text(self.labels + ("le",), tuple(labels) + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _label_text(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric (re-registering a name returns the existing one)."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry scraped by GET /metrics
+REGISTRY = Registry()
+
+# Prometheus text exposition content type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    labels=("route", "method", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled."
+))
+UPSTREAM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds",
+    "WeatherAPI call latency by outcome.",
+    labels=("outcome",)
+))
+PROVIDER_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "provider_request_duration_seconds",
+    "Weather provider call latency (including retries) by provider and outcome.",
+    labels=("provider", "outcome")
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "upstream_errors_total",
+    "Failed WeatherAPI calls by reason.",
+    labels=("reason",)
+))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "upstream_retries_total",
+    "Extra WeatherAPI attempts by kind (retry, hedge) and attempts denied by the retry budget.",
+    labels=("kind",)
+))
+RATE_LIMIT_REJECTIONS = REGISTRY.register(Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected with 429 by rate-limit bucket.",
+    labels=("bucket",)
+))
+REQUEST_TIMEOUTS = REGISTRY.register(Counter(
+    "request_timeouts_total",
+    "Requests answered with 504 by the timeout middleware."
+))
+RATE_LIMIT_BACKEND_ERRORS = REGISTRY.register(Counter(
+    "rate_limit_backend_errors_total",
+    "Requests let through unchecked because the rate limit backend failed."
+))
+REQUEST_DISCONNECTS = REGISTRY.register(Counter(
+    "request_disconnects_total",
+    "Requests cancelled because the client disconnected before the response started."
+))
+CITY_LOOKUPS = REGISTRY.register(Counter(
+    "city_lookups_total",
+    "Gazetteer lookups by outcome (resolved, unresolved, rejected).",
+    labels=("outcome",)
+))
+PREFETCH_REFRESHES = REGISTRY.register(Counter(
+    "prefetch_refreshes_total",
+    "Background refreshes of hot cities by outcome (started, budget_exhausted).",
+    labels=("outcome",)
+))
@@ -0,0 +1,92 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+from fastapi.routing import APIRoute
+
+# Span timing the route handler (body parsing, validation, endpoint and serialization);
+# the rest of the time until the response starts is reported as "middleware"
+HANDLER_SPAN = "handler"
+
+class Trace:
+    """Stage timings of one request, summed per span name."""
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Render the spans so far, plus the middleware share and total, as a Server-Timing value."""
+        total = time.perf_counter() - self.started
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        handler = self.spans.get(HANDLER_SPAN)
+        if handler is not None:
+            entries.append(f"middleware;dur={(total - handler) * 1000:.2f}")
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.name, time.perf_counter() - self.started)
+        return False
+
+class _NoSpan:
+    """Stands in for a span when the request is not traced."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+# Trace of the request being handled; tasks inherit it with their context
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    """Return the current request's trace (None when tracing is off)."""
+    return _current.get()
+
+def set_trace(trace: Optional[Trace]) -> Token:
+    """Make a trace current; pass the token to reset_trace() when done."""
+    return _current.set(trace)
+
+def reset_trace(token: Token) -> None:
+    _current.reset(token)
+
+def span(name: str):
+    """Time a block as a stage of the current request (a shared no-op when untraced).
+
+    Spans with the same name add up, so a stage entered several times
+    (or by several tasks of one request) is reported once.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+class TracedRoute(APIRoute):
+    """APIRoute timing its whole handler as the "handler" span."""
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            with span(HANDLER_SPAN):
+                return await handler(request)
+
+        return traced_handler
@@ -0,0 +1,147 @@
+"""Goodput past saturation, with and without admission control.
+
+    python -m benchmarks.bench_admission --capacity 4 --stub-latency 200 \
+        --multiples 1,2,3,5 --duration 10 --slo 1.0
+
+Starts a stub upstream that serves --capacity requests at once (so it
+saturates at capacity / latency requests per second and queues the rest)
+and a uvicorn backend (once with ADMISSION_ENABLED=false, once with true).
+Requests for distinct cities arrive open-loop at each multiple of the
+saturation rate. "goodput" counts 200 answers within the --slo per second;
+later answers are counted as "late", and clients give up at 2 x --slo.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.bench_deadlines import _letters
+from benchmarks.bench_resilience import _stub
+from benchmarks.load_generator import _wait_until_up
+
+@contextlib.contextmanager
+def _backend(port: int, upstream_url: str, admission: bool):
+    env = dict(
+        os.environ,
+        API_KEY="bench",
+        WEATHER_API_URL="http://bench",
+        UPSTREAM_BASE_URL=upstream_url,
+        ADMISSION_ENABLED=str(admission).lower(),
+        PREFETCH_ENABLED="false",
+        RATE_LIMIT_MAX_REQUESTS="1000000000",
+        LOG_SAMPLE_RATE="0",
+        LOG_DIR=tempfile.gettempdir(),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(f"{url}/")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def _drive(base_url: str, rate: float, duration: float, slo: float, tag: str) -> dict:
+    """Send requests at a fixed rate for `duration` seconds, whatever the backend's answers."""
+    counts = {"good": 0, "late": 0, "shed": 0, "gave up": 0, "other": 0}
+    latencies = []
+    health = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=2 * slo) as client:
+        async def one(i: int):
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/v1/getCurrentWeather",
+                    json={"city": f"Busytown {tag} {_letters(i)}", "output_format": "json"}
+                )
+            except httpx.TimeoutException:
+                counts["gave up"] += 1
+                return
+            except httpx.TransportError:
+                counts["other"] += 1
+                return
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                latencies.append(elapsed)
+                counts["good" if elapsed <= slo else "late"] += 1
+            elif response.status_code == 503:
+                counts["shed"] += 1
+            else:
+                counts["other"] += 1
+
+        async def probe():
+            # The health check should stay fast however loaded the weather route is
+            while True:
+                started = time.perf_counter()
+                with contextlib.suppress(httpx.TimeoutException):
+                    await client.get("/")
+                health.append(time.perf_counter() - started)
+                await asyncio.sleep(0.1)
+
+        prober = asyncio.ensure_future(probe())
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(i)))
+        await asyncio.gather(*tasks)
+        prober.cancel()
+        with contextlib.suppress(asyncio.CancelledError, httpx.HTTPError):
+            await prober
+        admission = (await client.get("/", timeout=None)).json()["admission"]
+
+    counts["goodput"] = round(counts["good"] / duration, 1)
+    counts["p99_ms"] = round(_percentile(latencies, 0.99) * 1000)
+    counts["health_p99_ms"] = round(_percentile(health, 0.99) * 1000)
+    counts["limit"] = admission["limit"]
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=4, help="Requests the stub serves at once")
+    parser.add_argument("--stub-latency", type=float, default=200.0, help="Stub service time (ms)")
+    parser.add_argument("--multiples", default="1,2,3,5", help="Arrival rates as multiples of saturation")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--slo", type=float, default=1.0, help="Seconds an answer is still useful")
+    parser.add_argument("--stub-port", type=int, default=9321)
+    parser.add_argument("--backend-port", type=int, default=8321)
+    args = parser.parse_args()
+
+    saturation = args.capacity / (args.stub_latency / 1000)
+    multiples = [float(m) for m in args.multiples.split(",")]
+    for admission in (False, True):
+        for multiple in multiples:
+            # A fresh stub and backend per run: no backlog left upstream, and the initial limit
+            with _stub(args.stub_port, "--latency", f"fixed:{args.stub_latency}",
+                       "--capacity", str(args.capacity)) as upstream_url, \
+                    _backend(args.backend_port, upstream_url, admission) as base_url:
+                result = asyncio.run(_drive(
+                    base_url, saturation * multiple, args.duration, args.slo,
+                    f"{'on' if admission else 'off'} {_letters(int(multiple * 10))}"
+                ))
+            print(
+                    f"admission={'on ' if admission else 'off'} load={multiple:.0f}x "
+                    f"({saturation * multiple:.0f} rps) goodput={result['goodput']:7.1f}/s "
+                    f"good={result['good']:5d} late={result['late']:5d} shed={result['shed']:5d} "
+                    f"gave_up={result['gave up']:5d} other={result['other']:4d} "
+                    f"p99={result['p99_ms']:5d}ms health_p99={result['health_p99_ms']:4d}ms limit={result['limit']}"
+                )
+
+if __name__ == "__main__":
+    main()
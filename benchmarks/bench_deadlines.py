@@ -0,0 +1,122 @@
+"""Upstream calls wasted on requests nobody waits for, with and without deadline propagation.
+
+    python -m benchmarks.bench_deadlines --requests 400 --concurrency 40 \
+        --client-timeout 0.3 --stub-latency uniform:50,900
+
+Starts a slow stub upstream and a uvicorn backend (once with
+DEADLINE_PROPAGATION_ENABLED=false, once with true) and requests distinct
+cities, so every request needs its own upstream call. Clients give up
+after --client-timeout seconds, either by sending it as X-Request-Timeout
+("header") or by hanging up ("disconnect"). "wasted" counts upstream
+answers that no client received; "abandoned" counts upstream calls the
+backend cancelled before they were answered.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import string
+import httpx
+from benchmarks.bench_resilience import _stub
+from benchmarks.load_generator import _wait_until_up
+
+@contextlib.contextmanager
+def _backend(port: int, upstream_url: str, propagate: bool):
+    env = dict(
+        os.environ,
+        API_KEY="bench",
+        WEATHER_API_URL="http://bench",
+        UPSTREAM_BASE_URL=upstream_url,
+        DEADLINE_PROPAGATION_ENABLED=str(propagate).lower(),
+        PREFETCH_ENABLED="false",
+        RATE_LIMIT_MAX_REQUESTS="1000000000",
+        LOG_SAMPLE_RATE="0",
+        LOG_DIR=tempfile.gettempdir(),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(f"{url}/")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+def _letters(i: int) -> str:
+    """Letters-only name suffix (city names may not contain digits)."""
+    suffix = ""
+    while True:
+        i, digit = divmod(i, 26)
+        suffix += string.ascii_lowercase[digit]
+        if not i:
+            return suffix
+
+def _stub_stats(url: str) -> dict:
+    """Stub counters once the calls still running upstream have finished."""
+    while True:
+        stats = httpx.get(f"{url}/_stats").json()
+        if not stats["in_flight"]:
+            return stats
+        time.sleep(0.05)
+
+async def _drive(base_url: str, scenario: str, total: int, concurrency: int, client_timeout: float,
+                 tag: str) -> dict:
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"X-Request-Timeout": str(client_timeout)} if scenario == "header" else {}
+    # The "header" client waits for the backend's 504; the "disconnect" client hangs up
+    timeout = client_timeout + 5 if scenario == "header" else client_timeout
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def one(i: int):
+            async with semaphore:
+                try:
+                    response = await client.post(
+                        "/api/v1/getCurrentWeather", headers=headers,
+                        json={"city": f"Slowtown {tag} {_letters(i)}", "output_format": "json"}
+                    )
+                    status = response.status_code
+                except httpx.TimeoutException:
+                    status = "gave up"
+                statuses[status] = statuses.get(status, 0) + 1
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return statuses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--client-timeout", type=float, default=0.3, help="Seconds a client waits")
+    parser.add_argument("--stub-latency", default="uniform:50,900", help="Stub latency spec (ms)")
+    parser.add_argument("--stub-port", type=int, default=9311)
+    parser.add_argument("--backend-port", type=int, default=8311)
+    args = parser.parse_args()
+
+    with _stub(args.stub_port, "--latency", args.stub_latency) as upstream_url:
+        for propagate in (False, True):
+            with _backend(args.backend_port, upstream_url, propagate) as base_url:
+                for scenario in ("header", "disconnect"):
+                    before = _stub_stats(upstream_url)
+                    statuses = asyncio.run(_drive(
+                        base_url, scenario, args.requests, args.concurrency, args.client_timeout,
+                        f"{scenario} {'on' if propagate else 'off'}"
+                    ))
+                    after = _stub_stats(upstream_url)
+                    calls = after["requests"] - before["requests"]
+                    abandoned = after["abandoned"] - before["abandoned"]
+                    wasted = calls - abandoned - statuses.get(200, 0)
+                    print(
+                        f"propagation={'on ' if propagate else 'off'} {scenario:<10} upstream={calls:5d} "
+                        f"wasted={wasted:5d} abandoned={abandoned:5d} statuses={statuses}"
+                    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Observation history: ingest rate, memory and vectorized query latency.
+
+    python -m benchmarks.bench_history --rows 5000000 --cities 2000 \
+        --query-cities 200 --baseline-rows 1000000
+
+Records --rows observations (every city every --step seconds, newest now)
+into a HistoryStore, then times a 24 h summary and an hourly 24 h series
+for --query-cities cities. The same queries run over a list of tuples in
+pure Python on the first --baseline-rows rows, and both results are checked
+against each other.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+
+from app.services.v1.history import HistoryStore
+
+def _observations(rows: int, cities: int, step: int, now: int, seed: int = 1):
+    """Time-major observations (all cities, then the next step), ending at `now`."""
+    rng = np.random.default_rng(seed)
+    steps = -(-rows // cities)
+    base = rng.uniform(-10, 30, cities)
+    for s in range(steps):
+        at = now - (steps - 1 - s) * step
+        temps = np.round(base + 5 * np.sin(at / 86400 * 2 * np.pi) + rng.normal(0, 1, cities), 1).tolist()
+        for c in range(min(cities, rows - s * cities)):
+            yield f"city{c}", {"temp": temps[c], "lat": c % 90, "lon": c % 180, "city": f"City {c}", "observed_at": at}
+
+def _store(directory: str, rows: int, cities: int, step: int, now: int):
+    store = HistoryStore(directory, retention=10 ** 9)
+    started = time.perf_counter()
+    for key, weather_data in _observations(rows, cities, step, now):
+        store.record(key, weather_data)
+    return store, time.perf_counter() - started
+
+def _timed(fn, repeat: int = 5):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times) * 1000
+
+def _python_summary(rows: list, keys: set, since: int, until: int) -> dict:
+    groups = {}
+    for key, at, temp in rows:
+        if key in keys and since <= at <= until:
+            group = groups.setdefault(key, [0, float("inf"), float("-inf"), 0.0])
+            group[0] += 1
+            group[1] = min(group[1], temp)
+            group[2] = max(group[2], temp)
+            group[3] += temp
+    return {key: (n, low, high, round(total / n, 3)) for key, (n, low, high, total) in groups.items()}
+
+def _python_series(rows: list, keys: set, since: int, until: int, interval: int) -> dict:
+    groups = {}
+    for key, at, temp in rows:
+        if key in keys and since <= at <= until:
+            groups.setdefault((key, since + (at - since) // interval * interval), []).append(temp)
+    return {group: round(sum(temps) / len(temps), 3) for group, temps in groups.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--cities", type=int, default=2000)
+    parser.add_argument("--step", type=int, default=600, help="Seconds between a city's observations")
+    parser.add_argument("--query-cities", type=int, default=200)
+    parser.add_argument("--baseline-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    keys = [f"city{c}" for c in range(0, args.cities, max(1, args.cities // args.query_cities))][:args.query_cities]
+    until = int(time.time())
+    since = until - 86400
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Cross-check against plain Python on a prefix of the data
+        store, _ = _store(os.path.join(directory, "baseline"), args.baseline_rows, args.cities, args.step, until)
+        tracemalloc.start()
+        # Temperatures as stored (float32), so both sides round the same values
+        rows = [(key, data["observed_at"], float(np.float32(data["temp"])))
+                for key, data in _observations(args.baseline_rows, args.cities, args.step, until)]
+        python_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        summary, summary_ms = _timed(lambda: store.summary(keys, since, until))
+        series, series_ms = _timed(lambda: store.resample(keys, since, until, 3600))
+        expected_summary, python_summary_ms = _timed(lambda: _python_summary(rows, set(keys), since, until), 1)
+        expected_series, python_series_ms = _timed(lambda: _python_series(rows, set(keys), since, until, 3600), 1)
+        assert {key: (s["count"], s["min"], s["max"], s["mean"]) for key, s in summary.items()} == {
+            key: (n, round(low, 3), round(high, 3), mean) for key, (n, low, high, mean) in expected_summary.items()
+        }
+        assert {(key, p["time"]): p["mean"] for key, s in series.items() for p in s["points"]} == expected_series
+        stats = store.stats()
+        print(
+            f"rows={args.baseline_rows:,} memory: columns={stats['bytes'] / 2**20:.1f} MiB (mapped) "
+            f"python tuples={python_bytes / 2**20:.1f} MiB"
+        )
+        print(f"  summary  columnar={summary_ms:8.2f} ms  python={python_summary_ms:8.2f} ms")
+        print(f"  series   columnar={series_ms:8.2f} ms  python={python_series_ms:8.2f} ms")
+        store.close()
+        del rows
+
+        store, ingest_seconds = _store(os.path.join(directory, "full"), args.rows, args.cities, args.step, until)
+        _, summary_ms = _timed(lambda: store.summary(keys, since, until))
+        _, series_ms = _timed(lambda: store.resample(keys, since, until, 3600))
+        _, week_ms = _timed(lambda: store.summary(keys, until - 7 * 86400, until))
+        stats = store.stats()  # As of the last query's scan
+        print(
+            f"rows={args.rows:,} ingest={args.rows / ingest_seconds:,.0f} rows/s "
+            f"segments={stats['segments']} ({stats['bytes'] / 2**20:.1f} MiB)"
+        )
+        print(f"  summary 24h={summary_ms:.2f} ms  7d={week_ms:.2f} ms  series 24h hourly={series_ms:.2f} ms "
+              f"({len(keys)} cities)")
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Per-request AsyncClient vs pooled keep-alive client against the stub upstream.
+
+    python -m benchmarks.bench_http_client --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from benchmarks.stub_upstream import create_app, run_in_thread
+
+async def _drive(fetch, total: int, concurrency: int) -> list:
+    """Issue `total` fetches with bounded concurrency and return latencies."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(f"city{i % 100}")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+def _report(name: str, latencies: list, elapsed: float):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{name:<12} rps={len(latencies) / elapsed:8.1f} "
+        f"p50={p(0.50):6.2f}ms p95={p(0.95):6.2f}ms p99={p(0.99):6.2f}ms "
+        f"mean={statistics.mean(latencies) * 1000:6.2f}ms"
+    )
+
+async def bench(base_url: str, total: int, concurrency: int):
+    # Baseline: a fresh client (new connection) per call, as before
+    async def per_request(city):
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            (await client.get("/current.json", params={"q": city})).raise_for_status()
+
+    start = time.perf_counter()
+    latencies = await _drive(per_request, total, concurrency)
+    _report("per-request", latencies, time.perf_counter() - start)
+
+    # Pooled: one long-lived client reusing keep-alive connections
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        async def pooled(city):
+            (await client.get("/current.json", params={"q": city})).raise_for_status()
+
+        start = time.perf_counter()
+        latencies = await _drive(pooled, total, concurrency)
+        _report("pooled", latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9001)
+    args = parser.parse_args()
+    with run_in_thread(create_app(args.latency_ms), port=args.port) as base_url:
+        asyncio.run(bench(base_url, args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Synchronous file/stream logging vs the queue-based JSON pipeline.
+
+Simulates request handlers that log a few lines each on the event loop
+and reports throughput, time spent inside logging calls on the loop and
+the worst event-loop lag seen by a ticker task.
+
+    python -m benchmarks.bench_logging --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+
+from app.utils import logger_config
+
+def sync_logger(log_dir: str) -> logging.Logger:
+    """The previous setup: file and stream handlers called on the loop."""
+    logger = logging.getLogger("bench_sync")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    file_handler = logging.FileHandler(os.path.join(log_dir, "sync.log"))
+    console_handler = logging.StreamHandler(open(os.devnull, "w"))
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+async def simulate(logger: logging.Logger, total: int, concurrency: int, lazy: bool):
+    """Run `total` fake requests and return (rps, ms in log calls, max lag ms)."""
+    payload = {"temp": 23.1, "lat": 12.98, "lon": 77.58, "city": "Bengaluru"}
+    in_logging = 0.0
+    max_lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    async def handler(i):
+        nonlocal in_logging
+        start = time.perf_counter()
+        if lazy:
+            logger.info("Incoming request: %s %s from %s", "POST", "/api/v1/getCurrentWeather", "10.0.0.1")
+            logger.debug("Successfully fetched weather data: %s", payload)
+            logger.info("Completed request: %s %s status=%s duration=%.3fs", "POST", "/api/v1/getCurrentWeather", 200, 0.001)
+        else:
+            logger.info(f"Incoming request: POST /api/v1/getCurrentWeather from 10.0.0.{i % 255}")
+            logger.debug(f"Successfully fetched weather data: {payload}")
+            logger.info(f"Completed request: POST /api/v1/getCurrentWeather status=200 duration={0.001:.3f}s")
+        in_logging += time.perf_counter() - start
+        await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    for offset in range(0, total, concurrency):
+        await asyncio.gather(*(handler(i) for i in range(offset, min(total, offset + concurrency))))
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return total / elapsed, in_logging * 1000, max_lag * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        rps, blocked, lag = asyncio.run(simulate(sync_logger(log_dir), args.requests, args.concurrency, lazy=False))
+        print(f"sync handlers   rps={rps:9.1f} in-log-calls={blocked:8.1f}ms max-loop-lag={lag:6.2f}ms")
+
+        # Queue pipeline writing JSON to the temp dir, console to /dev/null
+        os.environ["LOG_DIR"] = log_dir
+        logger_config.get_settings.cache_clear()
+        sys.stderr = open(os.devnull, "w")
+        logger = logger_config.setup_logger("bench_queue")
+        logger.propagate = False
+        rps, blocked, lag = asyncio.run(simulate(logger, args.requests, args.concurrency, lazy=True))
+        start = time.perf_counter()
+        logger_config.stop_logging()
+        flush_ms = (time.perf_counter() - start) * 1000
+        sys.stderr = sys.__stderr__
+        print(f"queue pipeline  rps={rps:9.1f} in-log-calls={blocked:8.1f}ms max-loop-lag={lag:6.2f}ms "
+              f"(shutdown flush {flush_ms:.1f}ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Old BaseHTTPMiddleware stack vs the pure ASGI middleware stack.
+
+Requests are driven straight into each ASGI app (no sockets), so the
+numbers isolate framework and middleware overhead. The weather route
+uses the stub upstream (and the cache, as in production).
+
+    python -m benchmarks.bench_middleware --requests 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+# Settings are read at import time, so point the app at the stub first
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+os.environ.setdefault("UPSTREAM_BASE_URL", "http://127.0.0.1:9001")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "1000000000")
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from app.main import app as asgi_app
+from app.api.v1 import weather_router
+from benchmarks.stub_upstream import create_app, run_in_thread
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+        except Exception:
+            return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+class LegacyTimeoutMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await asyncio.wait_for(call_next(request), timeout=10)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Request Timeout")
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, max_requests=1_000_000_000, window=60):
+        super().__init__(app)
+        self.max_requests = max_requests
+        self.window = window
+        self.request_counts = defaultdict(list)
+
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host
+        current_time = time.time()
+        self.request_counts[client_ip] = [
+            t for t in self.request_counts[client_ip] if current_time - t < self.window
+        ]
+        if len(self.request_counts[client_ip]) >= self.max_requests:
+            raise HTTPException(status_code=429, detail="Too Many Requests")
+        self.request_counts[client_ip].append(current_time)
+        return await call_next(request)
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        logging.getLogger("http_logger").info(
+            f"Incoming request: {request.method} {request.url} from {request.client.host}"
+        )
+        response = await call_next(request)
+        duration = time.time() - start_time
+        logging.getLogger("http_logger").info(
+            f"Completed request: {request.method} {request.url} "
+            f"status={response.status_code} duration={duration:.3f}s"
+        )
+        return response
+
+def build_legacy_app() -> FastAPI:
+    """Same routes as app.main, behind the previous middleware stack."""
+    legacy = FastAPI()
+    legacy.add_middleware(LegacyErrorHandlerMiddleware)
+    legacy.add_middleware(LegacyTimeoutMiddleware)
+    legacy.add_middleware(LegacyRateLimitMiddleware)
+    legacy.add_middleware(GZipMiddleware, minimum_size=1000)
+    legacy.add_middleware(LegacyLoggingMiddleware)
+    legacy.include_router(weather_router.router, prefix="/api/v1")
+
+    @legacy.get("/")
+    async def health_check():
+        return {"status": "healthy", "message": "Weather API is running"}
+
+    return legacy
+
+async def call(app, method: str, path: str, body: bytes, client_ip: str) -> int:
+    """Drive one request through an ASGI app and return the status code."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("bench", 80),
+        "client": (client_ip, 50000),
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"accept-encoding", b"gzip"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    body_sent = False
+    status = 0
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Never disconnect
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+async def run(app, method, path, body, total, concurrency):
+    """Return (requests per second, p99 latency in ms)."""
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            status = await call(app, method, path, body, f"10.0.{i % 250}.{i % 200}")
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return total / elapsed, latencies[int(0.99 * (len(latencies) - 1))] * 1000
+
+async def bench(total, concurrency):
+    legacy_app = build_legacy_app()
+    weather_body = json.dumps({"city": "Bengaluru", "output_format": "json"}).encode()
+    cases = [("health", "GET", "/", b""), ("weather", "POST", "/api/v1/getCurrentWeather", weather_body)]
+
+    async with asgi_app.router.lifespan_context(asgi_app):
+        for name, method, path, body in cases:
+            for label, app in (("BaseHTTPMiddleware", legacy_app), ("pure ASGI", asgi_app)):
+                # Warm up (fills the weather cache)
+                await run(app, method, path, body, 200, concurrency)
+                rps, p99 = await run(app, method, path, body, total, concurrency)
+                print(f"{name:<8} {label:<19} rps={rps:8.1f} p99={p99:6.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    # Keep log I/O out of the comparison (both stacks log the same lines)
+    logging.disable(logging.INFO)
+    with run_in_thread(create_app(), port=9001):
+        asyncio.run(bench(args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Provider routing policies (failover, race, weighted) against two stub upstreams.
+
+    python -m benchmarks.bench_providers --requests 1500 --concurrency 4
+
+The primary stub is slow and flaky, the secondary fast and healthy.
+Both speak the WeatherAPI format and run in their own processes. The
+router runs without retries so only routing differs between policies;
+"calls" is how many requests each stub received.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.bench_resilience import _stub, _upstream_requests
+from benchmarks.report import format_summary, summarize
+from app.services.v1.provider_router import POLICIES, ProviderRouter
+from app.services.v1.providers import WeatherApiProvider
+
+async def _run(urls: dict, policy: str, total: int, concurrency: int) -> dict:
+    clients = {name: httpx.AsyncClient(base_url=url) for name, url in urls.items()}
+    router = ProviderRouter(
+        [WeatherApiProvider(name, client) for name, client in clients.items()],
+        policy=policy, failure_threshold=10, recovery_seconds=1.0
+    )
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await router.fetch(f"city{i % 200}")
+                status = 200
+            except Exception:
+                status = 500
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    before = {name: _upstream_requests(url) for name, url in urls.items()}
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    summary = summarize(latencies, time.perf_counter() - start, statuses)
+    summary["calls"] = {name: _upstream_requests(url) - before[name] for name, url in urls.items()}
+    await router.close()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--primary-latency", default="lognormal:40,0.5")
+    parser.add_argument("--primary-error-rate", type=float, default=0.05)
+    parser.add_argument("--secondary-latency", default="lognormal:20,0.3")
+    parser.add_argument("--port", type=int, default=9001)
+    args = parser.parse_args()
+
+    primary = _stub(args.port, "--latency", args.primary_latency, "--error-rate", str(args.primary_error_rate),
+                    "--spike-rate", "0.02", "--spike-ms", "500")
+    secondary = _stub(args.port + 1, "--latency", args.secondary_latency)
+    with primary as primary_url, secondary as secondary_url:
+        print(f"primary: {args.primary_latency}, {args.primary_error_rate:.0%} errors, 2% 500 ms spikes; "
+              f"secondary: {args.secondary_latency}")
+        urls = {"primary": primary_url, "secondary": secondary_url}
+        for policy in POLICIES:
+            summary = asyncio.run(_run(urls, policy, args.requests, args.concurrency))
+            print(f"{format_summary(policy, summary)} calls={summary['calls']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-request response rendering cost: previous path vs the fast renderers.
+
+    python -m benchmarks.bench_render --iterations 50000
+"""
+import argparse
+import os
+import timeit
+import xml.etree.ElementTree as ET
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+
+from fastapi.responses import JSONResponse, Response
+from app.schemas.weather import WeatherResponse
+from app.api.v1.renderers import JSON_MEDIA_TYPE, XML_MEDIA_TYPE, render_json, render_xml
+
+WEATHER_DATA = {"temp": 23.1, "lat": 12.98, "lon": 77.58, "city": "Bengaluru"}
+
+def legacy_json():
+    """Model construction, two .dict() calls (one for the debug log) and JSONResponse."""
+    response_data = WeatherResponse(
+        weather=f"{WEATHER_DATA['temp']} C",
+        latitude=str(WEATHER_DATA['lat']),
+        longitude=str(WEATHER_DATA['lon']),
+        city=WEATHER_DATA['city']
+    )
+    f"Returning JSON response: {response_data.model_dump(by_alias=True)}"
+    return JSONResponse(content=response_data.model_dump(by_alias=True))
+
+def legacy_xml():
+    """ElementTree construction and ET.tostring (plus the debug decode)."""
+    root = ET.Element("root")
+    ET.SubElement(root, "Temperature").text = f"{WEATHER_DATA['temp']}"
+    ET.SubElement(root, "City").text = WEATHER_DATA['city']
+    ET.SubElement(root, "Latitude").text = str(WEATHER_DATA['lat'])
+    ET.SubElement(root, "Longitude").text = str(WEATHER_DATA['lon'])
+    xml_str = ET.tostring(root, encoding='utf-8', method='xml')
+    f"Returning XML response: {xml_str.decode('utf-8')}"
+    return Response(content=xml_str, media_type="application/xml")
+
+def fast_json():
+    return Response(content=render_json(WEATHER_DATA), media_type=JSON_MEDIA_TYPE)
+
+def fast_xml():
+    return Response(content=render_xml(WEATHER_DATA), media_type=XML_MEDIA_TYPE)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    # Same bytes on the wire before timing anything
+    assert legacy_json().body == fast_json().body
+    assert legacy_xml().body == fast_xml().body
+
+    for name, legacy, fast in (("json", legacy_json, fast_json), ("xml", legacy_xml, fast_xml)):
+        old = min(timeit.repeat(legacy, number=args.iterations, repeat=3)) / args.iterations * 1e6
+        new = min(timeit.repeat(fast, number=args.iterations, repeat=3)) / args.iterations * 1e6
+        print(f"{name:<5} previous={old:6.2f}us  fast={new:6.2f}us  speedup={old / new:4.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Retry, hedging and retry-budget policies against a spiky, flaky stub upstream.
+
+    python -m benchmarks.bench_resilience --requests 1500 --concurrency 4 \
+        --spike-rate 0.03 --spike-ms 500 --error-rate 0.02
+
+Each policy drives the same load through ResiliencePolicy with a pooled
+client. "amplification" is upstream requests per logical request; the
+outage scenario (every response a 500) shows the retry budget capping it.
+"""
+import argparse
+import asyncio
+import contextlib
+import subprocess
+import sys
+import time
+import httpx
+from benchmarks.load_generator import _wait_until_up
+from benchmarks.report import format_summary, summarize
+from app.services.v1.resilience import ResiliencePolicy, RetryBudget
+
+POLICIES = {
+    "single": dict(max_attempts=1),
+    "retry": dict(max_attempts=3),
+    "hedged": dict(max_attempts=3, hedge_enabled=True),
+}
+
+def _policy(max_attempts: int, hedge_enabled: bool = False) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        max_attempts=max_attempts, base_delay=0.02, max_delay=0.5,
+        budget=RetryBudget(ratio=0.2, min_per_second=1.0),
+        hedge_enabled=hedge_enabled, hedge_percentile=0.95, hedge_min_delay=0.02
+    )
+
+@contextlib.contextmanager
+def _stub(port: int, *options: str):
+    """Run a stub upstream in its own process so it does not share our GIL."""
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(port), *options])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(f"{url}/_stats")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+def _upstream_requests(url: str) -> int:
+    return httpx.get(f"{url}/_stats").json()["requests"]
+
+async def _run(base_url: str, policy: ResiliencePolicy, total: int, concurrency: int,
+               warmup: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        async def request(city: str):
+            response = await client.get("/current.json", params={"q": city})
+            response.raise_for_status()
+            return response
+
+        # Train the hedge latency estimate before measuring
+        for i in range(warmup):
+            try:
+                await policy.call(lambda: request(f"warm{i % 50}"))
+            except Exception:
+                pass
+
+        latencies, statuses = [], {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await policy.call(lambda: request(f"city{i % 200}"))
+                    status = 200
+                except httpx.HTTPStatusError as e:
+                    status = e.response.status_code
+                except httpx.HTTPError:
+                    status = 599
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        before = _upstream_requests(base_url)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        summary = summarize(latencies, time.perf_counter() - start, statuses)
+        summary["amplification"] = round((_upstream_requests(base_url) - before) / total, 3)
+        return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", default="lognormal:20,0.3")
+    parser.add_argument("--spike-rate", type=float, default=0.03)
+    parser.add_argument("--spike-ms", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--port", type=int, default=9001)
+    args = parser.parse_args()
+
+    flaky = _stub(args.port, "--latency", args.latency, "--error-rate", str(args.error_rate),
+                  "--spike-rate", str(args.spike_rate), "--spike-ms", str(args.spike_ms))
+    outage = _stub(args.port + 1, "--latency", args.latency, "--error-rate", "1.0")
+
+    with flaky as flaky_url, outage as outage_url:
+        print(f"flaky upstream: latency={args.latency} spikes={args.spike_rate:.1%}x{args.spike_ms:.0f}ms "
+              f"errors={args.error_rate:.1%}")
+        for name, options in POLICIES.items():
+            summary = asyncio.run(_run(flaky_url, _policy(**options), args.requests, args.concurrency, args.warmup))
+            print(f"{format_summary(name, summary)} amplification={summary['amplification']}")
+
+        print("outage upstream: every response is a 500")
+        for name, options in POLICIES.items():
+            summary = asyncio.run(_run(outage_url, _policy(**options), args.requests, args.concurrency, 0))
+            print(f"{format_summary(name, summary)} amplification={summary['amplification']}")
+
+if __name__ == "__main__":
+    main()
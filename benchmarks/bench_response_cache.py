@@ -0,0 +1,138 @@
+"""Serving batch-sized payloads with and without the response body cache.
+
+Requests are driven straight into the ASGI app (full middleware stack, no
+sockets) with the weather cache pre-filled, so the numbers isolate
+rendering and compression. Without the cache every request re-renders
+the body and the GZip middleware re-compresses it; with it the stored
+pre-compressed bytes are sent as they are.
+
+    python -m benchmarks.bench_response_cache --cities 500 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import string
+import time
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "1000000000")
+
+from app.main import app
+from app.config.settings import get_settings
+from app.services.v1.response_cache import get_response_cache, supported_encodings
+from app.services.v1.weather_cache import get_weather_cache
+from app.services.v1.weather_service import canonical_key
+from benchmarks.report import summarize
+
+def city_names(count: int) -> list:
+    """Distinct letters-only names the gazetteer does not know."""
+    names = []
+    for i in range(count):
+        suffix = ""
+        while True:
+            i, digit = divmod(i, 26)
+            suffix += string.ascii_lowercase[digit]
+            if not i:
+                break
+        names.append(f"Benchville {suffix}")
+    return names
+
+def fill_weather_cache(cities: list) -> None:
+    cache = get_weather_cache()
+    for i, city in enumerate(cities):
+        cache.set(canonical_key(city), {
+            "temp": round(10 + i % 250 / 10, 1), "lat": round(-60 + i % 120, 2),
+            "lon": round(-170 + i % 340, 2), "city": city, "observed_at": 1_700_000_000
+        })
+
+async def call(path: str, body: bytes, accept_encoding: str) -> tuple:
+    """Drive one request through the app; return (status, response bytes)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "server": ("bench", 80), "client": ("10.0.0.1", 50000),
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"accept-encoding", accept_encoding.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    sent = False
+    status, size = 0, 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, size
+
+async def run(path: str, body: bytes, accept_encoding: str, total: int, concurrency: int) -> dict:
+    latencies, statuses, sizes = [], {}, []
+    counter = iter(range(total))
+
+    async def worker():
+        for _ in counter:
+            start = time.perf_counter()
+            status, size = await call(path, body, accept_encoding)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            sizes.append(size)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, time.perf_counter() - start, statuses)
+    summary["bytes"] = max(sizes)
+    return summary
+
+async def bench(cities: list, total: int, concurrency: int) -> None:
+    settings = get_settings()
+    batch = lambda fmt: json.dumps({"cities": cities, "output_format": fmt}).encode()
+    single = json.dumps({"city": cities[0], "output_format": "json"}).encode()
+    cases = [
+        ("batch json", "/api/v1/getCurrentWeatherBatch", batch("json"), "gzip"),
+        ("batch xml", "/api/v1/getCurrentWeatherBatch", batch("xml"), "gzip"),
+        ("single json", "/api/v1/getCurrentWeather", single, "gzip"),
+    ]
+    cases += [(f"batch json {coding}", "/api/v1/getCurrentWeatherBatch", batch("json"), coding)
+              for coding in supported_encodings() if coding != "gzip"]
+    for name, path, body, accept_encoding in cases:
+        for enabled in (False, True):
+            settings.response_cache_enabled = enabled
+            await run(path, body, accept_encoding, 20, concurrency)  # Warm up
+            summary = await run(path, body, accept_encoding, total, concurrency)
+            print(
+                f"{name:<16} cache={'on ' if enabled else 'off'} rps={summary['throughput_rps']:9.1f} "
+                f"p50={summary['p50_ms']:7.2f}ms p99={summary['p99_ms']:7.2f}ms "
+                f"bytes={summary['bytes']:7d} statuses={summary['statuses']}"
+            )
+    print(f"response cache: {get_response_cache().stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    # Keep log I/O out of the comparison
+    logging.disable(logging.INFO)
+    cities = city_names(args.cities)
+    fill_weather_cache(cities)
+    asyncio.run(bench(cities, args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Per-process vs shared (memory-mapped) weather cache across worker processes.
+
+    python -m benchmarks.bench_shared_cache --workers 4 8 16 --lookups 50000
+
+Each worker process replays its own Zipf-distributed stream of city
+lookups, storing a weather entry on every miss (an upstream call in
+production). "hit" is the hit rate over all workers, "upstream" the
+number of misses, and "memory" the cache's own objects summed over
+workers plus, in shared mode, the shared file once.
+"""
+import argparse
+import gc
+import glob
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("WEATHER_API_URL", "http://bench")
+
+from app.services.v1.shared_cache import SharedWeatherCache
+from app.services.v1.weather_cache import WeatherCache
+
+def deep_size(root) -> int:
+    """Bytes of an object and everything it references (each object counted once)."""
+    seen, stack, total = set(), [root], 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+def worker(mode: str, path: str, entries: int, cities: int, lookups: int, skew: float, seed: int,
+           barrier, results) -> None:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(cities)]
+    stream = rng.choices(range(cities), weights=weights, k=lookups)
+    keys = [f"city {i}, xx" for i in range(cities)]
+
+    if mode == "shared":
+        cache = SharedWeatherCache(path, ttl=300, stale_ttl=600, max_entries=entries)
+    else:
+        cache = WeatherCache(ttl=300, stale_ttl=600, max_entries=entries)
+    barrier.wait()
+
+    start = time.perf_counter()
+    hits = 0
+    for i in stream:
+        value, state = cache.get(keys[i])
+        if value is not None:
+            hits += 1
+        else:
+            cache.set(keys[i], {"temp": round(rng.uniform(-10, 40), 1), "lat": 12.98, "lon": 77.58,
+                                "city": f"City {i}", "observed_at": 1_700_000_000})
+    elapsed = time.perf_counter() - start
+    private = deep_size(cache._decoded if mode == "shared" else cache._entries)
+    results.put((hits, lookups - hits, elapsed, private))
+
+def run(mode: str, workers: int, entries: int, cities: int, lookups: int, skew: float) -> dict:
+    path = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                        f"bench-weather-cache-{os.getpid()}")
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, path, entries, cities, lookups, skew, seed, barrier, results))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    shared_bytes = 0
+    # The cache appends its layout to the path and keeps a lock file beside it
+    for name in glob.glob(glob.escape(path) + "-*"):
+        shared_bytes += os.path.getsize(name)
+        os.remove(name)
+    if os.path.exists(path + ".lock"):
+        os.remove(path + ".lock")
+
+    hits = sum(outcome[0] for outcome in outcomes)
+    misses = sum(outcome[1] for outcome in outcomes)
+    return {
+        "hit_rate": hits / (hits + misses),
+        "upstream": misses,
+        "lookups_per_s": sum(lookups / outcome[2] for outcome in outcomes),
+        "memory_bytes": sum(outcome[3] for outcome in outcomes) + shared_bytes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--entries", type=int, default=2048, help="Cache capacity (CACHE_MAX_ENTRIES)")
+    parser.add_argument("--cities", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=50000, help="Lookups per worker")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of city popularity")
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        for mode in ("memory", "shared"):
+            result = run(mode, workers, args.entries, args.cities, args.lookups, args.skew)
+            print(
+                f"workers={workers:<3} {mode:<7} hit={result['hit_rate']:6.1%} upstream={result['upstream']:7d} "
+                f"lookups/s={result['lookups_per_s']:10.0f} memory={result['memory_bytes'] / 2**20:6.1f}MiB"
+            )
+
+if __name__ == "__main__":
+    main()
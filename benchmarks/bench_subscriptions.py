@@ -0,0 +1,128 @@
+"""Polling versus server-sent event subscriptions for wallboard-style clients.
+
+    python -m benchmarks.bench_subscriptions --clients 100 --cities 5 \
+        --poll-interval 5 --duration 30
+
+Starts a stub upstream whose values change every --update-interval seconds
+and a uvicorn backend. Every client watches the same --cities cities,
+first by polling GET /api/v1/weather/{city} every --poll-interval seconds,
+then through one GET /api/v1/subscribe stream each. Reports HTTP requests,
+upstream calls, updates the clients saw and backend CPU time.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.bench_deadlines import _letters
+from benchmarks.bench_resilience import _stub
+from benchmarks.load_generator import _wait_until_up
+
+@contextlib.contextmanager
+def _backend(port: int, upstream_url: str, cache_ttl: float):
+    env = dict(
+        os.environ,
+        API_KEY="bench",
+        WEATHER_API_URL="http://bench",
+        UPSTREAM_BASE_URL=upstream_url,
+        CACHE_TTL_SECONDS=str(cache_ttl),
+        SUBSCRIPTION_POLL_SECONDS="1",
+        PREFETCH_ENABLED="false",
+        RATE_LIMIT_MAX_REQUESTS="1000000000",
+        LOG_SAMPLE_RATE="0",
+        LOG_DIR=tempfile.gettempdir(),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(f"{url}/")
+        yield url, process.pid
+    finally:
+        process.terminate()
+        process.wait()
+
+def _cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process (Linux /proc; 0 elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+async def _poll(base_url: str, clients: int, cities: list, interval: float, duration: float) -> dict:
+    counts = {"requests": 0, "updates": 0}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def wallboard(offset: float):
+            seen = {}
+            await asyncio.sleep(offset)  # Spread clients over the interval
+            ends_at = time.monotonic() + duration - offset
+            while time.monotonic() < ends_at:
+                for city in cities:
+                    response = await client.get(f"/api/v1/weather/{city}", params={"format": "json"})
+                    counts["requests"] += 1
+                    if response.status_code == 200 and seen.get(city) != response.content:
+                        seen[city] = response.content
+                        counts["updates"] += 1
+                await asyncio.sleep(interval)
+
+        await asyncio.gather(*(wallboard(interval * i / clients) for i in range(clients)))
+    return counts
+
+async def _subscribe(base_url: str, clients: int, cities: list, duration: float) -> dict:
+    counts = {"requests": 0, "updates": 0}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        async def wallboard():
+            counts["requests"] += 1
+            async with client.stream("GET", "/api/v1/subscribe", params={"cities": cities}) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        counts["updates"] += 1
+
+        tasks = [asyncio.ensure_future(wallboard()) for _ in range(clients)]
+        await asyncio.sleep(duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--cities", type=int, default=5)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between polls per client")
+    parser.add_argument("--update-interval", type=float, default=10.0, help="Seconds between upstream value changes")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--stub-port", type=int, default=9331)
+    parser.add_argument("--backend-port", type=int, default=8331)
+    args = parser.parse_args()
+
+    cities = [f"Wallboard {_letters(i)}" for i in range(args.cities)]
+    with _stub(args.stub_port, "--update-interval", str(args.update_interval)) as upstream_url:
+        for mode in ("poll", "subscribe"):
+            # Entries expire as upstream values change, so both modes call upstream as often
+            with _backend(args.backend_port, upstream_url, args.update_interval) as (base_url, pid):
+                before_upstream = httpx.get(f"{upstream_url}/_stats").json()["requests"]
+                before_cpu = _cpu_seconds(pid)
+                if mode == "poll":
+                    counts = asyncio.run(_poll(base_url, args.clients, cities, args.poll_interval, args.duration))
+                else:
+                    counts = asyncio.run(_subscribe(base_url, args.clients, cities, args.duration))
+                cpu = _cpu_seconds(pid) - before_cpu
+                upstream = httpx.get(f"{upstream_url}/_stats").json()["requests"] - before_upstream
+            print(
+                f"{mode:<9} requests={counts['requests']:6d} upstream={upstream:4d} "
+                f"updates_seen={counts['updates']:6d} backend_cpu={cpu:6.2f}s"
+            )
+
+if __name__ == "__main__":
+    main()
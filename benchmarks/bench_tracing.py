@@ -0,0 +1,89 @@
+"""Cost of span instrumentation and the Server-Timing header.
+
+    python -m benchmarks.bench_tracing --requests 5000 --concurrency 20 --spans 1000000
+
+Times span() per call outside a traced request (the disabled path), inside
+one, and an empty block for reference. Then drives the weather route (cache
+hits) in-process through the middleware stack of app.main with and without
+the tracing middleware, alternating rounds to even out noise.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+from benchmarks.bench_middleware import run
+from app.main import app as asgi_app
+from app.middleware.tracing import TracingMiddleware
+from app.utils.tracing import Trace, reset_trace, set_trace, span
+from benchmarks.stub_upstream import create_app, run_in_thread
+
+def _per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    fn(iterations)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+def _empty(iterations: int):
+    for _ in range(iterations):
+        pass
+
+def _spans(iterations: int):
+    for _ in range(iterations):
+        with span("bench"):
+            pass
+
+def bench_spans(iterations: int):
+    baseline = _per_call_ns(_empty, iterations)
+    untraced = _per_call_ns(_spans, iterations)
+    token = set_trace(Trace())
+    try:
+        traced = _per_call_ns(_spans, iterations)
+    finally:
+        reset_trace(token)
+    print(f"span() untraced={untraced - baseline:6.1f} ns  traced={traced - baseline:6.1f} ns  (per call)")
+
+def _stacks():
+    """Middleware stacks of app.main with and without the tracing middleware."""
+    with_tracing = asgi_app.build_middleware_stack()
+    middleware = asgi_app.user_middleware
+    asgi_app.user_middleware = [m for m in middleware if m.cls is not TracingMiddleware]
+    try:
+        without_tracing = asgi_app.build_middleware_stack()
+    finally:
+        asgi_app.user_middleware = middleware
+    return without_tracing, with_tracing
+
+async def bench_requests(total: int, concurrency: int, rounds: int):
+    body = json.dumps({"city": "Bengaluru", "output_format": "json"}).encode()
+    path = "/api/v1/getCurrentWeather"
+    without_tracing, with_tracing = _stacks()
+    results = {"off": [], "on": []}
+    async with asgi_app.router.lifespan_context(asgi_app):
+        # Warm up (fills the weather and response caches)
+        for stack in (without_tracing, with_tracing):
+            await run(stack, "POST", path, body, 200, concurrency)
+        for _ in range(rounds):
+            for label, stack in (("off", without_tracing), ("on", with_tracing)):
+                results[label].append(await run(stack, "POST", path, body, total, concurrency))
+    for label, runs in results.items():
+        rps = statistics.median(r[0] for r in runs)
+        p99 = statistics.median(r[1] for r in runs)
+        print(f"weather  tracing={label:<3} rps={rps:8.1f} p99={p99:6.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--spans", type=int, default=1_000_000, help="Iterations of the span() micro-benchmark")
+    args = parser.parse_args()
+    bench_spans(args.spans)
+    # Keep log I/O out of the comparison
+    logging.disable(logging.INFO)
+    with run_in_thread(create_app(), port=9001):
+        asyncio.run(bench_requests(args.requests, args.concurrency, args.rounds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Load generator for /api/v1/getCurrentWeather with skewed city popularity.
+
+By default it starts the stub upstream and a uvicorn backend as
+subprocesses, runs a JSON and an XML scenario, prints throughput and
+p50/p95/p99 latency and saves the result under benchmarks/results/:
+
+    python -m benchmarks.load_generator --duration 20 --concurrency 64 \
+        --stub-latency lognormal:30,0.6 --label baseline
+    python -m benchmarks.report compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Use --target http://host:port to drive an already running backend.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+import httpx
+from benchmarks import report
+
+# Popular cities; popularity follows a Zipf distribution over this order
+CITIES = [
+    "Tokyo", "Delhi", "Shanghai", "Sao Paulo", "Mexico City", "Cairo", "Mumbai", "Beijing",
+    "Dhaka", "Osaka", "New York", "Karachi", "Buenos Aires", "Chongqing", "Istanbul", "Kolkata",
+    "Manila", "Lagos", "Rio de Janeiro", "Tianjin", "Kinshasa", "Guangzhou", "Los Angeles",
+    "Moscow", "Shenzhen", "Lahore", "Bengaluru", "Paris", "Bogota", "Jakarta", "Chennai", "Lima",
+    "Bangkok", "Seoul", "Nagoya", "Hyderabad", "London", "Tehran", "Chicago", "Chengdu", "Nanjing",
+    "Wuhan", "Ho Chi Minh City", "Luanda", "Ahmedabad", "Kuala Lumpur", "Hong Kong", "Dongguan",
+    "Hangzhou", "Foshan", "Shenyang", "Riyadh", "Baghdad", "Santiago", "Surat", "Madrid", "Suzhou",
+    "Pune", "Harbin", "Houston", "Dallas", "Toronto", "Dar es Salaam", "Miami", "Belo Horizonte",
+    "Singapore", "Philadelphia", "Atlanta", "Fukuoka", "Khartoum", "Barcelona", "Johannesburg",
+    "Saint Petersburg", "Qingdao", "Dalian", "Washington", "Yangon", "Alexandria", "Jinan",
+    "Guadalajara", "Abidjan", "Ankara", "Melbourne", "Sydney", "Monterrey", "Nairobi", "Hanoi",
+    "Berlin", "Rome", "Kabul", "Casablanca", "Jeddah", "Cape Town", "Kyiv", "Addis Ababa",
+    "Boston", "Phoenix", "Recife", "Montreal", "Lisbon", "Vienna", "Warsaw", "Budapest", "Prague",
+]
+
+def zipf_sampler(cities, exponent: float, unknown_rate: float, rng: random.Random):
+    """Return a function drawing city names with Zipf-skewed popularity."""
+    weights = [1 / (rank ** exponent) for rank in range(1, len(cities) + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    unknown_counter = itertools.count()
+
+    def sample() -> str:
+        if unknown_rate and rng.random() < unknown_rate:
+            # A small pool of misspelled/nonexistent names
+            return f"Unknown {'abcdefghij'[next(unknown_counter) % 10]}ville"
+        return rng.choices(cities, cum_weights=cumulative, k=1)[0]
+
+    return sample
+
+async def run_scenario(base_url: str, output_format: str, sample_city, duration: float,
+                       concurrency: int, max_requests: int) -> dict:
+    """Drive the backend with `concurrency` closed-loop workers."""
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+    issued = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            while time.perf_counter() < deadline and next(issued) < max_requests:
+                payload = {"city": sample_city(), "output_format": output_format}
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/getCurrentWeather", json=payload)
+                    await response.aread()
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError:
+                    statuses[0] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return report.summarize(latencies, elapsed, statuses)
+
+def _wait_until_up(url: str, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+def start_processes(args):
+    """Start the stub upstream and the backend; return (processes, backend URL, stub URL)."""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    backend_url = f"http://127.0.0.1:{args.backend_port}"
+    stub = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.stub_upstream", "--port", str(args.stub_port),
+        "--latency", args.stub_latency, "--error-rate", str(args.stub_error_rate),
+        "--spike-rate", str(args.stub_spike_rate), "--spike-ms", str(args.stub_spike_ms),
+    ])
+    env = dict(
+        os.environ,
+        API_KEY=os.environ.get("API_KEY", "bench"),
+        WEATHER_API_URL=os.environ.get("WEATHER_API_URL", f"{backend_url}/api/v1/getCurrentWeather"),
+        UPSTREAM_BASE_URL=stub_url,
+        ENVIRONMENT="production",
+        RATE_LIMIT_MAX_REQUESTS=os.environ.get("RATE_LIMIT_MAX_REQUESTS", "1000000000"),
+    )
+    backend = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+        "--port", str(args.backend_port), "--workers", str(args.workers), "--log-level", "warning",
+    ], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _wait_until_up(f"{stub_url}/_stats")
+    _wait_until_up(f"{backend_url}/")
+    return [backend, stub], backend_url, stub_url
+
+async def run(args, base_url: str) -> dict:
+    rng = random.Random(args.seed)
+    sample_city = zipf_sampler(CITIES[:args.cities], args.zipf, args.unknown_rate, rng)
+    scenarios = {}
+    for output_format in args.formats.split(","):
+        summary = await run_scenario(
+            base_url, output_format, sample_city, args.duration, args.concurrency, args.max_requests
+        )
+        scenarios[output_format] = summary
+        print(report.format_summary(output_format, summary))
+    return scenarios
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="", help="backend URL; starts local processes when empty")
+    parser.add_argument("--formats", default="json,xml", help="comma-separated output formats to run")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--max-requests", type=int, default=10**9, help="cap on requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cities", type=int, default=len(CITIES), help="size of the city pool")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of city popularity")
+    parser.add_argument("--unknown-rate", type=float, default=0.02, help="fraction of unknown cities")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run", help="name used for the saved result file")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local backend")
+    parser.add_argument("--backend-port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=9001)
+    parser.add_argument("--stub-latency", default="lognormal:30,0.5")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-spike-rate", type=float, default=0.0)
+    parser.add_argument("--stub-spike-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    processes, stub_url = [], ""
+    base_url = args.target
+    if not base_url:
+        processes, base_url, stub_url = start_processes(args)
+    try:
+        result = {
+            "label": args.label,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: value for key, value in vars(args).items() if key != "no_save"},
+            "scenarios": asyncio.run(run(args, base_url)),
+        }
+        if stub_url:
+            result["upstream"] = httpx.get(f"{stub_url}/_stats").json()
+            print(f"upstream calls: {result['upstream']['requests']}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if not args.no_save:
+        print(f"saved {report.save(result, args.label)}")
+
+if __name__ == "__main__":
+    main()
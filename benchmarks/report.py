@@ -0,0 +1,94 @@
+"""Summaries, saved results and regression comparison for load runs.
+
+    python -m benchmarks.report show benchmarks/results/<run>.json
+    python -m benchmarks.report compare <baseline>.json <candidate>.json --threshold 10
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def summarize(latencies: List[float], elapsed: float, statuses: Dict[int, int]) -> dict:
+    """Build a run summary from latencies (seconds) and status counts."""
+    ordered = sorted(latencies)
+    total = len(ordered)
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+def save(result: dict, label: str, directory: str = RESULTS_DIR) -> str:
+    """Write a run result to `<directory>/<timestamp>-<label>.json`."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def format_summary(name: str, summary: dict) -> str:
+    return (
+        f"{name:<10} rps={summary['throughput_rps']:9.1f} p50={summary['p50_ms']:8.2f}ms "
+        f"p95={summary['p95_ms']:8.2f}ms p99={summary['p99_ms']:8.2f}ms statuses={summary['statuses']}"
+    )
+
+def show(result: dict) -> None:
+    """Print every scenario summary in a saved result."""
+    print(f"run: {result.get('label', '?')} at {result.get('started_at', '?')}")
+    for name, summary in result["scenarios"].items():
+        print(format_summary(name, summary))
+
+def compare(baseline: dict, candidate: dict, threshold_pct: float) -> bool:
+    """Print per-scenario deltas; return False if any metric regressed past the threshold."""
+    ok = True
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name:<10} (no baseline)")
+            continue
+        for metric, higher_is_better in (("throughput_rps", True), ("p50_ms", False),
+                                         ("p95_ms", False), ("p99_ms", False)):
+            before, after = old[metric], new[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            regressed = change < -threshold_pct if higher_is_better else change > threshold_pct
+            ok = ok and not regressed
+            flag = "REGRESSION" if regressed else ""
+            print(f"{name:<10} {metric:<15} {before:10.2f} -> {after:10.2f} ({change:+6.1f}%) {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_parser = commands.add_parser("show")
+    show_parser.add_argument("result")
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        show(load(args.result))
+    else:
+        raise SystemExit(0 if compare(load(args.baseline), load(args.candidate), args.threshold) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Local stand-in for weatherapi-com.p.rapidapi.com/current.json.
+
+Run standalone:
+    python -m benchmarks.stub_upstream --port 9001 --latency lognormal:20,0.5 \
+        --error-rate 0.01 --spike-rate 0.005 --spike-ms 2000
+
+Point the backend at it with UPSTREAM_BASE_URL=http://127.0.0.1:9001.
+
+Latency specs (milliseconds):
+    fixed:20           always 20 ms
+    uniform:5,50       uniform between 5 and 50 ms
+    exp:20             exponential with a 20 ms mean
+    lognormal:20,0.5   log-normal with a 20 ms median and sigma 0.5
+
+--capacity N serves at most N requests at once; the rest queue, so
+latency grows with load past N / latency requests per second.
+
+Cities whose name starts with "Unknown" (case-insensitive) get WeatherAPI's
+400 "No matching location found." error. Temperatures are derived from
+the city name and change every --update-interval seconds. GET /_stats
+returns the stub's request counters ("abandoned" counts callers that hung
+up before their answer was ready).
+
+The stub also answers Open-Meteo-shaped requests (/v1/forecast and
+/v1/search) with the same latency and error injection, so it can stand
+in for the "open-meteo" provider (OPEN_METEO_BASE_URL and
+OPEN_METEO_GEOCODING_URL).
+"""
+import argparse
+import asyncio
+import contextlib
+import math
+import random
+import threading
+import time
+import zlib
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+class StubStats:
+    """Counters shared with benchmarks running in the same process."""
+    def __init__(self):
+        self.requests = 0  # Requests received
+        self.completed = 0  # Requests answered (any status)
+        self.errors = 0  # Injected 5xx errors
+        self.unknown = 0  # Unknown-city 400s
+        self.abandoned = 0  # Callers that hung up before their answer was ready
+        self.in_flight = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a zero-argument sampler returning seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+def create_app(latency_ms: float = 0.0, latency: str = "", error_rate: float = 0.0,
+               spike_rate: float = 0.0, spike_ms: float = 0.0, update_interval: float = 300.0,
+               capacity: int = 0, stats: StubStats = None) -> Starlette:
+    """Build the stub upstream application."""
+    sample_latency = parse_latency(latency) if latency else (lambda: latency_ms / 1000)
+    stats = stats or StubStats()
+    # Requests over capacity queue for a worker, like a saturated upstream
+    workers = asyncio.Semaphore(capacity) if capacity else contextlib.nullcontext()
+
+    def observe(city: str):
+        """Deterministic per-city values that move once per update interval."""
+        seed = zlib.crc32(city.lower().encode())
+        now = int(time.time())
+        interval = max(int(update_interval), 1)
+        epoch = now // interval
+        return {
+            "name": city.split(",")[0].strip().title(),
+            "lat": round((seed % 18000) / 100 - 90, 2),
+            "lon": round(((seed >> 8) % 36000) / 100 - 180, 2),
+            "temp": round(((seed % 400) / 10 - 5) + ((epoch + seed) % 7) * 0.3, 1),
+            "now": now,
+            "observed": now - now % interval
+        }
+
+    def stubbed(handler):
+        """Wrap a route with counters, latency and error injection."""
+        async def endpoint(request: Request):
+            stats.requests += 1
+            stats.in_flight += 1
+            try:
+                # Simulate upstream processing time, with occasional spikes
+                delay = sample_latency()
+                if spike_rate and random.random() < spike_rate:
+                    delay += spike_ms / 1000
+                if delay > 0:
+                    async with workers:
+                        await asyncio.sleep(delay)
+                if await request.is_disconnected():
+                    stats.abandoned += 1
+                if error_rate and random.random() < error_rate:
+                    stats.errors += 1
+                    return JSONResponse({"message": "Internal Server Error"}, status_code=500)
+                return handler(request)
+            finally:
+                stats.in_flight -= 1
+                stats.completed += 1
+        return endpoint
+
+    def current(request: Request):
+        city = request.query_params.get("q", "").strip()
+        if not city or city.lower().startswith("unknown"):
+            stats.unknown += 1
+            return JSONResponse(
+                {"error": {"code": 1006, "message": "No matching location found."}},
+                status_code=400
+            )
+        values = observe(city)
+        return JSONResponse({
+            "location": {
+                "name": values["name"],
+                "lat": values["lat"],
+                "lon": values["lon"],
+                "localtime_epoch": values["now"]
+            },
+            "current": {"temp_c": values["temp"], "last_updated_epoch": values["observed"]}
+        })
+
+    def open_meteo_search(request: Request):
+        name = request.query_params.get("name", "").strip()
+        if not name or name.lower().startswith("unknown"):
+            stats.unknown += 1
+            return JSONResponse({"generationtime_ms": 0.1})
+        values = observe(name)
+        return JSONResponse({"results": [
+            {"name": values["name"], "latitude": values["lat"], "longitude": values["lon"]}
+        ]})
+
+    def open_meteo_forecast(request: Request):
+        lat = request.query_params.get("latitude", "")
+        lon = request.query_params.get("longitude", "")
+        values = observe(f"{lat},{lon}")
+        return JSONResponse({
+            "latitude": float(lat),
+            "longitude": float(lon),
+            "current": {"time": time.strftime("%Y-%m-%dT%H:%M", time.gmtime(values["observed"])),
+                        "temperature_2m": values["temp"]}
+        })
+
+    async def stub_stats(request: Request):
+        return JSONResponse(stats.as_dict())
+
+    app = Starlette(routes=[
+        Route("/current.json", stubbed(current)),
+        Route("/v1/search", stubbed(open_meteo_search)),
+        Route("/v1/forecast", stubbed(open_meteo_forecast)),
+        Route("/_stats", stub_stats)
+    ])
+    app.state.stats = stats
+    return app
+
+@contextlib.contextmanager
+def run_in_thread(app, host: str = "127.0.0.1", port: int = 9001):
+    """Serve an ASGI app with uvicorn in a background thread."""
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    # Wait for the socket to be bound
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub WeatherAPI upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed latency (ms)")
+    parser.add_argument("--latency", default="", help="latency spec, overrides --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="fraction of requests with a spike")
+    parser.add_argument("--spike-ms", type=float, default=0.0, help="extra latency of a spike (ms)")
+    parser.add_argument("--update-interval", type=float, default=300.0, help="seconds between value changes")
+    parser.add_argument("--capacity", type=int, default=0, help="requests served at once (0 = unlimited)")
+    args = parser.parse_args()
+    app = create_app(
+        latency_ms=args.latency_ms, latency=args.latency, error_rate=args.error_rate,
+        spike_rate=args.spike_rate, spike_ms=args.spike_ms, update_interval=args.update_interval,
+        capacity=args.capacity
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import streamlit as st
-from components.weather_display import display_weather
-from utils.api_client import fetch_weather_data
+from components.weather_display import display_weather, display_comparison
+from utils.api_client import fetch_weather_data, fetch_weather_batch, fetch_city_suggestions, MAX_COMPARE_CITIES
 import os
 
 # Set page config
@@ -15,13 +15,39 @@ css_path = os.path.join(os.path.dirname(__file__), "styles.css")
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
+def compare_cities():
+    """Fetch several cities in one batch request and show them side by side."""
+    st.write("Enter one city per line and click 'Compare' to see them side by side!")
+    text = st.text_area("Cities", placeholder="Bangalore\nLondon\nTokyo")
+    # One city per line, since commas may qualify a name ("Paris, France")
+    cities = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(cities) > MAX_COMPARE_CITIES:
+        st.warning(f"Only the first {MAX_COMPARE_CITIES} cities are compared.")
+    compare_button = st.button("Compare")
+
+    if compare_button and cities:
+        with st.spinner(f"Fetching weather for {len(cities)} cities..."):
+            results = fetch_weather_batch(cities)
+        if results:
+            display_comparison(results)
+
 def main():
     """Main function to run the Weather Dashboard."""
     st.markdown('<div class="title">Weather Dashboard</div>', unsafe_allow_html=True)
+    mode = st.radio("Mode", ["Single city", "Compare cities"], horizontal=True, label_visibility="collapsed")
+    if mode == "Compare cities":
+        compare_cities()
+        return
+
     st.write("Enter a city name and click 'Get Weather' to see the current weather!")
 
     # City input and button
     city = st.text_input("City Name", placeholder="e.g., Bangalore")
+    # Offer known matches for what has been typed so far
+    suggestions = fetch_city_suggestions(city) if city else []
+    if suggestions:
+        # The typed text stays selected until the user picks a suggestion
+        city = st.selectbox("Did you mean", [city] + suggestions, index=0)
     fetch_button = st.button("Get Weather")
 
     # Create a placeholder for weather data
@@ -1,9 +1,15 @@
+import pandas as pd
+import pydeck as pdk
 import streamlit as st
 from datetime import datetime
 
+def parse_temperature(temp):
+    """Turn a "23.1 C" reading into a float."""
+    return float(temp.split()[0])
+
 def get_weather_icon(temp):
     """Pick an icon based on temperature."""
-    temp = float(temp.split()[0])
+    temp = parse_temperature(temp)
     if temp > 30:
         return "☀️"  # Hot and sunny
     elif 20 <= temp <= 30:
@@ -40,4 +46,58 @@ def display_weather(weather_data):
     st.markdown('</div>', unsafe_allow_html=True)
 
     # Timestamp
-    st.write(f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+    st.write(f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+def _temperature_color(temp, low, high):
+    """Blend from blue (coldest city) to red (warmest city)."""
+    share = (temp - low) / (high - low) if high > low else 0.5
+    return [int(255 * share), 64, int(255 * (1 - share)), 200]
+
+def display_comparison(results):
+    """Display batch results as a table and a temperature map, then any per-city errors."""
+    rows = []
+    for result in results:
+        if result["status"] != 200:
+            continue
+        data = result["data"]
+        rows.append({
+            "": get_weather_icon(data["Weather"]),
+            "City": data["City"],
+            "Query": result["query"],
+            "Temperature (C)": parse_temperature(data["Weather"]),
+            "Latitude": float(data["Latitude"]),
+            "Longitude": float(data["Longitude"])
+        })
+
+    if rows:
+        table = pd.DataFrame(rows).sort_values("Temperature (C)", ascending=False)
+        st.dataframe(table, hide_index=True, use_container_width=True)
+
+        low, high = table["Temperature (C)"].min(), table["Temperature (C)"].max()
+        points = table.rename(columns={"Temperature (C)": "temp", "Latitude": "lat", "Longitude": "lon"})
+        points["color"] = [_temperature_color(temp, low, high) for temp in points["temp"]]
+        st.pydeck_chart(pdk.Deck(
+            layers=[pdk.Layer(
+                "ScatterplotLayer",
+                data=points[["City", "temp", "lat", "lon", "color"]],
+                get_position=["lon", "lat"],
+                get_fill_color="color",
+                get_radius=60000,
+                radius_min_pixels=4,
+                pickable=True
+            )],
+            initial_view_state=pdk.ViewState(
+                latitude=float(points["lat"].mean()), longitude=float(points["lon"].mean()), zoom=1
+            ),
+            tooltip={"text": "{City}: {temp} C"}
+        ))
+
+    # Cities the backend could not resolve or fetch
+    for result in results:
+        if result["status"] != 200:
+            st.markdown(
+                f'<p class="error">{result["query"]}: {result["error"]}</p>',
+                unsafe_allow_html=True
+            )
+
+    st.write(f"Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
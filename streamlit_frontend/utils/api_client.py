@@ -1,5 +1,8 @@
+import json
 import requests
+from urllib.parse import quote
 import streamlit as st
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import os
 
@@ -9,20 +12,106 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../../.env"))
 # Get the API URL from environment variables
 API_URL = os.environ.get("WEATHER_API_URL")
 
+# Sibling endpoints of the weather endpoint (.../api/v1/...)
+API_BASE_URL = API_URL.rsplit("/", 1)[0] if API_URL else None
+AUTOCOMPLETE_URL = f"{API_BASE_URL}/cities/autocomplete" if API_BASE_URL else None
+BATCH_URL = f"{API_BASE_URL}/getCurrentWeatherBatch" if API_BASE_URL else None
+WEATHER_URL = f"{API_BASE_URL}/weather" if API_BASE_URL else None
+
+# Seconds a fetched result is reused across reruns (the backend caches for 300)
+WEATHER_CACHE_TTL = int(os.environ.get("WEATHER_CACHE_TTL", "60"))
+
+# Largest comparison the backend accepts in one batch request
+MAX_COMPARE_CITIES = 500
+
+# Cities whose last response (and validators) are kept for conditional requests
+MAX_VALIDATED_CITIES = 512
+
+@st.cache_resource
+def get_session():
+    # One pooled keep-alive session shared by every rerun and browser session.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def _validated_responses():
+    # city -> (ETag, Last-Modified, data) of the last full response, shared by all sessions
+    return {}
+
+@st.cache_data(ttl=WEATHER_CACHE_TTL, show_spinner=False)
+def _fetch_weather(city):
+    # Cached per city; errors raise and are therefore never cached.
+    # Once the TTL lapses, revalidate: a 304 reuses the data without a body.
+    known = _validated_responses().get(city)
+    headers = {}
+    if known is not None:
+        etag, last_modified, _ = known
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    response = get_session().get(
+        f"{WEATHER_URL}/{quote(city)}", params={"format": "json"}, headers=headers, timeout=5
+    )
+    if response.status_code == 304 and known is not None:
+        return known[2]
+    response.raise_for_status()
+    data = response.json()
+
+    validated = _validated_responses()
+    validated.pop(city, None)
+    validated[city] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), data)
+    if len(validated) > MAX_VALIDATED_CITIES:
+        # Drop the least recently stored city
+        del validated[next(iter(validated))]
+    return data
+
 def fetch_weather_data(city):
     # Fetch weather data from the FastAPI backend using the URL from .env.
-    if not API_URL:
+    if not WEATHER_URL:
         st.error("WEATHER_API_URL not set in .env file")
         return None
-        
-    payload = {
-        "city": city,
-        "output_format": "json"
-    }
     try:
-        response = requests.post(API_URL, json=payload, timeout=5)
-        response.raise_for_status()
-        return response.json()
+        return _fetch_weather(city.strip())
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching weather data: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+@st.cache_data(ttl=WEATHER_CACHE_TTL, show_spinner=False)
+def _fetch_weather_batch(cities):
+    # One request for all cities; the backend fetches them concurrently and streams NDJSON.
+    response = get_session().post(
+        BATCH_URL, json={"cities": list(cities), "output_format": "json"}, timeout=30
+    )
+    response.raise_for_status()
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+def fetch_weather_batch(cities):
+    # Fetch many cities in one round trip; returns one {"query", "status", "data"|"error"} per city.
+    if not BATCH_URL:
+        st.error("WEATHER_API_URL not set in .env file")
+        return []
+    # Cache on the de-duplicated, order-preserving list so reruns hit the cache
+    unique = tuple(dict.fromkeys(city.strip() for city in cities if city.strip()))[:MAX_COMPARE_CITIES]
+    if not unique:
+        return []
+    try:
+        return _fetch_weather_batch(unique)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error fetching weather data: {str(e)}")
+        return []
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_city_suggestions(prefix, limit=8):
+    # Fetch city name suggestions for a partially typed name; failures just mean no suggestions.
+    if not AUTOCOMPLETE_URL or len(prefix.strip()) < 2:
+        return []
+    try:
+        response = get_session().get(AUTOCOMPLETE_URL, params={"q": prefix.strip(), "limit": limit}, timeout=2)
+        response.raise_for_status()
+        return [item["label"] for item in response.json()]
+    except requests.exceptions.RequestException:
+        return []
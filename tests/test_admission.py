@@ -0,0 +1,134 @@
+"""Admission controller queueing, handover and cancellation (run with `python -m pytest`)."""
+import asyncio
+import pytest
+from app.services.v1.admission import AdmissionController, AimdLimit
+
+def _controller(limit: int = 1, max_queue: int = 4, queue_timeout: float = 5.0) -> AdmissionController:
+    return AdmissionController(AimdLimit(limit, 1, 100, latency_threshold=1.0), max_queue, queue_timeout)
+
+async def _queued(controller: AdmissionController, count: int = 1):
+    """Start `count` acquire() calls and let them join the queue."""
+    tasks = [asyncio.create_task(controller.acquire()) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+def test_admits_up_to_limit_then_queues_and_sheds():
+    async def scenario():
+        controller = _controller(limit=2, max_queue=1)
+        assert await controller.acquire()
+        assert await controller.acquire()
+        (waiter,) = await _queued(controller)
+        assert controller.stats()["queue"] == 1
+        # Queue full: shed at once
+        assert not await controller.acquire()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["queued"], stats["shed"], stats["queue"]) == (2, 1, 1, 0)
+
+def test_release_hands_slot_to_waiter():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire()
+        (waiter,) = await _queued(controller)
+        controller.release()
+        assert await waiter
+        # The slot passed over directly: still one in flight
+        assert controller.in_flight == 1
+        controller.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["admitted"], stats["queue"]) == (0, 2, 0)
+
+def test_queue_timeout_sheds():
+    async def scenario():
+        controller = _controller(queue_timeout=0.02)
+        assert await controller.acquire()
+        assert not await controller.acquire()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["queue_timeouts"], stats["shed"], stats["queue"], stats["in_flight"]) == (1, 1, 0, 1)
+
+def test_newest_waiter_first_once_queue_backs_up():
+    async def scenario():
+        controller = _controller(limit=2, max_queue=3)
+        assert await controller.acquire()
+        assert await controller.acquire()
+        oldest, middle, newest = await _queued(controller, 3)
+        # Three waiters for a limit of two: adaptive LIFO serves the newest
+        controller.release()
+        await asyncio.sleep(0)
+        assert newest.done() and not oldest.done() and not middle.done()
+        controller.release()
+        await asyncio.sleep(0)
+        # Back within the limit's worth of waiters: oldest first again
+        assert oldest.done() and not middle.done()
+        middle.cancel()
+        await asyncio.gather(oldest, newest, middle, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+def test_raised_limit_admits_waiters():
+    async def scenario():
+        controller = _controller(max_queue=2)
+        assert await controller.acquire()
+        waiters = await _queued(controller, 2)
+        controller.limit.limit = 3
+        controller.observe(0.01)
+        assert all(await asyncio.gather(*waiters))
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue"]) == (3, 0)
+
+def test_cancelled_waiter_dropped_by_release():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire()
+        (waiter,) = await _queued(controller)
+        # Client gone: the release in the same loop turn skips the cancelled waiter
+        waiter.cancel()
+        controller.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue"]) == (0, 0)
+
+def test_cancelled_waiter_dropped_by_observe():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire()
+        (waiter,) = await _queued(controller)
+        waiter.cancel()
+        controller.limit.limit = 2
+        controller.observe(0.01)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["in_flight"], stats["queue"]) == (1, 0)
+
+def test_release_as_queue_timeout_fires():
+    async def scenario():
+        controller = _controller(queue_timeout=0.05)
+        assert await controller.acquire()
+        loop = asyncio.get_running_loop()
+        (waiter,) = await _queued(controller)
+        loop.call_later(0.05, controller.release)
+        admitted = await waiter
+        if admitted:
+            controller.release()
+        return controller.stats()
+
+    # Whichever fires first, the request is admitted or shed and no slot leaks
+    for _ in range(20):
+        stats = asyncio.run(scenario())
+        assert (stats["in_flight"], stats["queue"]) == (0, 0)
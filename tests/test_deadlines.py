@@ -0,0 +1,58 @@
+"""Deadline propagation against a slow upstream (run with `python -m pytest`).
+
+A stub upstream answers after 600 ms and a uvicorn backend is started with
+DEADLINE_PROPAGATION_ENABLED on and off. Clients give up after 200 ms,
+either by sending X-Request-Timeout or by hanging up. "wasted" counts
+upstream answers no client received; "abandoned" counts upstream calls the
+backend cancelled before they were answered.
+"""
+import asyncio
+import socket
+import pytest
+from benchmarks.bench_deadlines import _backend, _drive, _stub_stats
+from benchmarks.bench_resilience import _stub
+
+STUB_LATENCY_MS = 600
+CLIENT_TIMEOUT = 0.2
+REQUESTS = 20
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def upstream_url():
+    with _stub(_free_port(), "--latency", f"fixed:{STUB_LATENCY_MS}") as url:
+        yield url
+
+@pytest.fixture(scope="module", params=[True, False], ids=["propagation on", "propagation off"])
+def backend(request, upstream_url):
+    with _backend(_free_port(), upstream_url, request.param) as base_url:
+        yield base_url, request.param
+
+@pytest.mark.parametrize("scenario", ["header", "disconnect"])
+def test_upstream_calls_for_abandoned_requests(backend, upstream_url, scenario):
+    base_url, propagate = backend
+    before = _stub_stats(upstream_url)
+    statuses = asyncio.run(_drive(
+        base_url, scenario, REQUESTS, REQUESTS, CLIENT_TIMEOUT, f"test {scenario} {'on' if propagate else 'off'}"
+    ))
+    after = _stub_stats(upstream_url)
+    calls = after["requests"] - before["requests"]
+    abandoned = after["abandoned"] - before["abandoned"]
+    wasted = calls - abandoned - statuses.get(200, 0)
+
+    # Nobody can be answered in time: every client gets a 504 or gives up
+    assert statuses.get(200, 0) == 0
+    if scenario == "header":
+        assert statuses == {504: REQUESTS}
+    # (a request cancelled early enough never calls upstream at all)
+    assert 0 < calls <= REQUESTS
+    if propagate:
+        # Every upstream call is cancelled once its request's deadline has passed
+        assert wasted == 0
+        assert abandoned > 0
+    else:
+        # Without propagation the calls run to completion for nobody
+        assert wasted > 0
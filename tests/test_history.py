@@ -0,0 +1,81 @@
+"""Observation history shared by workers through one directory (run with `python -m pytest`).
+
+Each HistoryStore stands in for a worker process: it owns its own segment
+files and file lock, as a separate process would.
+"""
+import os
+import time
+import pytest
+
+os.environ.setdefault("API_KEY", "test")
+os.environ.setdefault("WEATHER_API_URL", "http://test")
+
+from app.services.v1.history import HistoryStore
+from app.utils.logger_config import stop_logging
+
+NOW = int(time.time())
+
+def _record(store: HistoryStore, key: str, temp: float, observed_at: int):
+    store.record(key, {"temp": temp, "lat": 1.0, "lon": 2.0, "city": key.title(), "observed_at": observed_at})
+
+def _wait_for_background(store: HistoryStore):
+    store._background.submit(lambda: None).result()
+
+@pytest.fixture(scope="module", autouse=True)
+def _logging():
+    yield
+    # Write out queued records while pytest's captured console is still open
+    stop_logging()
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path)
+
+def test_workers_see_each_others_rows_once(directory):
+    first, second = HistoryStore(directory, chunk_rows=4), HistoryStore(directory, chunk_rows=4)
+    for i in range(6):
+        # Both workers fetched the same observations; the second seals a segment halfway
+        _record(first, "paris", 10 + i, NOW - 600 * i)
+        _record(second, "paris", 10 + i, NOW - 600 * i)
+    _record(second, "oslo", -3, NOW)
+    _wait_for_background(second)
+    assert any(name.endswith(".arrow") for name in os.listdir(directory))
+    summary = first.summary(["paris", "oslo", "paris"], NOW - 86400, NOW)
+    assert (summary["paris"]["count"], summary["paris"]["mean"]) == (6, 12.5)
+    assert summary["oslo"]["count"] == 1
+    first.close()
+    second.close()
+
+def test_rows_past_retention_are_not_returned(directory):
+    store = HistoryStore(directory, retention=3600)
+    _record(store, "oslo", -9, NOW - 7200)
+    _record(store, "oslo", -3, NOW)
+    assert store.summary(["oslo"], NOW - 86400, NOW)["oslo"]["count"] == 1
+    store.close()
+
+def test_expiry_keeps_active_segment_of_idle_worker(directory):
+    idle = HistoryStore(directory, chunk_rows=10, retention=3600)
+    _record(idle, "rome", 20, NOW - 7200)
+    busy = HistoryStore(directory, chunk_rows=2, retention=3600)
+    for i in range(5):
+        _record(busy, "oslo", i, NOW - 7200 - i)
+    _wait_for_background(busy)
+    assert busy.stats()["expired_segments"] == 2
+    assert os.path.exists(idle._active.base + ".active")
+    idle.close()
+    busy.close()
+
+def test_segment_of_dead_worker_is_sealed(directory):
+    dead = HistoryStore(directory)
+    _record(dead, "lima", 18, NOW)
+    # Exit without sealing: the segment's file lock is released
+    dead._background.shutdown()
+    os.close(dead._active._fd)
+    os.close(dead._active._cities_fd)
+    base = dead._active.base
+    del dead
+    survivor = HistoryStore(directory)
+    _wait_for_background(survivor)
+    assert os.path.exists(base + ".arrow") and not os.path.exists(base + ".active")
+    assert survivor.summary(["lima"], NOW - 3600, NOW)["lima"]["count"] == 1
+    survivor.close()
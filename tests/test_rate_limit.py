@@ -0,0 +1,117 @@
+"""Shared (Redis) rate limit backend against an in-process stand-in (run with `python -m pytest`)."""
+import asyncio
+import time
+import pytest
+from app.middleware import rate_limit_backends
+from app.middleware.rate_limit_backends import RedisRateLimitBackend
+
+WINDOW = 60.0
+
+class LocalRedisStandIn:
+    """In-process stand-in for the redis.asyncio commands the backend uses, counting round trips."""
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.round_trips = 0
+
+    def _expire_if_needed(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.time():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+
+    def _incr(self, key, amount=1):
+        self._expire_if_needed(key)
+        self.values[key] = self.values.get(key, 0) + amount
+        return self.values[key]
+
+    def _expire(self, key, seconds):
+        self.expires[key] = time.time() + seconds
+        return True
+
+    def _get(self, key):
+        self._expire_if_needed(key)
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    async def decr(self, key):
+        self.round_trips += 1
+        return self._incr(key, -1)
+
+    async def aclose(self):
+        pass
+
+class _Pipeline:
+    """Buffers commands and runs them back to back on execute(), as MULTI/EXEC does."""
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def incr(self, key):
+        self.commands.append((self.redis._incr, key))
+        return self
+
+    def expire(self, key, seconds):
+        self.commands.append((self.redis._expire, key, seconds))
+        return self
+
+    def get(self, key):
+        self.commands.append((self.redis._get, key))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        commands, self.commands = self.commands, []
+        return [command(*args) for command, *args in commands]
+
+@pytest.fixture
+def now(monkeypatch):
+    """Pin the clock halfway through a window."""
+    at = [1000 * WINDOW + WINDOW / 2]
+    monkeypatch.setattr(rate_limit_backends.time, "time", lambda: at[0])
+    return at
+
+def _hits(backend, count: int, limit: int):
+    async def run():
+        return [await backend.hit("10.0.0.1", limit, WINDOW) for _ in range(count)]
+    return asyncio.run(run())
+
+def test_only_allowed_requests_count(now):
+    redis = LocalRedisStandIn()
+    results = _hits(RedisRateLimitBackend(redis, prefix=""), 8, limit=5)
+    assert [r.allowed for r in results] == [True] * 5 + [False] * 3
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+    assert redis.values["10.0.0.1:1000"] == 5
+    # One round trip per allowed request, two per rejected one
+    assert redis.round_trips == 5 + 3 * 2
+
+def test_counter_always_has_expiry(now):
+    redis = LocalRedisStandIn()
+    _hits(RedisRateLimitBackend(redis, prefix=""), 3, limit=5)
+    assert set(redis.values) == set(redis.expires) == {"10.0.0.1:1000"}
+    assert redis.expires["10.0.0.1:1000"] == now[0] + 2 * WINDOW
+
+def test_previous_window_is_weighted_by_overlap(now):
+    redis = LocalRedisStandIn()
+    redis.values["10.0.0.1:999"] = 10
+    results = _hits(RedisRateLimitBackend(redis, prefix=""), 7, limit=10)
+    # Half of the previous window's 10 requests still fall inside the sliding window
+    assert [r.allowed for r in results] == [True] * 5 + [False] * 2
+    assert results[-1].retry_after == 30
+
+def test_counters_expire_with_idle_clients(now):
+    redis = LocalRedisStandIn()
+    backend = RedisRateLimitBackend(redis, prefix="")
+    _hits(backend, 5, limit=5)
+    now[0] += 3 * WINDOW
+    assert _hits(backend, 1, limit=5)[0].allowed
+    assert redis._get("10.0.0.1:1000") is None
@@ -0,0 +1,135 @@
+"""Retry budget, hedging and deadlines against local stub upstreams (run with `python -m pytest`).
+
+Each stub runs in its own process: a failing one (every response a 500),
+a fast one (10 ms) and a slow one (300 ms). The ResiliencePolicy under
+test runs here, calling them through a pooled client.
+"""
+import asyncio
+import socket
+import time
+import httpx
+import pytest
+from benchmarks.bench_deadlines import _stub_stats
+from benchmarks.bench_resilience import _stub
+from app.services.v1.resilience import ResiliencePolicy, RetryBudget
+from app.utils.deadline import Deadline, reset_deadline, set_deadline
+
+FAST_MS = 10
+SLOW_MS = 300
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def failing_url():
+    with _stub(_free_port(), "--latency", f"fixed:{FAST_MS}", "--error-rate", "1") as url:
+        yield url
+
+@pytest.fixture(scope="module")
+def fast_url():
+    with _stub(_free_port(), "--latency", f"fixed:{FAST_MS}") as url:
+        yield url
+
+@pytest.fixture(scope="module")
+def slow_url():
+    with _stub(_free_port(), "--latency", f"fixed:{SLOW_MS}") as url:
+        yield url
+
+def _policy(budget: RetryBudget, max_attempts: int = 5, base_delay: float = 0.001,
+            hedge_enabled: bool = False) -> ResiliencePolicy:
+    return ResiliencePolicy(
+        max_attempts=max_attempts, base_delay=base_delay, max_delay=1.0, budget=budget,
+        hedge_enabled=hedge_enabled, hedge_percentile=0.95, hedge_min_delay=0.02
+    )
+
+def _fixed_budget(tokens: float) -> RetryBudget:
+    """A budget of exactly `tokens` extra attempts (nothing deposited or trickling in)."""
+    return RetryBudget(ratio=0.0, min_per_second=0.0, capacity=tokens)
+
+def _request(client: httpx.AsyncClient, url: str):
+    async def attempt():
+        response = await client.get(f"{url}/current.json", params={"q": "London"})
+        response.raise_for_status()
+        return url
+    return attempt
+
+def test_exhausted_budget_stops_retries(failing_url):
+    calls, tokens = 10, 3
+    policy = _policy(_fixed_budget(tokens))
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            for _ in range(calls):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await policy.call(_request(client, failing_url))
+
+    before = _stub_stats(failing_url)["requests"]
+    asyncio.run(scenario())
+    # Five attempts allowed per call, but only three retries in the whole budget
+    assert _stub_stats(failing_url)["requests"] - before == calls + tokens
+    assert policy.budget.balance < 1
+
+def test_hedge_fires_after_percentile_delay_and_spends_budget(fast_url, slow_url):
+    policy = _policy(_fixed_budget(5), max_attempts=1, hedge_enabled=True)
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            # Train the latency estimate on the fast upstream (no hedge until trained)
+            for _ in range(policy.latency.min_samples + policy.latency.refresh_every):
+                await policy.call(_request(client, fast_url))
+            delay = policy.hedge_delay()
+            balance = policy.budget.balance
+            # The first attempt goes to the slow upstream, the hedge to the fast one
+            urls = iter([slow_url, fast_url])
+            started = time.perf_counter()
+            winner = await policy.call(lambda: _request(client, next(urls))())
+            return delay, balance, winner, time.perf_counter() - started
+
+    slow_before = _stub_stats(slow_url)
+    delay, balance, winner, elapsed = asyncio.run(scenario())
+    assert delay is not None and FAST_MS / 1000 <= delay < SLOW_MS / 1000
+    assert winner == fast_url
+    assert delay <= elapsed < SLOW_MS / 1000
+    assert policy.budget.balance == balance - 1
+    # The slow attempt was abandoned once the hedge won
+    slow_after = _stub_stats(slow_url)
+    assert slow_after["requests"] - slow_before["requests"] == 1
+    assert slow_after["abandoned"] - slow_before["abandoned"] == 1
+
+def test_no_hedge_without_budget(fast_url, slow_url):
+    policy = _policy(_fixed_budget(0), max_attempts=1, hedge_enabled=True)
+    for _ in range(policy.latency.min_samples + policy.latency.refresh_every):
+        policy.latency.observe(FAST_MS / 1000)
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            urls = iter([slow_url, fast_url])
+            return await policy.call(lambda: _request(client, next(urls))())
+
+    assert asyncio.run(scenario()) == slow_url
+
+def test_no_retry_scheduled_past_deadline(failing_url):
+    timeout = 0.3
+    # Backoff of up to 0.2, 0.4, 0.8 s: only the first few sleeps can fit the deadline
+    policy = _policy(_fixed_budget(100), max_attempts=10, base_delay=0.2)
+
+    async def scenario():
+        token = set_deadline(Deadline(timeout))
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient() as client:
+                with pytest.raises(httpx.HTTPStatusError):
+                    await policy.call(_request(client, failing_url))
+        finally:
+            reset_deadline(token)
+        return time.perf_counter() - started
+
+    before = _stub_stats(failing_url)["requests"]
+    for _ in range(5):
+        elapsed = asyncio.run(scenario())
+        # Gave up by the deadline, give or take the attempt already running when it passed
+        assert elapsed < timeout + 2 * FAST_MS / 1000 + 0.05
+    attempts = _stub_stats(failing_url)["requests"] - before
+    assert 5 <= attempts < 5 * 10
@@ -0,0 +1,37 @@
+"""Response cache bounds (run with `python -m pytest`)."""
+from app.services.v1.response_cache import IDENTITY, ResponseCache
+
+def _weather(i: int) -> dict:
+    return {"temp": 20.0 + i, "lat": 1.0, "lon": 2.0, "city": f"City {i}"}
+
+def test_small_bodies_charge_keys_and_sources():
+    cache = ResponseCache(max_bytes=64 * 1024, min_size=1000)
+    for i in range(1000):
+        cities = tuple(f"city-{i}-{n}" for n in range(20))
+        cache.get(("batch", "json", cities), tuple(map(_weather, range(20))), IDENTITY, lambda: b"{}")
+    stats = cache.stats()
+    # Two-byte bodies, but keys and weather data count: far fewer than 1000 entries fit
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert 0 < stats["size"] < 100
+    assert stats["evictions"] == 1000 - stats["size"]
+
+def test_entry_count_is_capped():
+    cache = ResponseCache(max_bytes=2 ** 30, min_size=1000, max_entries=10)
+    source = _weather(0)
+    for i in range(50):
+        cache.get(("city", i), (source,), IDENTITY, lambda: b"x")
+    assert len(cache) == 10
+    # The most recently stored entries are kept
+    body, _ = cache.get(("city", 49), (source,), IDENTITY, lambda: b"rendered again")
+    assert body == b"x"
+
+def test_body_shared_by_codings_is_released_in_full():
+    cache = ResponseCache(max_bytes=2 ** 20, min_size=1000)
+    cache.get(("city", "paris"), (_weather(0),), "gzip", lambda: b"short")
+    # Too short to compress: one body stored under both codings
+    assert len(cache) == 2
+    charged = cache.stats()["bytes"]
+    # A refresh replaces the data: both entries are invalidated and stored again
+    cache.get(("city", "paris"), (_weather(0),), "gzip", lambda: b"short")
+    stats = cache.stats()
+    assert (stats["invalidations"], stats["size"], stats["bytes"]) == (2, 2, charged)
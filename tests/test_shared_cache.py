@@ -0,0 +1,55 @@
+"""Shared cache files across layout changes (run with `python -m pytest`).
+
+Each SharedWeatherCache stands in for a worker process: it maps the file
+and holds its lock through its own descriptor, as a separate process would.
+"""
+import os
+import pytest
+from app.services.v1.shared_cache import SharedWeatherCache
+from app.services.v1.weather_cache import FRESH
+
+ENTRY = {"temp": 21.5, "lat": 1.0, "lon": 2.0, "city": "Lima", "observed_at": 1_700_000_000}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "weather-cache")
+
+def _cache(path: str, max_entries: int = 64, slot_bytes: int = 512) -> SharedWeatherCache:
+    return SharedWeatherCache(path, ttl=300, stale_ttl=600, max_entries=max_entries, slot_bytes=slot_bytes)
+
+def _files(path: str):
+    return sorted(name for name in os.listdir(os.path.dirname(path)) if not name.endswith(".lock"))
+
+def test_workers_with_same_layout_share_entries(path):
+    first, second = _cache(path), _cache(path)
+    first.set("lima, pe", ENTRY)
+    assert second.get("lima, pe") == (ENTRY, FRESH)
+    first.close()
+    second.close()
+
+def test_new_layout_leaves_mapped_file_alone(path):
+    old = _cache(path, max_entries=64)
+    old.set("lima, pe", ENTRY)
+    # Rolling restart with a bigger cache: a separate file, the old one untouched
+    new = _cache(path, max_entries=128, slot_bytes=1024)
+    assert old.path != new.path and len(_files(path)) == 2
+    assert old.get("lima, pe") == (ENTRY, FRESH)
+    assert new.get("lima, pe")[0] is None
+    old.close()
+    # The next worker to start removes the layout no one has open any more
+    _cache(path, max_entries=128, slot_bytes=1024).close()
+    assert _files(path) == [os.path.basename(new.path)]
+    new.close()
+
+def test_foreign_file_is_replaced_not_rewritten(path):
+    mapped = _cache(path)
+    mapped.set("lima, pe", ENTRY)
+    with open(mapped.path, "r+b") as damaged:
+        damaged.write(b"NOTACACHE")
+    replacement = _cache(path)
+    assert os.stat(replacement.path).st_ino != os.fstat(mapped._fd).st_ino
+    assert replacement.get("lima, pe")[0] is None
+    # The worker that mapped the damaged file still reads its own inode
+    assert mapped.get("lima, pe") == (ENTRY, FRESH)
+    mapped.close()
+    replacement.close()